@@ -0,0 +1,2 @@
+from synthetic import run_benchmark, run_benchmark_suite
+from hot_paths import run_hot_path_benchmarks
@@ -0,0 +1,318 @@
+"""
+Micro-benchmarks of the driver-side code paths whose cost grows with the
+population size and the length of the fit history. The benchmarks only use
+APIs that exist since the first dalek revision, so the module can be run
+against an old checkout to get baseline numbers (see `run_in_tree`).
+"""
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import OrderedDict
+from time import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+default_sizes = (1000, 10000, 100000, 1000000)
+
+baseline_fname = os.path.join(os.path.dirname(__file__), 'data',
+                              'hot_paths_baseline.csv')
+
+default_conf_fname = os.path.join(os.path.dirname(__file__), os.pardir,
+                                  'fitter', 'tests', 'default_conf.yml')
+
+parameter_names = ['model.abundances.o', 'model.abundances.c',
+                   'model.abundances.si', 'supernova.luminosity_requested']
+
+
+def make_parameter_collection(number_of_rows, with_dalek_columns=True):
+    from dalek.parallel import ParameterCollection
+
+    parameter_collection = ParameterCollection(
+        np.random.uniform(0, 1, (number_of_rows, len(parameter_names))),
+        columns=parameter_names)
+    if with_dalek_columns:
+        parameter_collection['dalek.fitness'] = np.random.uniform(
+            0, 1, number_of_rows)
+        parameter_collection['dalek.time_elapsed'] = np.random.uniform(
+            100, 200, number_of_rows)
+        parameter_collection['dalek.current_iteration'] = (
+            np.arange(number_of_rows) // 100)
+    return parameter_collection
+
+
+def benchmark_to_config(number_of_rows, tmp_dir):
+    from tardis.io.config_reader import ConfigurationNameSpace
+
+    default_config = ConfigurationNameSpace.from_yaml(default_conf_fname)
+    parameter_collection = make_parameter_collection(number_of_rows)
+    start_time = time()
+    parameter_collection.to_config(default_config)
+    return time() - start_time
+
+
+def benchmark_cartesian_product(number_of_rows, tmp_dir):
+    from dalek.parallel import ParameterCollection
+
+    rows = int(np.sqrt(number_of_rows))
+    parameter_collection1 = ParameterCollection(
+        np.random.uniform(0, 1, (rows, 2)), columns=parameter_names[:2])
+    parameter_collection2 = ParameterCollection(
+        np.random.uniform(0, 1, (number_of_rows // rows, 2)),
+        columns=parameter_names[2:])
+    start_time = time()
+    parameter_collection1.cartesian_product(parameter_collection2)
+    return time() - start_time
+
+
+def benchmark_normalize_parameter_collection(number_of_rows, tmp_dir):
+    from dalek.fitter.optimizers import BaseOptimizer
+
+    parameter_collection = make_parameter_collection(number_of_rows)
+    start_time = time()
+    BaseOptimizer.normalize_parameter_collection(parameter_collection)
+    return time() - start_time
+
+
+class _BenchmarkSpectrum(object):
+
+    class _FluxLambda(object):
+        def __init__(self, value):
+            self.value = value
+
+    def __init__(self, flux):
+        self.flux_lambda = self._FluxLambda(flux)
+
+
+def benchmark_store_spectra(number_of_rows, tmp_dir, spectrum_bins=1000):
+    from dalek.fitter.base import SpectralStore
+
+    spectrum = _BenchmarkSpectrum(np.random.uniform(0, 1, spectrum_bins))
+    spectral_store = SpectralStore(os.path.join(tmp_dir, 'spectra.h5'),
+                                   clobber=True)
+    start_time = time()
+    spectral_store.store_spectra([spectrum] * number_of_rows,
+                                 range(number_of_rows))
+    elapsed_time = time() - start_time
+    spectral_store.h5_file_handle.close()
+    return elapsed_time
+
+
+def benchmark_fitter_log_write(number_of_rows, tmp_dir,
+                               number_of_samples=100):
+    """
+    Write one generation to a fitter log that already has `number_of_rows`
+    rows (revisions without `FitterLog` rewrite the whole log)
+    """
+    fname = os.path.join(tmp_dir, 'fitter_log.csv')
+    fitter_log = make_parameter_collection(number_of_rows + number_of_samples)
+    fitter_log[:number_of_rows].to_csv(fname)
+    generation = fitter_log[number_of_rows:]
+
+    try:
+        from dalek.fitter.fitter_log import FitterLog
+    except ImportError:
+        start_time = time()
+        fitter_log.to_csv(fname)
+        return time() - start_time
+
+    start_time = time()
+    FitterLog(fname).append(generation)
+    return time() - start_time
+
+
+def benchmark_fitter_log_resume(number_of_rows, tmp_dir,
+                                number_of_samples=100):
+    """
+    Resume a fit from a fitter log with `number_of_rows` rows: the
+    `FitterConfiguration` that detects the resume and a `BaseFitter` that
+    takes over the log (without a cluster, the fitter is only set up where
+    `LocalLauncher` exists, before the fitter only took over the log read by
+    the configuration)
+    """
+    from dalek.fitter.base import (FitterConfiguration, BaseFitter,
+                                   ParameterConfiguration)
+    from dalek.fitter.optimizers import DEOptimizer
+    from dalek.parallel.launcher import fitter_worker
+
+    fname = os.path.join(tmp_dir, 'fitter_log.csv')
+    make_parameter_collection(number_of_rows).to_csv(fname)
+    parameter_config = ParameterConfiguration(
+        parameter_names, [[0, 1]] * len(parameter_names))
+
+    try:
+        from dalek.parallel.launcher import LocalLauncher
+    except ImportError:
+        LocalLauncher = None
+
+    start_time = time()
+    fitter_configuration = FitterConfiguration(
+        DEOptimizer(parameter_config, number_of_samples), None,
+        parameter_config, None, None, number_of_samples, fitter_log=fname,
+        resume=True)
+    if LocalLauncher is None:
+        return time() - start_time
+    fitter = BaseFitter(None, fitter_configuration,
+                        launcher=LocalLauncher(fitter_worker))
+    elapsed_time = time() - start_time
+    fitter.writer.close()
+    return elapsed_time
+
+
+benchmark_dict = OrderedDict([
+    ('to_config', benchmark_to_config),
+    ('cartesian_product', benchmark_cartesian_product),
+    ('normalize_parameter_collection',
+     benchmark_normalize_parameter_collection),
+    ('store_spectra', benchmark_store_spectra),
+    ('fitter_log_write', benchmark_fitter_log_write),
+    ('fitter_log_resume', benchmark_fitter_log_resume)])
+
+
+def run_hot_path_benchmarks(benchmark_names=None, sizes=default_sizes,
+                            repeats=3, max_seconds=60.):
+    """
+    Run the benchmarks
+
+    Parameters
+    ----------
+
+    benchmark_names: ~list of ~str
+        names of benchmarks in `benchmark_dict`, if None all are run
+        [default=None]
+
+    sizes: ~list of ~int
+        numbers of rows [default=(1000, 10000, 100000, 1000000)]
+
+    repeats: ~int
+        runs of a benchmark that takes less than a second, the fastest run
+        is reported [default=3]
+
+    max_seconds: ~float
+        larger sizes of a benchmark are skipped (reported as NaN) if a linear
+        extrapolation of the last run exceeds this time [default=60]
+
+    Returns
+    -------
+        : ~pandas.DataFrame
+        seconds for every benchmark (rows) and size (columns)
+    """
+    if benchmark_names is None:
+        benchmark_names = benchmark_dict.keys()
+
+    results = pd.DataFrame(np.nan, index=benchmark_names, columns=sizes)
+    results.index.name = 'benchmark'
+    for benchmark_name in benchmark_names:
+        benchmark = benchmark_dict[benchmark_name]
+        last_size, last_time = None, None
+        for size in sizes:
+            if (last_time is not None and
+                    last_time * size / float(last_size) > max_seconds):
+                logger.info('Skipping {0} with {1:d} rows'.format(
+                    benchmark_name, size))
+                continue
+            times = []
+            for _ in xrange(repeats):
+                tmp_dir = tempfile.mkdtemp()
+                try:
+                    times.append(benchmark(size, tmp_dir))
+                finally:
+                    shutil.rmtree(tmp_dir)
+                if times[-1] > 1.:
+                    break
+            last_size, last_time = size, min(times)
+            results.loc[benchmark_name, size] = last_time
+            logger.info('{0} with {1:d} rows: {2:.4g} s'.format(
+                benchmark_name, size, last_time))
+    return results
+
+
+def run_in_tree(tree_path, **kwargs):
+    """
+    Run the benchmarks of this module in a subprocess against the dalek
+    package in `tree_path` (e.g. a checkout of an older revision)
+
+    Parameters
+    ----------
+
+    tree_path: ~str
+        directory containing the `dalek` package
+
+    kwargs:
+        passed on to `run_hot_path_benchmarks`
+
+    Returns
+    -------
+        : ~pandas.DataFrame
+    """
+    module_fname = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+    code = ('import sys, json, imp\n'
+            'sys.path.insert(0, {0!r})\n'
+            'hot_paths = imp.load_source("dalek_hot_paths", {1!r})\n'
+            'results = hot_paths.run_hot_path_benchmarks(**json.loads({2!r}))\n'
+            'sys.stdout.write(results.to_json())\n').format(
+        os.path.abspath(tree_path), module_fname, json.dumps(kwargs))
+    output = subprocess.check_output([sys.executable, '-c', code])
+    results = pd.read_json(output)
+    results.columns = [int(column) for column in results.columns]
+    results = results.loc[kwargs.get('benchmark_names',
+                                     benchmark_dict.keys())]
+    results.index.name = 'benchmark'
+    return results
+
+
+def run_at_revision(revision, repository_path, **kwargs):
+    """
+    Run the benchmarks against a git revision of the repository
+
+    Returns
+    -------
+        : ~pandas.DataFrame
+    """
+    tree_path = tempfile.mkdtemp()
+    try:
+        archive = subprocess.Popen(['git', 'archive', revision, 'dalek'],
+                                   cwd=repository_path,
+                                   stdout=subprocess.PIPE)
+        subprocess.check_call(['tar', '-x', '-C', tree_path],
+                              stdin=archive.stdout)
+        if archive.wait() != 0:
+            raise ValueError('Could not export revision {0}'.format(revision))
+        return run_in_tree(tree_path, **kwargs)
+    finally:
+        shutil.rmtree(tree_path)
+
+
+def read_baseline(fname=baseline_fname):
+    """
+    Read the recorded baseline results
+
+    Returns
+    -------
+        : ~pandas.DataFrame
+    """
+    baseline = pd.read_csv(fname, index_col=0, comment='#')
+    baseline.columns = [int(column) for column in baseline.columns]
+    return baseline
+
+
+def compare_to_baseline(results, baseline=None):
+    """
+    Ratio of the results to the baseline (values above 1 are slower than the
+    baseline)
+
+    Returns
+    -------
+        : ~pandas.DataFrame
+    """
+    if baseline is None:
+        baseline = read_baseline()
+    return results / baseline.reindex(index=results.index,
+                                      columns=results.columns)
@@ -0,0 +1,282 @@
+import logging
+from collections import OrderedDict
+from multiprocessing import cpu_count
+from time import time, sleep
+
+import numpy as np
+import pandas as pd
+from astropy import units as u
+from tardis.io.config_reader import ConfigurationNameSpace
+
+from dalek.fitter.base import IterationEvaluation
+from dalek.fitter.utilization import EngineUtilization
+from dalek.parallel.launcher import LocalLauncher
+from dalek.parallel.parameter_collection import ParameterCollection
+from dalek.parallel.health import get_engine_health
+from dalek.parallel.util import get_memory_usage
+
+logger = logging.getLogger(__name__)
+
+
+class MockTARDISError(RuntimeError):
+    """
+    Simulated failure of a TARDIS run
+    """
+    pass
+
+
+class RuntimeDistribution(object):
+    """
+    Distribution of the runtimes (and failures) of mock TARDIS runs
+
+    Parameters
+    ----------
+
+    name: ~str
+        'constant' (always `median`), 'lognormal' (median `median`, log
+        standard deviation `sigma`) or 'pareto' (heavy-tailed with minimum
+        `median` * 2 ** (-1 / `alpha`) so that `median` is the median, tail
+        index `alpha`) [default='lognormal']
+
+    median: ~float
+        median runtime in seconds [default=0.05]
+
+    sigma: ~float
+        [default=0.5]
+
+    alpha: ~float
+        [default=1.5]
+
+    failure_rate: ~float
+        probability that a run fails [default=0.0]
+
+    """
+
+    @classmethod
+    def from_conf_dict(cls, conf_dict):
+        return cls(**conf_dict)
+
+    def __init__(self, name='lognormal', median=0.05, sigma=0.5, alpha=1.5,
+                 failure_rate=0.0):
+        if name not in ('constant', 'lognormal', 'pareto'):
+            raise ValueError('Unknown runtime distribution {0} - allowed are '
+                             'constant, lognormal and pareto'.format(name))
+        self.name = name
+        self.median = median
+        self.sigma = sigma
+        self.alpha = alpha
+        self.failure_rate = failure_rate
+
+    def sample_runtime(self, random_state=np.random):
+        if self.name == 'constant':
+            return self.median
+        elif self.name == 'lognormal':
+            return random_state.lognormal(np.log(self.median), self.sigma)
+        else:
+            minimum = self.median * 2 ** (-1. / self.alpha)
+            return minimum * (1 + random_state.pareto(self.alpha))
+
+    def sample_failure(self, random_state=np.random):
+        return random_state.uniform() < self.failure_rate
+
+
+class MockSpectrum(object):
+    """
+    Synthetic spectrum with the attributes of a TARDIS spectrum that are used
+    by dalek (`wavelength` and `flux_lambda`)
+    """
+
+    def __init__(self, wavelength, flux_lambda):
+        self.wavelength = wavelength
+        self.flux_lambda = flux_lambda
+
+
+class MockTARDISWorker(object):
+    """
+    Drop-in replacement for `~dalek.parallel.launcher.fitter_worker` that
+    does not run TARDIS but sleeps or keeps the CPU busy for a runtime drawn
+    from a `RuntimeDistribution` and returns a random fitness and a synthetic
+    spectrum.
+
+    Parameters
+    ----------
+
+    runtime_distribution: RuntimeDistribution
+        [default=RuntimeDistribution()]
+
+    mode: ~str
+        'sleep' or 'burn' (busy loop) [default='sleep']
+
+    spectrum_bins: ~int
+        number of wavelength bins of the spectrum (TARDIS default setups
+        use 10000) [default=10000]
+
+    """
+
+    def __init__(self, runtime_distribution=None, mode='sleep',
+                 spectrum_bins=10000):
+        if runtime_distribution is None:
+            runtime_distribution = RuntimeDistribution()
+        if mode not in ('sleep', 'burn'):
+            raise ValueError('Unknown mode {0} - allowed are sleep and '
+                             'burn'.format(mode))
+        self.runtime_distribution = runtime_distribution
+        self.mode = mode
+        self.spectrum_bins = spectrum_bins
+
+    @staticmethod
+    def burn(runtime):
+        end_time = time() + runtime
+        x = np.random.random(1000)
+        while time() < end_time:
+            x = np.sqrt(x * x + 1.) - 1.
+
+    def make_spectrum(self, random_state):
+        wavelength = np.linspace(500, 20000, self.spectrum_bins) * u.angstrom
+        flux_lambda = (random_state.uniform(0.5, 1.5, self.spectrum_bins) *
+                       1e-13 * u.erg / u.s / u.cm ** 2 / u.angstrom)
+        return MockSpectrum(wavelength, flux_lambda)
+
+    def __call__(self, config_dict, atom_data=None, fit_name=None,
+                 profile=False):
+        start_time = time()
+        random_state = np.random.RandomState()
+        runtime = self.runtime_distribution.sample_runtime(random_state)
+
+        if self.mode == 'sleep':
+            sleep(runtime)
+        else:
+            self.burn(runtime)
+        timings = {'worker.tardis_run': time() - start_time}
+
+        if self.runtime_distribution.sample_failure(random_state):
+            raise MockTARDISError('Simulated failure after {0:.3f} s'.format(
+                runtime))
+
+        start_time = time()
+        spectrum = self.make_spectrum(random_state)
+        fitness = random_state.uniform()
+        timings['worker.fitness'] = time() - start_time
+        return fitness, spectrum, timings, None, get_engine_health()
+
+
+def run_throughput_benchmark(tasks_per_generation=(100, 1000, 10000),
+                             generations=2, worker=None, launcher=None,
+                             number_of_processes=None):
+    """
+    Measure the throughput of a launcher with a mock worker. For every
+    generation all tasks are dispatched, waited for at the barrier and
+    collected like in the fitter.
+
+    Parameters
+    ----------
+
+    tasks_per_generation: ~list of ~int
+        [default=(100, 1000, 10000)]
+
+    generations: ~int
+        generations per size [default=2]
+
+    worker: MockTARDISWorker
+        [default=MockTARDISWorker()]
+
+    launcher:
+        launcher to measure, if None a
+        `~dalek.parallel.launcher.LocalLauncher` with `worker` is used
+        [default=None]
+
+    number_of_processes: ~int
+        processes of the local launcher, if None the number of CPUs
+        [default=None]
+
+    Returns
+    -------
+        : ~pandas.DataFrame
+        one row per generation with wall time, throughput (tasks per
+        second), failures, dispatch and collect time, engine utilization
+        and the resident memory of the driver before and after collecting
+        (in MB)
+    """
+    if worker is None:
+        worker = MockTARDISWorker()
+    close_launcher = launcher is None
+    if launcher is None:
+        if number_of_processes is None:
+            number_of_processes = cpu_count()
+        launcher = LocalLauncher(worker,
+                                 number_of_processes=number_of_processes)
+
+    default_config = ConfigurationNameSpace({'param': {}})
+    results = []
+    try:
+        for number_of_tasks in tasks_per_generation:
+            for generation in xrange(generations):
+                results.append(_run_generation(
+                    launcher, number_of_tasks, generation, default_config))
+                logger.info('{0:d} tasks: {1:.1f} tasks/s, {2:.1%} lost at '
+                            'barrier'.format(number_of_tasks,
+                                             results[-1]['throughput'],
+                                             results[-1]['barrier_fraction']))
+    finally:
+        if close_launcher:
+            launcher.close()
+
+    return pd.DataFrame([item.values() for item in results],
+                        columns=results[0].keys())
+
+
+def _run_generation(launcher, number_of_tasks, generation, default_config):
+    memory_start = get_memory_usage()
+    parameter_collection = ParameterCollection(
+        {'param.x': np.random.uniform(0, 1, number_of_tasks)})
+    start_time = time()
+    evaluation = IterationEvaluation(parameter_collection, generation, 0,
+                                     default_config)
+
+    dispatch_start = time()
+    for row in xrange(number_of_tasks):
+        evaluation.async_results[row] = launcher.queue_parameter_set(
+            evaluation.config_list[row])
+    dispatch_time = time() - dispatch_start
+
+    collect_time = 0.0
+    while evaluation.async_results:
+        launcher.wait(evaluation.async_results.values(), timeout=1)
+        collect_start = time()
+        for row in evaluation.collect():
+            launcher.clean_results(evaluation.finished_async_results.pop(row))
+        collect_time += time() - collect_start
+    wall_time = time() - start_time
+    memory_end = get_memory_usage()
+
+    result = OrderedDict()
+    result['tasks'] = number_of_tasks
+    result['generation'] = generation
+    result['failures'] = len(evaluation.errors)
+    result['wall_time'] = wall_time
+    result['throughput'] = number_of_tasks / wall_time
+    result['dispatch_time'] = dispatch_time
+    result['collect_time'] = collect_time
+
+    if evaluation.results:
+        rows = sorted(evaluation.results)
+        finished = ParameterCollection(
+            [evaluation.results[row].values() for row in rows],
+            columns=evaluation.results[rows[0]].keys())
+        finished['dalek.current_iteration'] = generation
+        iteration = EngineUtilization(
+            finished, number_of_engines=launcher.number_of_engines
+        ).iterations.iloc[0]
+        result['busy_fraction'] = iteration['busy_fraction']
+        result['barrier_fraction'] = iteration['barrier_fraction']
+    else:
+        result['busy_fraction'] = np.nan
+        result['barrier_fraction'] = np.nan
+
+    if memory_start is not None and memory_end is not None:
+        result['memory_start'] = memory_start / 1024. ** 2
+        result['memory_end'] = memory_end / 1024. ** 2
+    else:
+        result['memory_start'] = np.nan
+        result['memory_end'] = np.nan
+    return result
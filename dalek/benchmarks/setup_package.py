@@ -0,0 +1,3 @@
+def get_package_data():
+    return {
+        'dalek.benchmarks': ['data/*.csv']}
@@ -0,0 +1,274 @@
+import logging
+from collections import OrderedDict
+from time import time
+
+import numpy as np
+import pandas as pd
+from tardis.io.config_reader import ConfigurationNameSpace
+
+from dalek.fitter.base import BaseFitter, FitterConfiguration, \
+    ParameterConfiguration
+from dalek.fitter.optimizers import optimizer_dict
+from dalek.fitter.stopping import StoppingCriteria
+from dalek.parallel.launcher import LocalLauncher
+
+logger = logging.getLogger(__name__)
+
+
+def sphere(x):
+    return np.sum(x ** 2)
+
+
+def rosenbrock(x):
+    return np.sum(100. * (x[1:] - x[:-1] ** 2) ** 2 + (1 - x[:-1]) ** 2)
+
+
+def rastrigin(x):
+    return 10. * len(x) + np.sum(x ** 2 - 10. * np.cos(2 * np.pi * x))
+
+
+def ackley(x):
+    return (-20. * np.exp(-0.2 * np.sqrt(np.mean(x ** 2))) -
+            np.exp(np.mean(np.cos(2 * np.pi * x))) + 20. + np.e)
+
+
+def sine_sphere(x):
+    # the function of SimpleFitnessFunction in the fitter tests
+    return np.sum(x ** 2) * np.abs(np.prod(np.sin(x)))
+
+
+#: analytic test functions with their bounds (the same in every dimension),
+#: all have a global minimum of 0
+synthetic_function_dict = OrderedDict([
+    ('sphere', (sphere, (-5.12, 5.12))),
+    ('rosenbrock', (rosenbrock, (-2.048, 2.048))),
+    ('rastrigin', (rastrigin, (-5.12, 5.12))),
+    ('ackley', (ackley, (-32.768, 32.768))),
+    ('sine_sphere', (sine_sphere, (-100., 100.)))])
+
+
+class SyntheticFitnessFunction(object):
+    """
+    Fitness function evaluating an analytic function of the parameters in
+    the TARDIS configuration instead of a TARDIS model
+
+    Parameters
+    ----------
+
+    function_name: ~str
+        name of a function in `synthetic_function_dict`
+
+    parameter_names: ~list of ~str
+
+    """
+
+    def __init__(self, function_name, parameter_names):
+        self.function_name = function_name
+        self.function = synthetic_function_dict[function_name][0]
+        self.parameter_names = parameter_names
+
+    def __call__(self, config_dict):
+        x = np.array([config_dict.get_config_item(parameter_name)
+                      for parameter_name in self.parameter_names],
+                     dtype=np.float64)
+        return self.function(x)
+
+
+def synthetic_worker(config_dict, atom_data=None, fit_name=None,
+                     profile=False):
+    """
+    Worker for the `~dalek.parallel.launcher.LocalLauncher` evaluating the
+    `fitness_function` in its namespace (a `SyntheticFitnessFunction`), or
+    the one of `fit_name` on a shared pool. It takes the same arguments and
+    returns the same values as `~dalek.parallel.launcher.fitter_worker`
+    without a spectrum, profile or engine heartbeat (`atom_data` and
+    `profile` are ignored).
+    """
+    from time import time
+
+    if fit_name is None:
+        current_fitness_function = fitness_function
+    else:
+        current_fitness_function = globals()[
+            'dalek_fitness_function_' + fit_name]
+
+    start_time = time()
+    fitness = current_fitness_function(config_dict)
+    return (fitness, None, {'worker.fitness': time() - start_time}, None,
+            None)
+
+
+def make_synthetic_fitter_configuration(optimizer_name, function_name,
+                                        dimensions, number_of_samples,
+                                        max_iterations, fitness_target=None,
+                                        **optimizer_kwargs):
+    """
+    Fitter configuration for fitting a synthetic function
+
+    Returns
+    -------
+        : ~dalek.fitter.FitterConfiguration
+    """
+    bounds = synthetic_function_dict[function_name][1]
+    parameter_names = ['param.x{0:d}'.format(i) for i in xrange(dimensions)]
+    parameter_config = ParameterConfiguration(parameter_names,
+                                              [bounds] * dimensions)
+    optimizer = optimizer_dict[optimizer_name](
+        parameter_config, number_of_samples, **optimizer_kwargs)
+    fitness_function = SyntheticFitnessFunction(function_name,
+                                                parameter_names)
+    if fitness_target is not None:
+        stopping_criteria = StoppingCriteria(parameter_config,
+                                             fitness_target=fitness_target)
+    else:
+        stopping_criteria = None
+
+    return FitterConfiguration(
+        optimizer, fitness_function, parameter_config=parameter_config,
+        default_config=ConfigurationNameSpace({'param': {}}), atom_data=None,
+        number_of_samples=number_of_samples, max_iterations=max_iterations,
+        stopping_criteria=stopping_criteria)
+
+
+def run_benchmark(optimizer_name, function_name, dimensions,
+                  number_of_samples, max_iterations=100, fitness_target=1e-3,
+                  number_of_processes=0, seed=None, **optimizer_kwargs):
+    """
+    Fit a synthetic function with the real `~dalek.fitter.BaseFitter` loop on
+    a `~dalek.parallel.launcher.LocalLauncher`
+
+    Parameters
+    ----------
+
+    optimizer_name: ~str
+        name of the optimizer in `~dalek.fitter.optimizers.optimizer_dict`
+
+    function_name: ~str
+        name of the function in `synthetic_function_dict`
+
+    dimensions: ~int
+
+    number_of_samples: ~int
+        population size
+
+    max_iterations: ~int
+        [default=100]
+
+    fitness_target: ~float
+        the fit stops once the best fitness reaches this value
+        [default=1e-3]
+
+    number_of_processes: ~int
+        processes of the local launcher, 0 evaluates in the driver process
+        [default=0]
+
+    seed: ~int
+        seed for numpy's random number generator [default=None]
+
+    optimizer_kwargs:
+        passed on to the optimizer
+
+    Returns
+    -------
+        : ~collections.OrderedDict
+        benchmark results, 'evaluations_to_target' is NaN if the target was
+        not reached. 'driver_overhead_per_evaluation' is the driver time
+        (without waiting for and running the evaluations) per evaluation.
+    """
+    if seed is not None:
+        np.random.seed(seed)
+
+    fitter_configuration = make_synthetic_fitter_configuration(
+        optimizer_name, function_name, dimensions, number_of_samples,
+        max_iterations, fitness_target=fitness_target, **optimizer_kwargs)
+    launcher = LocalLauncher(
+        synthetic_worker,
+        namespace={'fitness_function': fitter_configuration.fitness_function},
+        number_of_processes=number_of_processes)
+    fitter = BaseFitter(None, fitter_configuration, launcher=launcher)
+
+    start_time = time()
+    try:
+        fitter.run_fitter(
+            fitter_configuration.get_initial_parameter_collection())
+    finally:
+        launcher.close()
+    wall_time = time() - start_time
+
+    fitter_log = fitter.parameter_collection_log
+    fitness = fitter_log['dalek.fitness'].values
+    number_of_evaluations = len(fitter_log)
+
+    if fitness_target is not None and np.any(fitness <= fitness_target):
+        evaluations_to_target = np.argmax(fitness <= fitness_target) + 1
+    else:
+        evaluations_to_target = np.nan
+
+    driver_time = 0.0
+    for metrics in fitter.timer.metrics.values():
+        driver_time += sum([metrics[phase] for phase
+                            in fitter.timer.driver_phases if phase != 'wait'])
+    if number_of_processes == 0:
+        # evaluations run during the dispatch
+        driver_time -= fitter_log['dalek.time_elapsed'].sum()
+
+    results = OrderedDict()
+    results['optimizer'] = optimizer_name
+    results['function'] = function_name
+    results['dimensions'] = dimensions
+    results['number_of_samples'] = number_of_samples
+    results['iterations'] = fitter.current_iteration
+    results['evaluations'] = number_of_evaluations
+    results['best_fitness'] = fitness.min()
+    results['evaluations_to_target'] = evaluations_to_target
+    results['wall_time'] = wall_time
+    results['driver_overhead_per_evaluation'] = (driver_time /
+                                                 number_of_evaluations)
+    return results
+
+
+def run_benchmark_suite(optimizer_names=('devolution', 'pso', 'luus_jaakola'),
+                        function_names=('sphere', 'rosenbrock', 'rastrigin',
+                                        'ackley'),
+                        dimensions=(2, 5, 10), population_sizes=(10, 40),
+                        repeats=1, seed=250880, **kwargs):
+    """
+    Run `run_benchmark` for all combinations of optimizers, functions,
+    dimensions and population sizes
+
+    Parameters
+    ----------
+
+    repeats: ~int
+        number of runs of every combination (with different seeds)
+        [default=1]
+
+    seed: ~int
+        seed of the first run [default=250880]
+
+    kwargs:
+        passed on to `run_benchmark`
+
+    Returns
+    -------
+        : ~pandas.DataFrame
+        one row per run
+    """
+    results = []
+    for optimizer_name in optimizer_names:
+        for function_name in function_names:
+            for dimension in dimensions:
+                for population_size in population_sizes:
+                    for repeat in xrange(repeats):
+                        logger.info('Benchmarking {0} on {1} ({2:d} dimensions,'
+                                    ' {3:d} samples, run {4:d})'.format(
+                            optimizer_name, function_name, dimension,
+                            population_size, repeat))
+                        run_results = run_benchmark(
+                            optimizer_name, function_name, dimension,
+                            population_size, seed=seed + repeat, **kwargs)
+                        run_results['repeat'] = repeat
+                        results.append(run_results)
+
+    return pd.DataFrame([item.values() for item in results],
+                        columns=results[0].keys())
@@ -0,0 +1,26 @@
+from dalek.benchmarks.hot_paths import run_hot_path_benchmarks, \
+    read_baseline, compare_to_baseline, benchmark_dict, default_sizes
+import numpy as np
+
+
+def test_run_hot_path_benchmarks():
+    results = run_hot_path_benchmarks(sizes=[10, 100], repeats=1)
+    assert results.index.tolist() == benchmark_dict.keys()
+    assert results.columns.tolist() == [10, 100]
+    assert np.all(results.values > 0)
+
+
+def test_run_hot_path_benchmarks_max_seconds():
+    results = run_hot_path_benchmarks(['normalize_parameter_collection'],
+                                      sizes=[10, 100], repeats=1,
+                                      max_seconds=0.)
+    assert results.loc['normalize_parameter_collection', 10] > 0
+    assert np.isnan(results.loc['normalize_parameter_collection', 100])
+
+
+def test_baseline():
+    baseline = read_baseline()
+    assert baseline.index.tolist() == benchmark_dict.keys()
+    assert baseline.columns.tolist() == list(default_sizes)
+    ratio = compare_to_baseline(baseline.iloc[:, :2] * 2, baseline)
+    np.testing.assert_allclose(ratio.values, 2.)
@@ -0,0 +1,41 @@
+from dalek.benchmarks.mock_worker import MockTARDISWorker, MockTARDISError, \
+    RuntimeDistribution, run_throughput_benchmark
+from dalek.parallel.launcher import LocalLauncher
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('name', ['constant', 'lognormal', 'pareto'])
+def test_runtime_distribution_median(name):
+    runtime_distribution = RuntimeDistribution(name, median=2.)
+    random_state = np.random.RandomState(250880)
+    runtimes = [runtime_distribution.sample_runtime(random_state)
+                for _ in xrange(20000)]
+    assert abs(np.median(runtimes) - 2.) < 0.05
+
+
+def test_mock_worker():
+    worker = MockTARDISWorker(RuntimeDistribution('constant', median=0.01),
+                              spectrum_bins=100)
+    fitness, spectrum, timings, profile_stats, health = worker({})
+    assert 0 <= fitness <= 1
+    assert spectrum.flux_lambda.value.shape == (100,)
+    assert timings['worker.tardis_run'] >= 0.01
+    assert health['rss'] > 0
+
+    failing_worker = MockTARDISWorker(
+        RuntimeDistribution('constant', median=0., failure_rate=1.))
+    with pytest.raises(MockTARDISError):
+        failing_worker({})
+
+
+def test_throughput_benchmark():
+    worker = MockTARDISWorker(
+        RuntimeDistribution('constant', median=0.001, failure_rate=0.5),
+        spectrum_bins=100)
+    results = run_throughput_benchmark(
+        [10, 20], generations=1,
+        launcher=LocalLauncher(worker, number_of_processes=0))
+    assert results['tasks'].tolist() == [10, 20]
+    assert (results['failures'] > 0).all()
+    assert (results['throughput'] > 0).all()
@@ -0,0 +1,53 @@
+from dalek.benchmarks.synthetic import run_benchmark, run_benchmark_suite, \
+    synthetic_function_dict, SyntheticFitnessFunction, synthetic_worker
+from dalek.parallel.launcher import LocalLauncher
+from tardis.io.config_reader import ConfigurationNameSpace
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('function_name', synthetic_function_dict.keys())
+def test_synthetic_function_minimum(function_name):
+    function, bounds = synthetic_function_dict[function_name]
+    if function_name == 'rosenbrock':
+        assert function(np.ones(3)) == 0
+    else:
+        assert abs(function(np.zeros(3))) < 1e-12
+    assert function(np.ones(3) * bounds[1] * 0.5) > 0
+
+
+def test_synthetic_fitness_function():
+    fitness_function = SyntheticFitnessFunction('sphere',
+                                                ['param.x0', 'param.x1'])
+    config = ConfigurationNameSpace({'param': {'x0': 1., 'x1': 2.}})
+    assert fitness_function(config) == 5.
+
+
+def test_synthetic_worker():
+    fitness_function = SyntheticFitnessFunction('sphere', ['param.x0'])
+    launcher = LocalLauncher(synthetic_worker, namespace={
+        'dalek_fitness_function_fit1': fitness_function})
+    async_result = launcher.queue_parameter_set(
+        ConfigurationNameSpace({'param': {'x0': 2.}}), fit_name='fit1')
+    fitness, spectrum, timings, profile_stats, health = async_result.get()
+    assert fitness == 4.
+    assert spectrum is None and profile_stats is None and health is None
+    assert timings['worker.fitness'] >= 0
+
+
+def test_run_benchmark():
+    results = run_benchmark('devolution', 'sphere', 2, 10, max_iterations=60,
+                            fitness_target=1e-2, seed=250880)
+    assert results['best_fitness'] <= 1e-2
+    assert results['evaluations_to_target'] <= results['evaluations']
+    assert results['iterations'] < 60
+    assert results['driver_overhead_per_evaluation'] > 0
+
+
+def test_run_benchmark_suite():
+    results = run_benchmark_suite(optimizer_names=['pso', 'luus_jaakola'],
+                                  function_names=['rastrigin'],
+                                  dimensions=[2], population_sizes=[8],
+                                  max_iterations=3)
+    assert len(results) == 2
+    assert results['iterations'].tolist() == [3, 3]
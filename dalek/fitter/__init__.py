@@ -1,3 +1,6 @@
 from base import BaseFitter, FitterConfiguration, run_fitter
+from manager import FitManager, run_fits
+from estimate import estimate_fit
 from fitness_function import BaseFitnessFunction
-from optimizers import BaseOptimizer
\ No newline at end of file
+from optimizers import BaseOptimizer
+from utilization import EngineUtilization
\ No newline at end of file
@@ -11,10 +11,25 @@ import yaml
 from collections import OrderedDict
 import h5py
 import pandas as pd
-from time import time
+from time import time, mktime
+import calendar
 
 
 from dalek.parallel.parameter_collection import ParameterCollection
+from dalek.fitter.fitter_log import FitterLog
+from dalek.fitter.checkpoint import OptimizerCheckpoint
+from dalek.fitter.journal import TaskJournal
+from dalek.fitter.writer import BackgroundWriter
+from dalek.fitter.stopping import StoppingCriteria
+from dalek.fitter.metrics import IterationTimer
+from dalek.fitter.utilization import EngineUtilization
+from dalek.parallel.trace import ChromeTrace
+from dalek.parallel.health import EngineMonitor
+from dalek.parallel.recycling import EngineRecycler
+from dalek.fitter.profiling import ProfileAggregator
+from dalek.fitter.surrogate import SurrogateScreening
+from dalek.fitter.polishing import LocalPolishing
+from dalek.fitter.sampling import make_design, check_design
 
 
 logger = logging.getLogger(__name__)
@@ -68,26 +83,24 @@ class OrderedDictYAMLLoader(yaml.Loader):
         return mapping
 
 
-def run_fitter(dalek_configuration_fname, init_sleep_time=300):
+def connect_to_engines(init_sleep_time=300):
     """
-    Function to start a fit with the given configuration name
+    Connect to the IPython cluster, waiting until engines have connected
 
     Parameters
     ----------
 
-    dalek_fitter_conf_fname: ~str
-        file name of the YAML configuration file for Dalek
-
     init_sleep_time: ~float
         time to sleep (in seconds) until to try again to see
         if engines have connected (default 300s)
 
     Returns
     -------
-        : dalek.BaseFitter
+        : IPython.parallel.Client
     """
 
     from IPython.parallel import Client
+    from time import sleep
 
     while True:
         rc = Client()
@@ -95,9 +108,32 @@ def run_fitter(dalek_configuration_fname, init_sleep_time=300):
             break
         logger.info('No engines currently connected. Sleeping for {0} s '
                     'before trying again'.format(init_sleep_time))
-        time.sleep(init_sleep_time)
+        sleep(init_sleep_time)
 
     logger.info('{0} engines connected starting fit in 30 s'.format(len(rc)))
+    return rc
+
+
+def run_fitter(dalek_configuration_fname, init_sleep_time=300):
+    """
+    Function to start a fit with the given configuration name
+
+    Parameters
+    ----------
+
+    dalek_fitter_conf_fname: ~str
+        file name of the YAML configuration file for Dalek
+
+    init_sleep_time: ~float
+        time to sleep (in seconds) until to try again to see
+        if engines have connected (default 300s)
+
+    Returns
+    -------
+        : dalek.BaseFitter
+    """
+
+    rc = connect_to_engines(init_sleep_time)
 
     fitter_conf = FitterConfiguration.from_yaml(dalek_configuration_fname)
     fitter = BaseFitter(rc, fitter_conf)
@@ -127,11 +163,24 @@ class FitterConfiguration(object):
         the default config
 
     generate_initial_paramater_collection:
+
+    initial_design: ~str
+        space-filling design of the initial parameters ('uniform', 'lhs',
+        'sobol' or 'halton', see `~dalek.fitter.sampling`)
+        [default='uniform']
+
+    spectral_store_conf: ~dict
+        'spectral_store' section of the configuration, also given if the
+        spectral store was not opened (dry run) [default=None]
+
+    dry_run: ~bool
+        skip detecting and restoring a previous run of the fit (the fitter
+        log, checkpoint and journal are not touched) [default=False]
     """
 
 
     @classmethod
-    def from_yaml(cls, fname, resume_fit=None):
+    def from_yaml(cls, fname, resume_fit=None, dry_run=False):
         """
         Reading the fitter configuration from a yaml file
         
@@ -140,6 +189,11 @@ class FitterConfiguration(object):
 
         fname: ~str
             filename
+
+        dry_run: ~bool
+            do not open (and possibly clobber) the spectral store and do not
+            resume from (or modify) an existing fitter log, e.g. for
+            estimating the cost of the fit [default=False]
         
         """
 
@@ -151,6 +205,7 @@ class FitterConfiguration(object):
 
         number_of_samples = conf_dict['fitter']['number_of_samples']
         max_iterations = conf_dict['fitter']['max_iterations']
+        initial_design = conf_dict['fitter'].get('initial_design', 'uniform')
         optimizer_dict = conf_dict['fitter'].pop('optimizer')
         optimizer_class = all_optimizer_dict[optimizer_dict.pop('name')]
         optimizer = optimizer_class(parameter_config, number_of_samples,
@@ -162,9 +217,66 @@ class FitterConfiguration(object):
 
         resume = conf_dict['fitter'].get('resume', resume_fit)
         fitter_log = conf_dict['fitter'].get('fitter_log', None)
+        checkpoint = conf_dict['fitter'].get('checkpoint', None)
+        journal = conf_dict['fitter'].get('journal', None)
+        writer_queue_size = conf_dict['fitter'].get('writer_queue_size', 100)
+        metrics_log = conf_dict['fitter'].get('metrics_log', None)
+        trace = conf_dict['fitter'].get('trace', None)
+
+        stopping_conf_dict = conf_dict['fitter'].get('stopping', None)
+        if stopping_conf_dict is not None:
+            stopping_criteria = StoppingCriteria.from_conf_dict(
+                stopping_conf_dict, parameter_config)
+        else:
+            stopping_criteria = None
+
+        profile_conf_dict = conf_dict['fitter'].get('profile', None)
+        if profile_conf_dict is not None:
+            if fitter_log is not None:
+                default_profile_dir = (os.path.splitext(fitter_log)[0] +
+                                       '_profiles')
+            else:
+                default_profile_dir = None
+            profiler = ProfileAggregator.from_conf_dict(
+                profile_conf_dict, default_profile_dir=default_profile_dir)
+        else:
+            profiler = None
+
+        health_conf_dict = conf_dict['fitter'].get('health', None)
+        if health_conf_dict is not None:
+            if fitter_log is not None:
+                default_health_log = (os.path.splitext(fitter_log)[0] +
+                                      '_health.csv')
+            else:
+                default_health_log = None
+            engine_monitor = EngineMonitor.from_conf_dict(
+                health_conf_dict, default_health_log=default_health_log)
+        else:
+            engine_monitor = None
+
+        recycling_conf_dict = conf_dict['fitter'].get('recycling', None)
+        if recycling_conf_dict is not None:
+            engine_recycler = EngineRecycler.from_conf_dict(
+                recycling_conf_dict)
+        else:
+            engine_recycler = None
+
+        surrogate_conf_dict = conf_dict['fitter'].get('surrogate', None)
+        if surrogate_conf_dict is not None:
+            surrogate_screening = SurrogateScreening.from_conf_dict(
+                surrogate_conf_dict, parameter_config)
+        else:
+            surrogate_screening = None
+
+        polishing_conf_dict = conf_dict['fitter'].get('polishing', None)
+        if polishing_conf_dict is not None:
+            polishing = LocalPolishing.from_conf_dict(
+                polishing_conf_dict, parameter_config, number_of_samples)
+        else:
+            polishing = None
 
         spectral_store_dict = conf_dict['fitter'].get('spectral_store', None)
-        if spectral_store_dict is not None:
+        if spectral_store_dict is not None and not dry_run:
             spectral_store_fname = spectral_store_dict['fname']
             spectral_store_mode = spectral_store_dict.get('mode', 'all')
             spectral_store_clobber = spectral_store_dict.get('clobber', False)
@@ -183,8 +295,18 @@ class FitterConfiguration(object):
                    parameter_config=parameter_config,
                    default_config=default_config, atom_data=atom_data,
                    number_of_samples=number_of_samples,
-                   max_iterations=max_iterations, fitter_log=fitter_log,
-                   spectral_store=spectral_store, resume=resume)
+                   max_iterations=max_iterations,
+                   initial_design=initial_design, fitter_log=fitter_log,
+                   spectral_store=spectral_store, resume=resume,
+                   checkpoint=checkpoint, journal=journal,
+                   writer_queue_size=writer_queue_size,
+                   stopping_criteria=stopping_criteria,
+                   metrics_log=metrics_log, trace=trace, profiler=profiler,
+                   engine_monitor=engine_monitor,
+                   engine_recycler=engine_recycler,
+                   surrogate_screening=surrogate_screening,
+                   polishing=polishing,
+                   spectral_store_conf=spectral_store_dict, dry_run=dry_run)
 
 
 
@@ -193,8 +315,14 @@ class FitterConfiguration(object):
 
     def __init__(self, optimizer, fitness_function, parameter_config, default_config,
                  atom_data, number_of_samples, max_iterations=50,
-                 generate_initial_parameter_collection=None, fitter_log=None,
-                 spectral_store=None, resume=None):
+                 generate_initial_parameter_collection=None,
+                 initial_design='uniform', fitter_log=None,
+                 spectral_store=None, resume=None, checkpoint=None,
+                 journal=None, writer_queue_size=100,
+                 stopping_criteria=None, metrics_log=None, trace=None,
+                 profiler=None, engine_monitor=None, engine_recycler=None,
+                 surrogate_screening=None, polishing=None,
+                 spectral_store_conf=None, dry_run=False):
 
         self.optimizer = optimizer
         self.fitness_function = fitness_function
@@ -206,42 +334,96 @@ class FitterConfiguration(object):
         self.number_of_samples = number_of_samples
         self.generate_initial_parameter_collection = \
             generate_initial_parameter_collection
+        check_design(initial_design, len(parameter_config.parameter_names))
+        self.initial_design = initial_design
         self.fitter_log = fitter_log
         self.spectral_store = spectral_store
+        self.spectral_store_conf = spectral_store_conf
+        self.writer_queue_size = writer_queue_size
+        self.stopping_criteria = stopping_criteria
+
+        if checkpoint is None and fitter_log is not None:
+            checkpoint = os.path.splitext(fitter_log)[0] + '_checkpoint.npz'
+        if checkpoint is not None:
+            self.checkpoint = OptimizerCheckpoint(checkpoint)
+        else:
+            self.checkpoint = None
+
+        if journal is None and fitter_log is not None:
+            journal = os.path.splitext(fitter_log)[0] + '_journal.jsonl'
+        if journal is not None:
+            self.journal = TaskJournal(journal)
+        else:
+            self.journal = None
+
+        if metrics_log is None and fitter_log is not None:
+            metrics_log = os.path.splitext(fitter_log)[0] + '_metrics.csv'
+        self.metrics_log = metrics_log
+        self.trace = trace
+        self.profiler = profiler
+        self.engine_monitor = engine_monitor
+        self.engine_recycler = engine_recycler
+        self.surrogate_screening = surrogate_screening
+        self.polishing = polishing
 
         self.resume = resume
         self.current_iteration = 0
 
-        if os.path.exists(fitter_log) and self.resume is None:
+        self.resume_log = None
+        self.resume_parameters = None
+        self.resume_results = None
+        self.resume_stop_reason = None
+
+        if dry_run:
+            return
+
+        if (fitter_log is not None and os.path.exists(fitter_log) and
+                self.resume is None):
             logger.info('Detected an old logfile {0} - resuming'.format(fitter_log))
             self.resume = True
 
         if self.resume == True:
-            if not os.path.exists(fitter_log):
+            if fitter_log is None or not os.path.exists(fitter_log):
                 raise IOError('Requested resume - but previous fitter log ({0})'
                               ' doesn\'t exist'.format(fitter_log))
 
-            resume_log = ParameterCollection(
-                pd.read_csv(fitter_log, index_col=0))
+            resume_fitter_log = FitterLog(fitter_log)
+            resume_fitter_log.truncate_incomplete_line()
 
-            log_parameters = set([item for item in resume_log.columns
+            extra_columns = list(self.optimizer.extra_columns)
+            if self.polishing is not None:
+                extra_columns += self.polishing.optimizer.extra_columns
+            log_parameters = set([item for item in resume_fitter_log.columns
                                   if not (item.startswith('dalek.') or
-                                          item == 'index')])
+                                          item == 'index' or
+                                          item in extra_columns)])
             conf_parameters = set(self.parameter_config.parameter_names)
 
             if log_parameters != conf_parameters:
                 raise ValueError('Requested resume - but given fitter log ({0})'
                                  ' indicates different parameters than '
                                  'requested parameters'.format(fitter_log))
+
+            resume_log = resume_fitter_log.read_last_iteration()
             self.current_iteration = (
                 resume_log['dalek.current_iteration'].max() + 1)
             self.resume_log = resume_log
 
+            if self.checkpoint is not None and self.checkpoint.exists:
+                self.restore_checkpoint()
 
+            if self.journal is not None and self.journal.exists:
+                self.restore_journal()
 
-
-
-
+    @property
+    def active_optimizer(self):
+        """
+        The optimizer of the polishing phase once it has started, otherwise
+        the optimizer
+        """
+        if self.polishing is not None and self.polishing.active:
+            return self.polishing.optimizer
+        return self.optimizer
 
     @property
     def all_parameter_names(self):
@@ -251,10 +433,79 @@ class FitterConfiguration(object):
     def all_parameter_types(self):
         return self.parameter_types + self.fitter_parameter_types
 
+    def restore_checkpoint(self):
+        """
+        Restore the optimizer state and the next parameters to evaluate from
+        the checkpoint. If the checkpoint is one iteration behind the fitter
+        log (the driver stopped between writing the log and the checkpoint)
+        the last logged iteration is fed to the restored optimizer.
+        """
+        (checkpoint_iteration, optimizer_state, parameter_collection,
+         random_state, fitter_state) = self.checkpoint.load()
+
+        if checkpoint_iteration not in (self.current_iteration,
+                                        self.current_iteration - 1):
+            logger.warning('Checkpoint {0} is for iteration {1} but resuming '
+                           'at iteration {2} - ignoring checkpoint'.format(
+                self.checkpoint.fname, checkpoint_iteration,
+                self.current_iteration))
+            return
+
+        np.random.set_state(random_state)
+        if 'stop_reason' in fitter_state:
+            # the fit is continued, e.g. with a larger max_iterations
+            self.resume_stop_reason = str(fitter_state['stop_reason'])
+            logger.info('Previous run of the fit stopped: {0}'.format(
+                self.resume_stop_reason))
+        if self.stopping_criteria is not None:
+            self.stopping_criteria.set_state(fitter_state)
+        if self.polishing is not None:
+            self.polishing.set_state(dict(
+                (key[len('polishing.'):], value)
+                for key, value in fitter_state.items()
+                if key.startswith('polishing.')))
+        if self.surrogate_screening is not None:
+            self.surrogate_screening.set_state(dict(
+                (key[len('surrogate.'):], value)
+                for key, value in fitter_state.items()
+                if key.startswith('surrogate.')))
+        self.active_optimizer.set_state(optimizer_state)
+
+        if checkpoint_iteration == self.current_iteration:
+            self.resume_parameters = parameter_collection
+        else:
+            if self.surrogate_screening is not None:
+                self.surrogate_screening.update(self.resume_log)
+            self.resume_parameters = self.active_optimizer(
+                self.resume_log.reset_index(drop=True))
+        logger.info('Restored optimizer state from checkpoint {0}'.format(
+            self.checkpoint.fname))
+
+    def restore_journal(self):
+        """
+        Restore the parameters and the already finished runs of an iteration
+        that was interrupted while in flight
+        """
+        journal_iteration = self.journal.load()
+        if journal_iteration is None:
+            return
+
+        current_iteration, parameter_collection, results = journal_iteration
+        if current_iteration != self.current_iteration:
+            return
+
+        self.resume_parameters = parameter_collection
+        self.resume_results = results
+        logger.info('Restored {0} of {1} finished TARDIS runs of iteration {2} '
+                    'from journal {3}'.format(len(results),
+                                              len(parameter_collection),
+                                              current_iteration,
+                                              self.journal.fname))
+
     def resume_generate_parameters(self, number_of_samples=None):
-        mask = (self.resume_log['dalek.current_iteration'] ==
-                self.current_iteration - 1)
-        return self.resume_log[mask]
+        if self.resume_parameters is not None:
+            return self.resume_parameters
+        return self.resume_log[self.parameter_config.parameter_names].copy()
 
 
     def get_initial_parameter_collection(self, number_of_samples=None):
@@ -276,14 +527,12 @@ class FitterConfiguration(object):
             return self.generate_initial_parameter_collection(number_of_samples=
                                                               number_of_samples)
         if self.resume:
-            return self.resume_generate_parameters().reset_index()
-
-        initial_data = np.array([np.random.uniform(lbound, ubound,
-                                          size=number_of_samples)
-                        for lbound, ubound in self.parameter_config.parameter_bounds])
+            return self.resume_generate_parameters().reset_index(drop=True)
 
         initial_paramater_collection = ParameterCollection(
-            initial_data.T, columns=self.parameter_config.parameter_names)
+            make_design(self.initial_design, number_of_samples,
+                        self.parameter_config),
+            columns=self.parameter_config.parameter_names)
         return self.optimizer.normalize_parameter_collection(
             initial_paramater_collection)
 
@@ -323,9 +572,12 @@ class SpectralStore(object):
             self.h5_file_handle = h5py.File(h5_fname, mode='w')
 
     def store_spectrum(self, id, spectrum):
-        specname = 'spectrum{:d}'.format(id)
-        self.h5_file_handle[os.path.join(self.spectral_store_name, specname)] = \
-            spectrum.flux_lambda.value
+        specname = os.path.join(self.spectral_store_name,
+                                'spectrum{:d}'.format(id))
+        if specname in self.h5_file_handle:
+            # spectrum of a run that was repeated after resuming
+            del self.h5_file_handle[specname]
+        self.h5_file_handle[specname] = spectrum.flux_lambda.value
 
 
     def store_spectra(self, spectra, indices, parameter_collection=None):
@@ -375,6 +627,180 @@ class ParameterConfiguration(object):
         return self.parameter_bounds[:,1]
 
 
+def datetime_to_seconds(date_time):
+    """
+    Convert a datetime of the task metadata to seconds since the epoch,
+    comparable with `time.time`. IPython.parallel and the
+    `~dalek.parallel.launcher.LocalLauncher` stamp tasks with naive
+    `datetime.now()`, so naive datetimes are taken as local time. Datetimes
+    with a tzinfo are converted through UTC.
+    """
+    if date_time.tzinfo is not None:
+        seconds = calendar.timegm(date_time.utctimetuple())
+    else:
+        seconds = mktime(date_time.timetuple())
+    return seconds + date_time.microsecond * 1e-6
+
+
+class IterationEvaluation(object):
+    """
+    Bookkeeping of the TARDIS runs that evaluate a parameter collection in a
+    single iteration. Runs are identified by their row (position) in the
+    parameter collection.
+
+    Parameters
+    ----------
+
+    parameter_collection: ~dalek.parallel.ParameterCollection
+
+    current_iteration: ~int
+
+    index_offset: ~int
+        index of the first row in the fitter log (and the spectral store)
+
+    default_config: ~tardis.io.config_reader.ConfigurationNameSpace
+
+    fitness_function: ~dalek.fitter.BaseFitnessFunction
+        fitness function of the fit. If it has `target_names`, the worker
+        returns one fitness per target which is logged in separate columns
+        [default=None]
+
+    """
+
+    def __init__(self, parameter_collection, current_iteration, index_offset,
+                 default_config, fitness_function=None):
+        self.parameter_collection = parameter_collection.reset_index(drop=True)
+        self.fitness_function = fitness_function
+        self.current_iteration = current_iteration
+        self.index_offset = index_offset
+        self.config_list = self.parameter_collection.to_config(default_config)
+
+        self.async_results = {}
+        self.finished_async_results = {}
+        self.results = {}
+        self.spectra = {}
+        self.task_times = {}
+        self.profile_stats = {}
+        self.health = {}
+        self.errors = {}
+
+    def __len__(self):
+        return len(self.parameter_collection)
+
+    @property
+    def done(self):
+        return len(self.results) == len(self)
+
+    @property
+    def pending_rows(self):
+        """
+        Rows that are neither finished nor in flight
+        """
+        return [row for row in xrange(len(self))
+                if row not in self.results and row not in self.async_results]
+
+    @staticmethod
+    def get_result_columns(fitness_function=None):
+        """
+        Names of the dalek values of a run (see `get_result_values`)
+        """
+        columns = ['dalek.fitness']
+        target_names = getattr(fitness_function, 'target_names', None)
+        if target_names is not None:
+            columns += ['dalek.fitness.' + target_name
+                        for target_name in target_names]
+        return columns + ['dalek.time_elapsed', 'dalek.engine_id',
+                          'dalek.started', 'dalek.completed']
+
+    def get_result_values(self, result, metadata):
+        """
+        Make the dalek values of a single run from the worker result and the
+        task metadata
+        """
+        values = OrderedDict()
+        target_names = getattr(self.fitness_function, 'target_names', None)
+        if target_names is None:
+            values['dalek.fitness'] = float(result[0])
+        else:
+            values['dalek.fitness'] = float(
+                self.fitness_function.combine_fitness(result[0]))
+            for target_name, fitness in zip(target_names, result[0]):
+                values['dalek.fitness.' + target_name] = float(fitness)
+        values['dalek.time_elapsed'] = (metadata['completed'] -
+                                        metadata['started']).total_seconds()
+        values['dalek.engine_id'] = metadata['engine_id']
+        values['dalek.started'] = datetime_to_seconds(metadata['started'])
+        values['dalek.completed'] = datetime_to_seconds(metadata['completed'])
+        return values
+
+    def get_task_times(self, result, metadata):
+        """
+        Make the phase times of a single run from the timings returned by the
+        worker and the task metadata
+        """
+        task_times = {}
+        task_times['queue_wait'] = (metadata['started'] -
+                                    metadata['submitted']).total_seconds()
+        if metadata.get('received', None) is not None:
+            task_times['result_transfer'] = (
+                metadata['received'] - metadata['completed']).total_seconds()
+        if len(result) > 2:
+            task_times.update(result[2])
+        return task_times
+
+    def collect(self):
+        """
+        Move finished runs from `async_results` to `results`. Runs that
+        raised an exception are moved to `errors` instead.
+
+        Returns
+        -------
+            : ~list of ~int
+            rows that finished successfully since the last call
+        """
+        finished_rows = []
+        for row, async_result in self.async_results.items():
+            if not async_result.ready():
+                continue
+            del self.async_results[row]
+            try:
+                result = async_result.get()
+            except Exception as error:
+                self.errors[row] = error
+                continue
+            finished_rows.append(row)
+            self.results[row] = self.get_result_values(result,
+                                                       async_result.metadata)
+            self.spectra[row] = result[1]
+            self.task_times[row] = self.get_task_times(result,
+                                                       async_result.metadata)
+            if len(result) > 3 and result[3] is not None:
+                self.profile_stats[row] = result[3]
+            if len(result) > 4 and result[4] is not None:
+                self.health[row] = result[4]
+            self.finished_async_results[row] = async_result
+        return finished_rows
+
+    @property
+    def spectra_list(self):
+        """
+        Spectra of all rows (None for runs restored from the journal)
+        """
+        return [self.spectra.get(row, None) for row in xrange(len(self))]
+
+    def to_parameter_collection(self):
+        """
+        Parameter collection with the dalek values of all runs
+        """
+        parameter_collection = self.parameter_collection.copy()
+        for column in self.results[0].keys():
+            parameter_collection[column] = [self.results[row][column]
+                                            for row in xrange(len(self))]
+        parameter_collection['dalek.current_iteration'] = \
+            self.current_iteration
+        return parameter_collection
+
+
 class BaseFitter(object):
     """
     Basic fitter class for Dalek
@@ -382,112 +808,467 @@ class BaseFitter(object):
     Parameters
     ----------
 
+    remote_clients: ~IPython.parallel.Client
+        IPython remote clients (ignored if `launcher` is given)
+
+    fitter_configuration: FitterConfiguration
+
+    worker: func
+        the worker function [default=fitter_worker]
+
+    launcher: ~dalek.parallel.launcher.FitterLauncher
+        a launcher that is already set up (e.g. a
+        `~dalek.parallel.launcher.FitLauncherView` of a shared engine pool),
+        if None a `FitterLauncher` is created [default=None]
 
     """
 
     def __init__(self, remote_clients,
-                 fitter_configuration, worker=fitter_worker):
+                 fitter_configuration, worker=fitter_worker, launcher=None):
 
         self.fitter_configuration = fitter_configuration
         self.default_config = fitter_configuration.default_config
 
-        self.launcher = FitterLauncher(
-            remote_clients, self.fitter_configuration.fitness_function,
-            fitter_configuration.atom_data, worker)
+        if launcher is None:
+            launcher = FitterLauncher(
+                remote_clients, self.fitter_configuration.fitness_function,
+                fitter_configuration.atom_data, worker)
+        self.launcher = launcher
 
-        self.optimizer = self.fitter_configuration.optimizer
+        self.optimizer = self.fitter_configuration.active_optimizer
+        self.polishing = fitter_configuration.polishing
         
 
 
-        self.fitter_log = fitter_configuration.fitter_log
         self.spectral_store = fitter_configuration.spectral_store
+        self.checkpoint = fitter_configuration.checkpoint
+        self.journal = fitter_configuration.journal
+        self.resume_results = fitter_configuration.resume_results
+        self.stopping_criteria = fitter_configuration.stopping_criteria
+        self.stop_reason = None
         self.current_iteration = fitter_configuration.current_iteration
+        self.writer = BackgroundWriter(fitter_configuration.writer_queue_size)
+        if fitter_configuration.trace is not None:
+            self.trace = ChromeTrace(fitter_configuration.trace)
+        else:
+            self.trace = None
+        self.timer = IterationTimer(fitter_configuration.metrics_log,
+                                    trace=self.trace)
+        self.profiler = fitter_configuration.profiler
+        self.engine_monitor = fitter_configuration.engine_monitor
+        self.engine_recycler = fitter_configuration.engine_recycler
+        self.surrogate_screening = fitter_configuration.surrogate_screening
+
+        self.fitter_log = fitter_configuration.fitter_log
+        if self.fitter_log is not None:
+            self.log_writer = FitterLog(self.fitter_log,
+                                        columns=self.get_log_columns())
+        else:
+            self.log_writer = None
+
+        # separate random state so that sampling the profiled runs does not
+        # change the random numbers of the optimizer
+        self.profile_random_state = np.random.RandomState()
         if self.fitter_configuration.resume:
             self.parameter_collection_log = self.fitter_configuration.resume_log
+            self.log_index_offset = self.parameter_collection_log.index.max() + 1
         else:
             self.parameter_collection_log = None
+            self.log_index_offset = 0
 
 
 
-    def clean_dalek_results(self, dalek_results):
-        for msg_id in dalek_results.msg_ids:
-            if msg_id in self.launcher.lbv.results:
-                del self.launcher.lbv.results[msg_id]
+    def get_log_columns(self):
+        """
+        Columns of the fitter log, so that its header is complete when it is
+        created: the parameters, the extra columns of the optimizers, the
+        predictions of the surrogate and the dalek values of the runs
 
-            if msg_id in  self.launcher.remote_clients.results:
-                del self.launcher.remote_clients.results[msg_id]
+        Returns
+        -------
+            : ~list of ~str
+        """
+        columns = list(self.fitter_configuration.parameter_config.parameter_names)
+        optimizers = [self.fitter_configuration.optimizer]
+        if self.polishing is not None:
+            optimizers.append(self.polishing.optimizer)
+        for optimizer in optimizers:
+            columns += [column for column in optimizer.extra_columns
+                        if column not in columns]
+        if self.surrogate_screening is not None:
+            columns += self.surrogate_screening.prediction_columns
+        columns += IterationEvaluation.get_result_columns(
+            self.fitter_configuration.fitness_function)
+        return columns + ['dalek.current_iteration']
 
-            if msg_id in self.launcher.remote_clients.metadata:
-                del self.launcher.remote_clients.metadata[msg_id]
+    def clean_dalek_results(self, dalek_results):
+        self.launcher.clean_results(dalek_results)
 
-    def evaluate_parameter_collection(self, parameter_collection):
-        config_dict_list = parameter_collection.to_config(self.default_config)
-        fitnesses_result = self.launcher.queue_parameter_set_list(
-            config_dict_list)
+    def start_evaluation(self, parameter_collection):
+        """
+        Prepare the evaluation of a parameter collection in the current
+        iteration. Runs that were already finished before the fitter was
+        resumed are taken from the journal, otherwise the dispatch is recorded
+        in the journal.
 
-        while fitnesses_result.progress < len(fitnesses_result):
-            fitnesses_result.wait(timeout=1)
-            sys.stdout.write('\r{0}/{1} TARDIS runs done for current iteration'.format(
-                fitnesses_result.progress, len(fitnesses_result)))
-            sys.stdout.flush()
-        print ' - done with iterations'
-        fitnesses = zip(*fitnesses_result.result)[0]
-        spectra = zip(*fitnesses_result.result)[1]
+        Parameters
+        ----------
 
-        self.clean_dalek_results(fitnesses_result)
+        parameter_collection: ~dalek.parallel.ParameterCollection
 
-        parameter_collection['dalek.fitness'] = fitnesses
-        parameter_collection['dalek.time_elapsed'] = [(item['completed'] -
-                                                       item['started']).
-                                                          total_seconds()
-                                                      for item in
-                                                      fitnesses_result.metadata]
-        parameter_collection['dalek.engine_id'] = [item['engine_id']
-                                                   for item in
-                                                   fitnesses_result.metadata]
-        parameter_collection['dalek.current_iteration'] = self.current_iteration
+        Returns
+        -------
+            : IterationEvaluation
+        """
+        self.timer.start_iteration(self.current_iteration)
+        with self.timer.phase(self.current_iteration, 'to_config'):
+            evaluation = IterationEvaluation(
+                parameter_collection, self.current_iteration,
+                self.log_index_offset, self.default_config,
+                fitness_function=self.fitter_configuration.fitness_function)
+
+        if self.resume_results is not None:
+            evaluation.results.update(self.resume_results)
+            self.resume_results = None
+        elif self.journal is not None:
+            self.writer.submit(
+                self.timer.timed(self.current_iteration, 'journal',
+                                 self.journal.dispatch),
+                self.current_iteration, evaluation.parameter_collection)
+
+        return evaluation
+
+    def submit_evaluation(self, evaluation, rows=None):
+        """
+        Submit the (given) rows of an evaluation that are not finished and not
+        in flight to the launcher
+        """
+        if rows is None:
+            rows = evaluation.pending_rows
+        with self.timer.phase(evaluation.current_iteration, 'dispatch'):
+            for row in rows:
+                worker_kwargs = {}
+                if (self.profiler is not None and
+                        self.profile_random_state.uniform() <
+                        self.profiler.fraction):
+                    worker_kwargs['profile'] = True
+                evaluation.async_results[row] = \
+                    self.launcher.queue_parameter_set(
+                        evaluation.config_list[row], **worker_kwargs)
+
+    def collect_evaluation_results(self, evaluation):
+        """
+        Collect all finished runs of the evaluation and queue storing their
+        spectra and recording them in the journal. If any of the runs failed, the error is
+        raised after the successful runs have been recorded.
 
+        Returns
+        -------
+            : ~list of ~int
+            rows that finished since the last call
+        """
+        current_iteration = evaluation.current_iteration
+        with self.timer.phase(current_iteration, 'collect'):
+            finished_rows = evaluation.collect()
+
+        with self.timer.phase(current_iteration, 'clean_results'):
+            for row in finished_rows:
+                self.clean_dalek_results(
+                    evaluation.finished_async_results.pop(row))
+
+        for row in finished_rows:
+            self.timer.add_task(current_iteration, evaluation.task_times[row])
+            if self.trace is not None:
+                result_values = evaluation.results[row]
+                self.trace.add_task(
+                    result_values['dalek.engine_id'],
+                    result_values['dalek.started'],
+                    result_values['dalek.completed'],
+                    evaluation.index_offset + row, current_iteration,
+                    result_values['dalek.fitness'])
+
+        if self.profiler is not None:
+            for row in finished_rows:
+                if row in evaluation.profile_stats:
+                    self.writer.submit(self.profiler.add, current_iteration,
+                                       evaluation.results[row]['dalek.engine_id'],
+                                       evaluation.profile_stats.pop(row))
+
+        for row in finished_rows:
+            health = evaluation.health.pop(row, None)
+            result_values = evaluation.results[row]
+            if self.engine_monitor is not None and health is not None:
+                self.engine_monitor.add_heartbeat(
+                    result_values['dalek.engine_id'], health,
+                    runtime=result_values['dalek.time_elapsed'])
+            if self.engine_recycler is not None:
+                self.engine_recycler.add_task(result_values['dalek.engine_id'],
+                                              health)
+        if self.engine_recycler is not None:
+            self.engine_recycler.update(self.launcher)
+
+        if self.spectral_store is not None and finished_rows:
+            self.writer.submit(
+                self.timer.timed(current_iteration, 'spectral_store',
+                                 self.spectral_store.store_spectra),
+                [evaluation.spectra[row] for row in finished_rows],
+                [evaluation.index_offset + row for row in finished_rows])
+
+        if self.journal is not None:
+            for row in finished_rows:
+                self.writer.submit(
+                    self.timer.timed(current_iteration, 'journal',
+                                     self.journal.record_result),
+                    current_iteration, row, evaluation.results[row])
+
+        if evaluation.errors:
+            raise evaluation.errors[min(evaluation.errors)]
+
+        return finished_rows
 
+    def evaluate_parameter_collection(self, parameter_collection):
+        evaluation = self.start_evaluation(parameter_collection)
+        self.submit_evaluation(evaluation)
+
+        while not evaluation.done:
+            with self.timer.phase(self.current_iteration, 'wait'):
+                self.launcher.wait(evaluation.async_results.values(),
+                                   timeout=1)
+            self.collect_evaluation_results(evaluation)
+            sys.stdout.write('\r{0}/{1} TARDIS runs done for current iteration'.format(
+                len(evaluation.results), len(evaluation)))
+            sys.stdout.flush()
+        print ' - done with iterations'
 
-        return parameter_collection, spectra
+        return evaluation.to_parameter_collection(), evaluation.spectra_list
 
 
     def run_single_fitter_iteration(self, parameter_collection):
         evaluated_parameter_collection, spectra = (
             self.evaluate_parameter_collection(parameter_collection))
 
+        return self.finish_iteration(evaluated_parameter_collection)
 
+    def finish_iteration(self, evaluated_parameter_collection):
+        """
+        Log the evaluated parameter collection, check the stopping criteria
+        and run the optimizer
+
+        Parameters
+        ----------
 
+        evaluated_parameter_collection: ~dalek.parallel.ParameterCollection
+
+        Returns
+        -------
+            : ~dalek.parallel.ParameterCollection
+            parameters for the next iteration
+        """
+        logged_parameter_collection = evaluated_parameter_collection.copy()
+        logged_parameter_collection.index = np.arange(
+            self.log_index_offset,
+            self.log_index_offset + len(logged_parameter_collection))
+        self.log_index_offset += len(logged_parameter_collection)
 
         if self.parameter_collection_log is None:
-            self.parameter_collection_log = evaluated_parameter_collection.copy()
+            self.parameter_collection_log = logged_parameter_collection
         else:
             self.parameter_collection_log = self.parameter_collection_log.append(
-                evaluated_parameter_collection, ignore_index=True)
+                logged_parameter_collection)
+
+        if self.log_writer is not None:
+            self.writer.submit(
+                self.timer.timed(self.current_iteration, 'log_write',
+                                 self.log_writer.append),
+                logged_parameter_collection)
+
+        if self.journal is not None:
+            self.writer.submit(
+                self.timer.timed(self.current_iteration, 'journal',
+                                 self.journal.commit),
+                self.current_iteration)
+
+        if 'dalek.started' in logged_parameter_collection.columns:
+            self.log_iteration_utilization(logged_parameter_collection)
+
+        if self.stopping_criteria is not None:
+            self.stop_reason = self.stopping_criteria(
+                evaluated_parameter_collection)
+
+        if self.surrogate_screening is not None:
+            self.log_surrogate_accuracy(evaluated_parameter_collection)
+            self.surrogate_screening.update(evaluated_parameter_collection)
+
+        with self.timer.phase(self.current_iteration, 'optimizer'):
+            if (self.polishing is not None and not self.polishing.active and
+                    self.polishing.update(evaluated_parameter_collection)):
+                new_parameter_collection = self.polishing.start()
+                self.optimizer = self.polishing.optimizer
+                if self.surrogate_screening is not None:
+                    new_parameter_collection = \
+                        self.surrogate_screening.add_prediction_columns(
+                            new_parameter_collection)
+            elif self.surrogate_screening is not None:
+                new_parameter_collection = self.surrogate_screening(
+                    self.optimizer, evaluated_parameter_collection)
+            else:
+                new_parameter_collection = self.optimizer(
+                    evaluated_parameter_collection)
+
+        if (self.polishing is not None and self.polishing.converged and
+                self.stop_reason is None):
+            self.stop_reason = 'local polishing converged'
+        return new_parameter_collection
 
+    def log_surrogate_accuracy(self, evaluated_parameter_collection):
+        error = self.surrogate_screening.prediction_error(
+            evaluated_parameter_collection)
+        if error['predicted'] < 2:
+            return
+        logger.info('Iteration {0}: surrogate RMSE {1:.4g}, rank correlation '
+                    '{2:.2f}, {3:.1%} within uncertainty'.format(
+            self.current_iteration, error['rmse'], error['rank_correlation'],
+            error['within_uncertainty']))
 
-        if self.spectral_store is not None:
-            self.spectral_store.store_spectra(
-                spectra, self.parameter_collection_log.index[-len(spectra):])
+    @property
+    def number_of_engines(self):
+        return self.launcher.number_of_engines
 
-        new_parameter_collection = self.optimizer(
-            evaluated_parameter_collection)
-        return new_parameter_collection
+    def engine_utilization(self):
+        """
+        Engine utilization of the fit so far. On a shared engine pool (see
+        `~dalek.fitter.FitManager`) only the runs of this fit are counted.
+        If the fitter log is written, only the columns that are needed are
+        read from it, so that the iterations before a resume are included.
 
-    def run_fitter(self, initial_parameters):
+        Returns
+        -------
+            : ~dalek.fitter.utilization.EngineUtilization
+        """
+        if self.log_writer is not None and self.log_writer.exists:
+            self.writer.flush()
+            fitter_log = self.log_writer.read(
+                columns=EngineUtilization.required_columns +
+                ['dalek.current_iteration'])
+        else:
+            fitter_log = self.parameter_collection_log
+        return EngineUtilization(fitter_log,
+                                 number_of_engines=self.number_of_engines)
+
+    def log_iteration_utilization(self, logged_parameter_collection):
+        iteration = EngineUtilization(
+            logged_parameter_collection,
+            number_of_engines=self.number_of_engines).iterations.iloc[0]
+        logger.info('Iteration {0}: engines busy {1:.1%}, lost at barrier '
+                    '{2:.1%}, {3:.1f} runs per core-hour'.format(
+            self.current_iteration, iteration['busy_fraction'],
+            iteration['barrier_fraction'], iteration['runs_per_core_hour']))
+
+    def check_engine_health(self):
+        """
+        Warn about degraded engines (and stop scheduling runs to them if
+        configured) and queue writing the heartbeats to the health log
+        """
+        degraded_engines = self.engine_monitor.check()
+        if self.engine_monitor.exclude_degraded:
+            self.launcher.exclude_engines(
+                degraded_engines, min_engines=self.engine_monitor.min_engines)
+        self.writer.submit(self.engine_monitor.write,
+                           self.engine_monitor.pop_pending_heartbeats())
+
+    def save_checkpoint(self):
+        """
+        Queue writing the checkpoint for the next iteration. The optimizer
+        state is copied as the optimizer may change it in place while the
+        checkpoint is written.
+        """
+        optimizer_state = dict((key, np.copy(value)) for key, value in
+                               self.optimizer.get_state().items())
+        fitter_state = {}
+        if self.stop_reason is not None:
+            fitter_state['stop_reason'] = self.stop_reason
+        if self.stopping_criteria is not None:
+            fitter_state.update(self.stopping_criteria.get_state())
+        if self.polishing is not None:
+            for key, value in self.polishing.get_state().items():
+                fitter_state['polishing.' + key] = value
+        if self.surrogate_screening is not None:
+            for key, value in self.surrogate_screening.get_state().items():
+                fitter_state['surrogate.' + key] = np.copy(value)
+        self.writer.submit(self.timer.timed(self.current_iteration,
+                                            'checkpoint', self.checkpoint.save),
+                           self.current_iteration + 1,
+                           optimizer_state, self.current_parameters.copy(),
+                           random_state=np.random.get_state(),
+                           fitter_state=fitter_state)
+
+    def start_fit(self, initial_parameters):
+        """
+        Prepare running the fit from the given parameters
+        """
+        # the extra columns have to be in the header of the fitter log
+        initial_parameters = self.optimizer.add_extra_columns(
+            initial_parameters)
+        if (self.surrogate_screening is not None and
+                'dalek.surrogate_prediction' not in initial_parameters.columns):
+            # the columns have to be in the header of the fitter log
+            initial_parameters = \
+                self.surrogate_screening.add_prediction_columns(
+                    initial_parameters)
         self.current_parameters = initial_parameters
+        self.stop_reason = None
+        if self.stopping_criteria is not None:
+            self.stopping_criteria.start()
+
+    def advance_iteration(self, new_parameter_collection):
+        """
+        Store the parameters for the next iteration, write the checkpoint
+        (including the reason if the fit stops) and the timing metrics and
+        increase the iteration counter
+        """
+        self.current_parameters = new_parameter_collection
+        if (self.stop_reason is None and self.current_iteration + 1 >=
+                self.fitter_configuration.max_iterations):
+            self.stop_reason = 'maximum number of iterations reached'
+        if self.checkpoint is not None:
+            self.save_checkpoint()
+        if self.profiler is not None:
+            self.writer.submit(self.profiler.finish_iteration,
+                               self.current_iteration)
+        if self.engine_monitor is not None:
+            self.check_engine_health()
+        self.writer.submit(self.timer.finish_iteration, self.current_iteration)
+
+        self.current_iteration += 1
 
+    @property
+    def finished(self):
+        return (self.stop_reason is not None or self.current_iteration >=
+                self.fitter_configuration.max_iterations)
 
-        while self.current_iteration < self.fitter_configuration.max_iterations:
-            logger.info('\n\nAt iteration {0} of {1}\n'.format(
-                self.current_iteration + 1,
-                self.fitter_configuration.max_iterations))
-            self.current_parameters = self.run_single_fitter_iteration(
-                self.current_parameters)
-            if self.fitter_log is not None:
-                self.parameter_collection_log.to_csv(self.fitter_log)
+    def end_fit(self):
+        """
+        Wait for all pending writes and report why the fit stopped
+        """
+        self.writer.flush()
+        logger.info('Stopping fit after iteration {0}: {1}'.format(
+            self.current_iteration, self.stop_reason))
+        self.timer.log_summary()
+        if self.trace is not None:
+            self.trace.flush()
 
-            self.current_iteration += 1
+    def run_fitter(self, initial_parameters):
+        self.start_fit(initial_parameters)
+
+        try:
+            while not self.finished:
+                logger.info('\n\nAt iteration {0} of {1}\n'.format(
+                    self.current_iteration + 1,
+                    self.fitter_configuration.max_iterations))
+                self.advance_iteration(self.run_single_fitter_iteration(
+                    self.current_parameters))
+        finally:
+            self.end_fit()
 
         
             
@@ -0,0 +1,132 @@
+import logging
+import os
+
+import numpy as np
+
+from dalek.parallel.parameter_collection import ParameterCollection
+
+logger = logging.getLogger(__name__)
+
+
+class OptimizerCheckpoint(object):
+    """
+    Compressed numpy checkpoint of the optimizer state, the numpy random state
+    and the parameter collection that is evaluated next. The checkpoint is
+    written to a temporary file first and then renamed, so a crash while
+    writing never leaves a corrupt checkpoint behind.
+
+    Parameters
+    ----------
+
+    fname: ~str
+        path to the checkpoint file (numpy .npz format)
+
+    """
+
+    optimizer_prefix = 'optimizer.'
+    fitter_prefix = 'fitter.'
+
+    def __init__(self, fname):
+        self.fname = fname
+
+    @property
+    def exists(self):
+        return os.path.exists(self.fname)
+
+    def save(self, current_iteration, optimizer_state, parameter_collection,
+             random_state=None, fitter_state=None):
+        """
+        Save the checkpoint
+
+        Parameters
+        ----------
+
+        current_iteration: ~int
+            iteration at which `parameter_collection` will be evaluated
+
+        optimizer_state: ~dict
+            dictionary of arrays describing the optimizer state (see
+            `~dalek.fitter.BaseOptimizer.get_state`)
+
+        parameter_collection: ~dalek.parallel.ParameterCollection
+            parameters that will be evaluated in `current_iteration`
+
+        random_state: ~tuple
+            numpy random state as returned by `numpy.random.get_state`. If
+            None the current state is used [default=None]
+
+        fitter_state: ~dict
+            additional state of the fitter (e.g. of the stopping criteria)
+            [default=None]
+
+        """
+        if random_state is None:
+            random_state = np.random.get_state()
+
+        checkpoint_dict = {}
+        for key, value in optimizer_state.items():
+            checkpoint_dict[self.optimizer_prefix + key] = np.asarray(value)
+        if fitter_state is not None:
+            for key, value in fitter_state.items():
+                checkpoint_dict[self.fitter_prefix + key] = np.asarray(value)
+
+        (_, random_keys, random_pos, random_has_gauss,
+         random_cached_gaussian) = random_state
+        checkpoint_dict['random_state.keys'] = random_keys
+        checkpoint_dict['random_state.position'] = random_pos
+        checkpoint_dict['random_state.has_gauss'] = random_has_gauss
+        checkpoint_dict['random_state.cached_gaussian'] = \
+            random_cached_gaussian
+
+        checkpoint_dict['parameters.values'] = np.asarray(
+            parameter_collection.values, dtype=np.float64)
+        checkpoint_dict['parameters.columns'] = np.array(
+            parameter_collection.columns.tolist())
+        checkpoint_dict['dalek.current_iteration'] = current_iteration
+
+        tmp_fname = self.fname + '.tmp'
+        with open(tmp_fname, 'wb') as fh:
+            np.savez_compressed(fh, **checkpoint_dict)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.rename(tmp_fname, self.fname)
+
+    def load(self):
+        """
+        Load the checkpoint
+
+        Returns
+        -------
+
+        current_iteration: ~int
+
+        optimizer_state: ~dict
+
+        parameter_collection: ~dalek.parallel.ParameterCollection
+
+        random_state: ~tuple
+            state to be passed to `numpy.random.set_state`
+
+        fitter_state: ~dict
+
+        """
+        with np.load(self.fname) as checkpoint:
+            optimizer_state = dict(
+                (key[len(self.optimizer_prefix):], checkpoint[key])
+                for key in checkpoint.files
+                if key.startswith(self.optimizer_prefix))
+            fitter_state = dict(
+                (key[len(self.fitter_prefix):], checkpoint[key])
+                for key in checkpoint.files
+                if key.startswith(self.fitter_prefix))
+            random_state = ('MT19937', checkpoint['random_state.keys'],
+                            int(checkpoint['random_state.position']),
+                            int(checkpoint['random_state.has_gauss']),
+                            float(checkpoint['random_state.cached_gaussian']))
+            parameter_collection = ParameterCollection(
+                checkpoint['parameters.values'],
+                columns=checkpoint['parameters.columns'].tolist())
+            current_iteration = int(checkpoint['dalek.current_iteration'])
+
+        return current_iteration, optimizer_state, parameter_collection, \
+               random_state, fitter_state
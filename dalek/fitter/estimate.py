@@ -0,0 +1,349 @@
+import logging
+from collections import OrderedDict
+from time import time
+
+import numpy as np
+
+from dalek.fitter.base import FitterConfiguration, IterationEvaluation, \
+    connect_to_engines
+from dalek.fitter.replay import SchedulerReplay
+from dalek.parallel.launcher import FitterLauncher, fitter_worker
+from dalek.parallel.parameter_collection import ParameterCollection
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_fit(dalek_configuration_fname, number_of_calibration_samples=None,
+                 init_sleep_time=300):
+    """
+    Estimate the cost of the fit with the given configuration name from a
+    calibration sample of TARDIS runs on the connected engines. Nothing is
+    written to the fitter log or the spectral store.
+
+    Parameters
+    ----------
+
+    dalek_configuration_fname: ~str
+        file name of the YAML configuration file for Dalek
+
+    number_of_calibration_samples: ~int
+        see `CostEstimator.calibrate` [default=None]
+
+    init_sleep_time: ~float
+        time to sleep (in seconds) until to try again to see
+        if engines have connected (default 300s)
+
+    Returns
+    -------
+        : CostEstimator
+    """
+    rc = connect_to_engines(init_sleep_time)
+
+    fitter_configuration = FitterConfiguration.from_yaml(
+        dalek_configuration_fname, dry_run=True)
+
+    launcher = FitterLauncher(rc, fitter_configuration.fitness_function,
+                              fitter_configuration.atom_data, fitter_worker)
+    estimator = CostEstimator(fitter_configuration, launcher)
+    estimator.calibrate(number_of_calibration_samples)
+    return estimator
+
+
+class RuntimeModel(object):
+    """
+    Model of the TARDIS runtime over the parameter bounds: the logarithm of
+    the runtime is linear in the parameters scaled to [0, 1] with normally
+    distributed residuals. With fewer runs than parameters + 2 only the mean
+    and scatter of the logarithm are used.
+
+    Parameters
+    ----------
+
+    parameter_config: ~dalek.fitter.base.ParameterConfiguration
+
+    """
+
+    def __init__(self, parameter_config):
+        self.parameter_config = parameter_config
+        self.coefficients = None
+        self.sigma = None
+
+    def scale(self, parameter_collection):
+        lbounds = self.parameter_config.lbounds
+        ubounds = self.parameter_config.ubounds
+        scaled = ((parameter_collection[
+            self.parameter_config.parameter_names].values - lbounds) /
+                  np.where(ubounds > lbounds, ubounds - lbounds, 1.))
+        return np.hstack((np.ones((len(scaled), 1)), scaled))
+
+    def fit(self, parameter_collection, runtimes):
+        """
+        Fit the model to the runtimes (in seconds) of the parameter collection
+        """
+        log_runtimes = np.log(np.maximum(runtimes, 1e-6))
+        design = self.scale(parameter_collection)
+        if len(log_runtimes) >= design.shape[1] + 1:
+            self.coefficients = np.linalg.lstsq(design, log_runtimes,
+                                                rcond=None)[0]
+            degrees_of_freedom = len(log_runtimes) - design.shape[1]
+        else:
+            self.coefficients = np.zeros(design.shape[1])
+            self.coefficients[0] = log_runtimes.mean()
+            degrees_of_freedom = len(log_runtimes) - 1
+
+        residuals = log_runtimes - design.dot(self.coefficients)
+        if degrees_of_freedom > 0:
+            self.sigma = np.sqrt(np.sum(residuals ** 2) / degrees_of_freedom)
+        else:
+            self.sigma = 0.0
+
+    def predict(self, parameter_collection):
+        """
+        Median runtimes of the parameter collection
+
+        Returns
+        -------
+            : ~np.ndarray
+        """
+        return np.exp(self.scale(parameter_collection).dot(self.coefficients))
+
+    def sample(self, parameter_collection, random_state=np.random):
+        """
+        Draw runtimes of the parameter collection including the scatter
+
+        Returns
+        -------
+            : ~np.ndarray
+        """
+        return self.predict(parameter_collection) * np.exp(
+            random_state.normal(0, self.sigma, len(parameter_collection)))
+
+
+class CostEstimator(object):
+    """
+    Predict the cost of a fit (`number_of_samples` x `max_iterations` TARDIS
+    runs) from a calibration sample. The calibration runs are drawn uniformly
+    from the parameter bounds and run on the launcher like an iteration of the
+    fitter. The wall time is predicted by replaying runtimes drawn from a
+    `RuntimeModel` through the barrier policy of
+    `~dalek.fitter.replay.SchedulerReplay`, the spectral store and fitter log
+    sizes are extrapolated from the calibration results.
+
+    Parameters
+    ----------
+
+    fitter_configuration: ~dalek.fitter.FitterConfiguration
+
+    launcher:
+        launcher to run the calibration on
+
+    store_spectra: ~bool
+        whether the fit stores all spectra, if None whether the configuration
+        has a spectral store (opened or not) [default=None]
+
+    """
+
+    def __init__(self, fitter_configuration, launcher, store_spectra=None):
+        self.fitter_configuration = fitter_configuration
+        self.launcher = launcher
+        if store_spectra is None:
+            store_spectra = (
+                fitter_configuration.spectral_store is not None or
+                fitter_configuration.spectral_store_conf is not None)
+        self.store_spectra = store_spectra
+        self.runtime_model = RuntimeModel(fitter_configuration.parameter_config)
+        self.calibration_log = None
+        self.calibration_failures = 0
+        self.driver_time_per_run = None
+        self.spectrum_size = None
+        self.log_row_size = None
+        self.log_header_size = None
+
+    @property
+    def number_of_engines(self):
+        return self.launcher.number_of_engines
+
+    def get_calibration_parameter_collection(self, number_of_samples):
+        parameter_config = self.fitter_configuration.parameter_config
+        parameter_collection = ParameterCollection(
+            np.random.uniform(parameter_config.lbounds,
+                              parameter_config.ubounds,
+                              (number_of_samples,
+                               len(parameter_config.parameter_names))),
+            columns=parameter_config.parameter_names)
+        return self.fitter_configuration.optimizer.\
+            normalize_parameter_collection(parameter_collection)
+
+    def calibrate(self, number_of_samples=None, timeout=1):
+        """
+        Run the calibration sample and fit the runtime model
+
+        Parameters
+        ----------
+
+        number_of_samples: ~int
+            number of calibration runs, if None the larger of the number of
+            engines and the number of parameters + 2 [default=None]
+
+        timeout: ~float
+            time in seconds to wait for results before checking again
+            [default=1]
+        """
+        if number_of_samples is None:
+            number_of_samples = max(
+                self.number_of_engines,
+                len(self.fitter_configuration.parameter_config.parameter_names)
+                + 2)
+        logger.info('Running {0:d} calibration runs on {1:d} engines'.format(
+            number_of_samples, self.number_of_engines))
+
+        driver_time = 0.0
+        start_time = time()
+        evaluation = IterationEvaluation(
+            self.get_calibration_parameter_collection(number_of_samples), 0, 0,
+            self.fitter_configuration.default_config,
+            fitness_function=self.fitter_configuration.fitness_function)
+        for row in xrange(number_of_samples):
+            evaluation.async_results[row] = self.launcher.queue_parameter_set(
+                evaluation.config_list[row])
+        driver_time += time() - start_time
+
+        spectrum_sizes = []
+        while evaluation.async_results:
+            self.launcher.wait(evaluation.async_results.values(),
+                               timeout=timeout)
+            start_time = time()
+            for row in evaluation.collect():
+                self.launcher.clean_results(
+                    evaluation.finished_async_results.pop(row))
+                flux_lambda = getattr(evaluation.spectra[row], 'flux_lambda',
+                                      None)
+                if flux_lambda is not None:
+                    spectrum_sizes.append(np.asarray(flux_lambda).nbytes)
+            driver_time += time() - start_time
+
+        self.calibration_failures = len(evaluation.errors)
+        if not evaluation.results:
+            raise ValueError('All {0:d} calibration runs failed'.format(
+                number_of_samples))
+        for row, error in evaluation.errors.items():
+            logger.warning('Calibration run {0:d} failed: {1}'.format(row,
+                                                                     error))
+
+        rows = sorted(evaluation.results)
+        calibration_log = evaluation.parameter_collection.loc[rows].copy()
+        for column in evaluation.results[rows[0]].keys():
+            calibration_log[column] = [evaluation.results[row][column]
+                                       for row in rows]
+        calibration_log['dalek.current_iteration'] = 0
+        self.calibration_log = calibration_log
+
+        self.runtime_model.fit(calibration_log,
+                               calibration_log['dalek.time_elapsed'].values)
+        self.driver_time_per_run = driver_time / number_of_samples
+        self.spectrum_size = np.median(spectrum_sizes) if spectrum_sizes \
+            else 0.0
+        log_lines = calibration_log.to_csv().splitlines(True)
+        self.log_header_size = len(log_lines[0])
+        self.log_row_size = (sum([len(line) for line in log_lines[1:]]) /
+                             float(len(log_lines) - 1))
+
+    def estimate(self, simulated_iterations=10, seed=None):
+        """
+        Predict the cost of the fit
+
+        Parameters
+        ----------
+
+        simulated_iterations: ~int
+            number of iterations that are simulated, the wall time is scaled
+            to `max_iterations` [default=10]
+
+        seed: ~int
+            seed for the simulated parameters and runtimes [default=None]
+
+        Returns
+        -------
+            : ~collections.OrderedDict
+            number of runs, predicted wall time (in seconds), allocated
+            core-hours (engines x wall time), busy core-hours (time spent in
+            TARDIS runs) and the sizes of the spectral store and the fitter
+            log (in bytes)
+        """
+        if self.calibration_log is None:
+            raise ValueError('No calibration - run calibrate first')
+
+        number_of_samples = self.fitter_configuration.number_of_samples
+        max_iterations = self.fitter_configuration.max_iterations
+        simulated_iterations = min(simulated_iterations, max_iterations)
+        random_state = np.random.RandomState(seed)
+
+        state = np.random.get_state()
+        np.random.seed(random_state.randint(2 ** 31))
+        try:
+            simulated_log = self.get_calibration_parameter_collection(
+                number_of_samples * simulated_iterations)
+        finally:
+            np.random.set_state(state)
+        simulated_log['dalek.time_elapsed'] = self.runtime_model.sample(
+            simulated_log, random_state)
+        simulated_log['dalek.current_iteration'] = (
+            np.arange(len(simulated_log)) // number_of_samples)
+
+        replay = SchedulerReplay(
+            simulated_log, number_of_engines=self.number_of_engines,
+            driver_time=self.driver_time_per_run * number_of_samples)
+        simulated_makespan = replay.simulate('barrier')['makespan']
+        iteration_scale = max_iterations / float(simulated_iterations)
+
+        number_of_runs = number_of_samples * max_iterations
+        wall_time = simulated_makespan * iteration_scale
+        estimate = OrderedDict()
+        estimate['number_of_engines'] = self.number_of_engines
+        estimate['calibration_runs'] = len(self.calibration_log)
+        estimate['calibration_failures'] = self.calibration_failures
+        estimate['median_runtime'] = np.median(
+            self.calibration_log['dalek.time_elapsed'])
+        estimate['runtime_sigma'] = self.runtime_model.sigma
+        estimate['number_of_runs'] = number_of_runs
+        estimate['wall_time'] = wall_time
+        estimate['core_hours'] = self.number_of_engines * wall_time / 3600.
+        estimate['busy_core_hours'] = (
+            simulated_log['dalek.time_elapsed'].sum() * iteration_scale /
+            3600.)
+        if self.store_spectra:
+            estimate['spectral_store_size'] = (self.spectrum_size *
+                                               number_of_runs)
+        else:
+            estimate['spectral_store_size'] = 0.0
+        estimate['fitter_log_size'] = (self.log_header_size +
+                                       self.log_row_size * number_of_runs)
+        return estimate
+
+    def report(self, **kwargs):
+        """
+        Human-readable summary of `estimate`
+
+        Returns
+        -------
+            : ~str
+        """
+        estimate = self.estimate(**kwargs)
+        lines = [
+            'Calibration: {0:d} runs ({1:d} failed) on {2:d} engines, median '
+            'runtime {3:.1f} s (log scatter {4:.2f})'.format(
+                estimate['calibration_runs'], estimate['calibration_failures'],
+                estimate['number_of_engines'], estimate['median_runtime'],
+                estimate['runtime_sigma']),
+            'Fit: {0:d} samples x {1:d} iterations = {2:d} runs'.format(
+                self.fitter_configuration.number_of_samples,
+                self.fitter_configuration.max_iterations,
+                estimate['number_of_runs']),
+            'Wall time: {0:.2f} h'.format(estimate['wall_time'] / 3600.),
+            'Core-hours: {0:.1f} allocated, {1:.1f} busy'.format(
+                estimate['core_hours'], estimate['busy_core_hours']),
+            'Spectral store: {0:.1f} MB'.format(
+                estimate['spectral_store_size'] / 1024. ** 2),
+            'Fitter log: {0:.1f} MB'.format(
+                estimate['fitter_log_size'] / 1024. ** 2)]
+        return '\n'.join(lines)
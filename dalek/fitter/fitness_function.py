@@ -1,4 +1,5 @@
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
 import numpy as np
 from specutils import Spectrum1D
 from astropy import units as u, constants as const
@@ -37,20 +38,83 @@ class SimpleRMSFitnessFunction(BaseFitnessFunction):
         self.observed_spectrum_wavelength = self.observed_spectrum.wavelength.value
         self.observed_spectrum_flux = self.observed_spectrum.flux.value
 
-    def __call__(self, radial1d_mdl):
-
+    @staticmethod
+    def get_synthetic_spectrum(radial1d_mdl):
         if radial1d_mdl.spectrum_virtual.flux_nu.sum() > 0:
-            synth_spectrum = radial1d_mdl.spectrum_virtual
+            return radial1d_mdl.spectrum_virtual
         else:
-            synth_spectrum = radial1d_mdl.spectrum
+            return radial1d_mdl.spectrum
+
+    def evaluate_spectrum(self, synth_spectrum):
         synth_spectrum_flux = np.interp(self.observed_spectrum_wavelength,
                                         synth_spectrum.wavelength.value[::-1],
                                         synth_spectrum.flux_lambda.value[::-1])
 
-        fitness = np.sum((synth_spectrum_flux -
-                          self.observed_spectrum_flux) ** 2)
+        return np.sum((synth_spectrum_flux -
+                       self.observed_spectrum_flux) ** 2)
+
+    def __call__(self, radial1d_mdl):
+        synth_spectrum = self.get_synthetic_spectrum(radial1d_mdl)
+        fitness = self.evaluate_spectrum(synth_spectrum)
+
+        return fitness, synth_spectrum
+
+
+class MultiTargetRMSFitnessFunction(BaseFitnessFunction):
+    """
+    Evaluate a single TARDIS model against several observed spectra (e.g. an
+    epoch series or different reductions of the same observation). The
+    fitness is an array with one entry per target; the fitter logs each of
+    them in a 'dalek.fitness.<target_name>' column and uses the weighted sum
+    as 'dalek.fitness'.
+
+    Parameters
+    ----------
+
+    spectra: ~dict or ~list
+        mapping of target names to spectrum file names. A list of file names
+        names the targets 'target0', 'target1', ...
+
+    weights: ~dict
+        weight of each target in the combined fitness, targets that are not
+        given have weight 1. A weight of 0 only logs the fitness of that
+        target [default=None]
+
+    """
+
+    def __init__(self, spectra, weights=None):
+        if not hasattr(spectra, 'items'):
+            spectra = OrderedDict(('target{0:d}'.format(i), spectrum)
+                                  for i, spectrum in enumerate(spectra))
+
+        self.targets = OrderedDict(
+            (target_name, SimpleRMSFitnessFunction(spectrum))
+            for target_name, spectrum in spectra.items())
+
+        if weights is None:
+            weights = {}
+        self.weights = np.array([weights.get(target_name, 1.)
+                                 for target_name in self.target_names],
+                                dtype=np.float64)
+
+    @property
+    def target_names(self):
+        return self.targets.keys()
+
+    def combine_fitness(self, fitness):
+        """
+        Combine the fitness of all targets into a single value
+        """
+        return np.dot(self.weights, fitness)
+
+    def __call__(self, radial1d_mdl):
+        synth_spectrum = SimpleRMSFitnessFunction.get_synthetic_spectrum(
+            radial1d_mdl)
+        fitness = np.array([target.evaluate_spectrum(synth_spectrum)
+                            for target in self.targets.values()])
 
         return fitness, synth_spectrum
 
 
-fitness_function_dict = {'simple_rms': SimpleRMSFitnessFunction}
\ No newline at end of file
+fitness_function_dict = {'simple_rms': SimpleRMSFitnessFunction,
+                         'multi_target_rms': MultiTargetRMSFitnessFunction}
\ No newline at end of file
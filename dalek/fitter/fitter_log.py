@@ -0,0 +1,255 @@
+import csv
+import logging
+import os
+from StringIO import StringIO
+
+import pandas as pd
+
+from dalek.parallel.parameter_collection import ParameterCollection
+
+logger = logging.getLogger(__name__)
+
+
+class FitterLog(object):
+    """
+    Append-only CSV log of all evaluated parameter sets. Every iteration only
+    the new rows are written and finding the last iteration only reads the
+    header and the rows of the last iteration by scanning the file backwards
+    from its end.
+
+    Parameters
+    ----------
+
+    fname: ~str
+        path to the CSV file
+
+    iteration_column: ~str
+        name of the column holding the iteration number
+        [default='dalek.current_iteration']
+
+    block_size: ~int
+        number of bytes read at a time when scanning backwards
+        [default=65536]
+
+    columns: ~list of ~str
+        columns of the header when the log is created. Columns of the first
+        rows that are not in the list are added after them. If None, the
+        columns of the first rows are used [default=None]
+
+    """
+
+    def __init__(self, fname, iteration_column='dalek.current_iteration',
+                 block_size=65536, columns=None):
+        self.fname = fname
+        self.iteration_column = iteration_column
+        self.block_size = block_size
+        self.initial_columns = columns
+        self._header = None
+
+    @property
+    def exists(self):
+        return os.path.exists(self.fname) and os.path.getsize(self.fname) > 0
+
+    @property
+    def header(self):
+        """
+        Header line of the log (including the leading index field)
+        """
+        if self._header is None:
+            with open(self.fname, 'rb') as fh:
+                self._header = fh.readline()
+        return self._header
+
+    @property
+    def columns(self):
+        """
+        Column names of the log (without the index)
+        """
+        return self._split_line(self.header)[1:]
+
+    @staticmethod
+    def _split_line(line):
+        return next(csv.reader([line.rstrip('\r\n')]))
+
+    def append(self, parameter_collection):
+        """
+        Append the given rows to the log, writing the header if the log
+        does not exist yet. Columns are aligned to the header of an existing
+        log. Columns that are not in the header are added to it with a
+        warning, as this rewrites the whole log (see `add_columns`).
+
+        Parameters
+        ----------
+
+        parameter_collection: ~dalek.parallel.ParameterCollection
+
+        """
+        if not self.exists:
+            if self.initial_columns is not None:
+                columns = list(self.initial_columns) + [
+                    column for column in parameter_collection.columns
+                    if column not in self.initial_columns]
+                parameter_collection = parameter_collection.reindex(
+                    columns=columns)
+            buffer = StringIO()
+            parameter_collection.to_csv(buffer)
+            self._write(buffer.getvalue(), mode='wb')
+            self._header = None
+            return
+
+        columns = self.columns
+        missing_columns = [column for column in parameter_collection.columns
+                           if column not in columns]
+        if missing_columns:
+            logger.warning('Columns {0} are not in the header of fitter log '
+                           '{1} - rewriting the log'.format(missing_columns,
+                                                            self.fname))
+            self.add_columns(missing_columns)
+            columns = self.columns
+
+        buffer = StringIO()
+        parameter_collection.reindex(columns=columns).to_csv(buffer,
+                                                              header=False)
+        self._write(buffer.getvalue(), mode='ab')
+
+    def add_columns(self, new_columns):
+        """
+        Add empty columns to the end of the header and of all rows. The log
+        is rewritten to a temporary file which then replaces the log.
+
+        Parameters
+        ----------
+
+        new_columns: ~list of ~str
+
+        """
+        logger.info('Adding columns {0} to fitter log {1}'.format(
+            new_columns, self.fname))
+        buffer = StringIO()
+        csv.writer(buffer, lineterminator='').writerow([''] + new_columns)
+        new_header_fields = buffer.getvalue()
+        empty_fields = ',' * len(new_columns)
+
+        temporary_fname = self.fname + '.tmp'
+        with open(self.fname, 'rb') as fh:
+            with open(temporary_fname, 'wb') as temporary_fh:
+                temporary_fh.write(fh.readline().rstrip('\r\n') +
+                                   new_header_fields + '\n')
+                for line in fh:
+                    if line.endswith('\n'):
+                        temporary_fh.write(line.rstrip('\r\n') +
+                                           empty_fields + '\n')
+                    else:
+                        # incomplete last line, see truncate_incomplete_line
+                        temporary_fh.write(line)
+                temporary_fh.flush()
+                os.fsync(temporary_fh.fileno())
+        os.rename(temporary_fname, self.fname)
+        self._header = None
+
+    def _write(self, data, mode):
+        with open(self.fname, mode) as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def truncate_incomplete_line(self):
+        """
+        Remove a trailing line that was only partially written (e.g. because
+        the driver was killed while writing)
+        """
+        with open(self.fname, 'rb+') as fh:
+            fh.seek(0, os.SEEK_END)
+            file_size = fh.tell()
+            if file_size == 0:
+                return
+            fh.seek(file_size - 1)
+            if fh.read(1) == '\n':
+                return
+
+            position = file_size
+            while position > 0:
+                read_size = min(self.block_size, position)
+                position -= read_size
+                fh.seek(position)
+                block = fh.read(read_size)
+                newline_position = block.rfind('\n')
+                if newline_position >= 0:
+                    new_size = position + newline_position + 1
+                    break
+            else:
+                new_size = 0
+
+            logger.warning('Removing incomplete last line from fitter log '
+                           '{0}'.format(self.fname))
+            fh.truncate(new_size)
+
+    def _reversed_lines(self):
+        """
+        Generator yielding complete lines from the end of the file to (but not
+        including) the header
+        """
+        with open(self.fname, 'rb') as fh:
+            header_size = len(self.header)
+            fh.seek(0, os.SEEK_END)
+            position = fh.tell()
+            remainder = ''
+            while position > header_size:
+                read_size = min(self.block_size, position - header_size)
+                position -= read_size
+                fh.seek(position)
+                lines = (fh.read(read_size) + remainder).split('\n')
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield line
+            if remainder.strip():
+                yield remainder
+
+    def read_last_iteration(self):
+        """
+        Read the rows belonging to the last iteration in the log
+
+        Returns
+        -------
+            : ~dalek.parallel.ParameterCollection
+        """
+        iteration_field = self._split_line(self.header).index(
+            self.iteration_column)
+
+        last_iteration = None
+        last_lines = []
+        for line in self._reversed_lines():
+            iteration = float(self._split_line(line)[iteration_field])
+            if last_iteration is None:
+                last_iteration = iteration
+            elif iteration != last_iteration:
+                break
+            last_lines.append(line)
+
+        last_lines.reverse()
+        return ParameterCollection(pd.read_csv(
+            StringIO(self.header + '\n'.join(last_lines)), index_col=0))
+
+    def read(self, columns=None):
+        """
+        Read the whole log
+
+        Parameters
+        ----------
+
+        columns: ~list of ~str
+            only read these columns, if None all columns [default=None]
+
+        Returns
+        -------
+            : ~dalek.parallel.ParameterCollection
+        """
+        if columns is None:
+            usecols = None
+        else:
+            # positions, as the index field of the header is empty
+            usecols = [0] + [i + 1 for i, column in enumerate(self.columns)
+                             if column in columns]
+        return ParameterCollection(pd.read_csv(self.fname, index_col=0,
+                                               usecols=usecols))
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+from collections import OrderedDict
+
+from dalek.parallel.parameter_collection import ParameterCollection
+
+logger = logging.getLogger(__name__)
+
+
+class TaskJournal(object):
+    """
+    Write-ahead journal of the TARDIS runs of the current iteration. The
+    journal contains one JSON record per line:
+
+    * 'dispatch' - the parameter collection that is dispatched in an iteration
+    * 'result' - the dalek values (fitness, runtime, ...) of a single finished
+      run, identified by its row in the dispatched parameter collection
+    * 'commit' - the iteration has been written to the fitter log
+
+    The journal is truncated whenever a new iteration is dispatched and all
+    previous iterations are committed.
+
+    Parameters
+    ----------
+
+    fname: ~str
+        path to the journal file
+
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.uncommitted_iterations = set()
+
+    @property
+    def exists(self):
+        return os.path.exists(self.fname)
+
+    def _write_record(self, record, mode='ab'):
+        with open(self.fname, mode) as fh:
+            fh.write(json.dumps(record) + '\n')
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def dispatch(self, current_iteration, parameter_collection):
+        """
+        Record the dispatch of an iteration
+
+        Parameters
+        ----------
+
+        current_iteration: ~int
+
+        parameter_collection: ~dalek.parallel.ParameterCollection
+        """
+        if self.uncommitted_iterations:
+            mode = 'ab'
+        else:
+            mode = 'wb'
+
+        self._write_record(OrderedDict([
+            ('type', 'dispatch'), ('iteration', int(current_iteration)),
+            ('columns', parameter_collection.columns.tolist()),
+            ('values', parameter_collection.values.tolist())]), mode=mode)
+        self.uncommitted_iterations.add(int(current_iteration))
+
+    def record_result(self, current_iteration, row, values):
+        """
+        Record the result of a single TARDIS run
+
+        Parameters
+        ----------
+
+        current_iteration: ~int
+
+        row: ~int
+            position of the run in the dispatched parameter collection
+
+        values: ~collections.OrderedDict
+            dalek values (e.g. 'dalek.fitness') of the run
+        """
+        self._write_record(OrderedDict([
+            ('type', 'result'), ('iteration', int(current_iteration)),
+            ('row', int(row)), ('values', values)]))
+
+    def commit(self, current_iteration):
+        """
+        Mark an iteration as written to the fitter log
+
+        Parameters
+        ----------
+
+        current_iteration: ~int
+        """
+        self._write_record(OrderedDict([
+            ('type', 'commit'), ('iteration', int(current_iteration))]))
+        self.uncommitted_iterations.discard(int(current_iteration))
+
+    def load(self):
+        """
+        Load the last uncommitted iteration from the journal
+
+        Returns
+        -------
+
+        None or (current_iteration, parameter_collection, results):
+            the iteration, the dispatched parameter collection and a
+            dictionary mapping rows to the recorded dalek values
+        """
+        dispatched = OrderedDict()
+        results = {}
+        committed = set()
+
+        with open(self.fname, 'rb') as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line, object_pairs_hook=OrderedDict)
+                except ValueError:
+                    logger.warning('Ignoring incomplete record in journal '
+                                   '{0}'.format(self.fname))
+                    continue
+
+                iteration = record['iteration']
+                if record['type'] == 'dispatch':
+                    dispatched[iteration] = ParameterCollection(
+                        record['values'], columns=record['columns'])
+                    results[iteration] = {}
+                elif record['type'] == 'result':
+                    results[iteration][record['row']] = record['values']
+                elif record['type'] == 'commit':
+                    committed.add(iteration)
+
+        uncommitted = [iteration for iteration in dispatched
+                       if iteration not in committed]
+        if not uncommitted:
+            return None
+
+        iteration = uncommitted[-1]
+        return iteration, dispatched[iteration], results[iteration]
@@ -0,0 +1,222 @@
+import logging
+from collections import OrderedDict
+
+from dalek.fitter.base import BaseFitter, FitterConfiguration, \
+    connect_to_engines
+from dalek.parallel.launcher import SharedFitterLauncher, fitter_worker
+
+logger = logging.getLogger(__name__)
+
+
+def run_fits(dalek_configuration_fnames, init_sleep_time=300, **kwargs):
+    """
+    Function to run several fits on one shared engine pool
+
+    Parameters
+    ----------
+
+    dalek_configuration_fnames: ~list of ~str
+        file names of the YAML configuration files for Dalek
+
+    init_sleep_time: ~float
+        time to sleep (in seconds) until to try again to see
+        if engines have connected (default 300s)
+
+    kwargs:
+        passed on to `FitManager`
+
+    Returns
+    -------
+        : FitManager
+    """
+
+    rc = connect_to_engines(init_sleep_time)
+    fit_manager = FitManager.from_yaml(rc, dalek_configuration_fnames,
+                                       **kwargs)
+    fit_manager.run_fits()
+    return fit_manager
+
+
+class FitManager(object):
+    """
+    Run several fits against one shared pool of engines. Instead of waiting at
+    the end of each generation, the engines are kept busy with the runs of the
+    other fits. Only `max_tasks_in_flight` runs are queued on the engines at
+    any time; which fit gets the next free slot is decided by the scheduling
+    policy:
+
+    * 'fair_share' - the fit with the fewest submitted runs relative to its
+      priority (weighted fair queuing)
+    * 'priority' - the fit with the highest priority that has runs waiting
+
+    Parameters
+    ----------
+
+    remote_clients: ~IPython.parallel.Client
+        IPython remote clients
+
+    fitter_configurations: ~dict
+        mapping of fit names to `~dalek.fitter.FitterConfiguration`
+
+    priorities: ~dict
+        mapping of fit names to priorities (default 1 for every fit)
+
+    scheduling: ~str
+        'fair_share' or 'priority' [default='fair_share']
+
+    max_tasks_in_flight: ~int
+        maximum number of queued runs, if None twice the number of engines
+        [default=None]
+
+    worker: func
+        the worker function, it needs to accept the `fit_name` keyword
+        [default=fitter_worker]
+
+    """
+
+    @classmethod
+    def from_yaml(cls, remote_clients, fnames, **kwargs):
+        """
+        Create a manager for the given fitter configuration files. The fits
+        are named after the files.
+        """
+        fitter_configurations = OrderedDict(
+            (fname, FitterConfiguration.from_yaml(fname)) for fname in fnames)
+        return cls(remote_clients, fitter_configurations, **kwargs)
+
+    def __init__(self, remote_clients, fitter_configurations, priorities=None,
+                 scheduling='fair_share', max_tasks_in_flight=None,
+                 worker=fitter_worker):
+
+        if scheduling not in ('fair_share', 'priority'):
+            raise ValueError('Unknown scheduling policy {0} - allowed are '
+                             'fair_share and priority'.format(scheduling))
+        self.scheduling = scheduling
+
+        if max_tasks_in_flight is None:
+            max_tasks_in_flight = 2 * len(remote_clients)
+        self.max_tasks_in_flight = max_tasks_in_flight
+
+        self.launcher = SharedFitterLauncher(remote_clients, worker=worker)
+
+        self.fitters = OrderedDict()
+        self.priorities = {}
+        self.submitted_tasks = {}
+        for i, (fit_name, fitter_configuration) in enumerate(
+                fitter_configurations.items()):
+            # engine-side names of the fit need to be valid identifiers
+            launcher_view = self.launcher.register_fit(
+                'fit{0:d}'.format(i), fitter_configuration.fitness_function,
+                fitter_configuration.atom_data)
+            self.fitters[fit_name] = BaseFitter(None, fitter_configuration,
+                                                launcher=launcher_view)
+            if priorities is None:
+                self.priorities[fit_name] = 1.
+            else:
+                self.priorities[fit_name] = float(priorities.get(fit_name, 1.))
+            self.submitted_tasks[fit_name] = 0
+
+        self.evaluations = OrderedDict()
+
+    @property
+    def tasks_in_flight(self):
+        return sum([len(evaluation.async_results)
+                    for evaluation in self.evaluations.values()])
+
+    def next_fit(self):
+        """
+        Choose the fit that gets the next free engine slot
+
+        Returns
+        -------
+            : ~str or None
+            name of the fit or None if no fit has runs waiting
+        """
+        waiting_fits = [fit_name for fit_name, evaluation
+                        in self.evaluations.items() if evaluation.pending_rows]
+        if not waiting_fits:
+            return None
+
+        if self.scheduling == 'priority':
+            return max(waiting_fits,
+                       key=lambda fit_name: self.priorities[fit_name])
+        else:
+            return min(waiting_fits,
+                       key=lambda fit_name: (self.submitted_tasks[fit_name] /
+                                             self.priorities[fit_name]))
+
+    def submit_tasks(self):
+        """
+        Fill the free engine slots with runs of the waiting fits
+        """
+        while self.tasks_in_flight < self.max_tasks_in_flight:
+            fit_name = self.next_fit()
+            if fit_name is None:
+                break
+            evaluation = self.evaluations[fit_name]
+            self.fitters[fit_name].submit_evaluation(
+                evaluation, rows=evaluation.pending_rows[:1])
+            self.submitted_tasks[fit_name] += 1
+
+    def start_next_iteration(self, fit_name):
+        fitter = self.fitters[fit_name]
+        if fitter.finished:
+            fitter.end_fit()
+            self.evaluations.pop(fit_name, None)
+            return
+
+        logger.info('Fit {0}: starting iteration {1} of {2}'.format(
+            fit_name, fitter.current_iteration + 1,
+            fitter.fitter_configuration.max_iterations))
+        self.evaluations[fit_name] = fitter.start_evaluation(
+            fitter.current_parameters)
+
+    def run_fits(self, initial_parameters=None, timeout=1):
+        """
+        Run all fits until they are finished
+
+        Parameters
+        ----------
+
+        initial_parameters: ~dict
+            mapping of fit names to initial parameter collections, if None (or
+            missing for a fit) `FitterConfiguration.get_initial_parameter_collection`
+            is used [default=None]
+
+        timeout: ~float
+            time in seconds to wait for results before checking again
+            [default=1]
+        """
+        if initial_parameters is None:
+            initial_parameters = {}
+
+        for fit_name, fitter in self.fitters.items():
+            if fit_name in initial_parameters:
+                fit_initial_parameters = initial_parameters[fit_name]
+            else:
+                fit_initial_parameters = (fitter.fitter_configuration.
+                                          get_initial_parameter_collection())
+            fitter.start_fit(fit_initial_parameters)
+            self.start_next_iteration(fit_name)
+
+        try:
+            while self.evaluations:
+                self.submit_tasks()
+                async_results = [async_result
+                                 for evaluation in self.evaluations.values()
+                                 for async_result in
+                                 evaluation.async_results.values()]
+                self.launcher.wait(async_results, timeout=timeout)
+
+                for fit_name, evaluation in self.evaluations.items():
+                    fitter = self.fitters[fit_name]
+                    fitter.collect_evaluation_results(evaluation)
+                    if evaluation.done:
+                        fitter.advance_iteration(fitter.finish_iteration(
+                            evaluation.to_parameter_collection()))
+                        self.start_next_iteration(fit_name)
+        finally:
+            for fitter in self.fitters.values():
+                fitter.writer.flush()
+
+        return self.fitters
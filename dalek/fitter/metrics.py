@@ -0,0 +1,210 @@
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from time import time
+
+import numpy as np
+import pandas as pd
+
+from dalek.fitter.fitter_log import FitterLog
+
+logger = logging.getLogger(__name__)
+
+
+class IterationTimer(object):
+    """
+    Record where the time of each fitter iteration goes. Driver phases (e.g.
+    'to_config', 'optimizer', 'log_write') are summed per iteration. Phases
+    of the individual TARDIS runs (e.g. 'queue_wait', 'worker.tardis_run')
+    are reported as total, mean and maximum over the runs of an iteration.
+    Phases may be recorded from the background writer thread.
+
+    Parameters
+    ----------
+
+    metrics_log: ~str
+        CSV file to which one row per iteration is appended, if None the
+        metrics are only kept in memory [default=None]
+
+    trace: ~dalek.parallel.trace.ChromeTrace
+        if given, every driver phase and iteration is added as a span to the
+        trace [default=None]
+
+    """
+
+    driver_phases = ['to_config', 'dispatch', 'wait', 'collect',
+                     'clean_results', 'optimizer', 'spectral_store',
+                     'journal', 'log_write', 'checkpoint']
+
+    task_phases = ['queue_wait', 'worker.config', 'worker.model_setup',
+                   'worker.tardis_run', 'worker.fitness', 'result_transfer']
+
+    phase_tracks = {'optimizer': 'optimizer', 'spectral_store': 'io',
+                    'journal': 'io', 'log_write': 'io', 'checkpoint': 'io'}
+
+    def __init__(self, metrics_log=None, trace=None):
+        if metrics_log is not None:
+            self.metrics_log = FitterLog(metrics_log,
+                                         iteration_column='iteration')
+        else:
+            self.metrics_log = None
+        self.trace = trace
+
+        self.lock = threading.Lock()
+        self.phase_times = OrderedDict()
+        self.task_times = OrderedDict()
+        self.iteration_start = {}
+        self.metrics = OrderedDict()
+
+    def _get_iteration(self, current_iteration):
+        if current_iteration not in self.phase_times:
+            self.phase_times[current_iteration] = OrderedDict(
+                (phase, 0.0) for phase in self.driver_phases)
+            self.task_times[current_iteration] = OrderedDict(
+                (phase, []) for phase in self.task_phases)
+        return (self.phase_times[current_iteration],
+                self.task_times[current_iteration])
+
+    def start_iteration(self, current_iteration):
+        self.iteration_start[current_iteration] = time()
+
+    def add(self, current_iteration, phase, seconds):
+        """
+        Add the time spent in a driver phase
+        """
+        with self.lock:
+            phase_times = self._get_iteration(current_iteration)[0]
+            phase_times[phase] = phase_times.get(phase, 0.0) + seconds
+
+    def add_task(self, current_iteration, task_times):
+        """
+        Add the phase times of a single TARDIS run
+
+        Parameters
+        ----------
+
+        current_iteration: ~int
+
+        task_times: ~dict
+            mapping of phase names to seconds
+        """
+        with self.lock:
+            iteration_task_times = self._get_iteration(current_iteration)[1]
+            for phase, seconds in task_times.items():
+                iteration_task_times.setdefault(phase, []).append(seconds)
+
+    @contextmanager
+    def phase(self, current_iteration, phase):
+        """
+        Context manager timing a driver phase
+        """
+        start_time = time()
+        try:
+            yield
+        finally:
+            duration = time() - start_time
+            self.add(current_iteration, phase, duration)
+            if self.trace is not None:
+                self.trace.add_driver_span(
+                    self.phase_tracks.get(phase, 'scheduler'), phase,
+                    start_time, duration, current_iteration)
+
+    def timed(self, current_iteration, phase, func):
+        """
+        Wrap `func` so that its runtime is added to the given phase (used for
+        jobs of the background writer)
+        """
+        def timed_func(*args, **kwargs):
+            with self.phase(current_iteration, phase):
+                return func(*args, **kwargs)
+        return timed_func
+
+    def iteration_metrics(self, current_iteration):
+        """
+        Metrics of a single iteration
+
+        Returns
+        -------
+            : ~collections.OrderedDict
+        """
+        with self.lock:
+            phase_times, task_times = self._get_iteration(current_iteration)
+            metrics = OrderedDict()
+            metrics['iteration'] = current_iteration
+            if current_iteration in self.iteration_start:
+                metrics['wall_time'] = (time() -
+                                        self.iteration_start[current_iteration])
+            else:
+                metrics['wall_time'] = np.nan
+            metrics['no_of_tasks'] = max([len(times) for times in
+                                          task_times.values()] + [0])
+            for phase, seconds in phase_times.items():
+                metrics[phase] = seconds
+            for phase, times in task_times.items():
+                if times:
+                    metrics[phase + '.total'] = np.sum(times)
+                    metrics[phase + '.mean'] = np.mean(times)
+                    metrics[phase + '.max'] = np.max(times)
+                else:
+                    metrics[phase + '.total'] = np.nan
+                    metrics[phase + '.mean'] = np.nan
+                    metrics[phase + '.max'] = np.nan
+        return metrics
+
+    def finish_iteration(self, current_iteration):
+        """
+        Compute the metrics of the iteration and append them to the metrics
+        log
+        """
+        metrics = self.iteration_metrics(current_iteration)
+        self.metrics[current_iteration] = metrics
+        with self.lock:
+            del self.phase_times[current_iteration]
+            del self.task_times[current_iteration]
+            iteration_start = self.iteration_start.pop(current_iteration, None)
+
+        if self.trace is not None:
+            if iteration_start is not None:
+                self.trace.add_driver_span(
+                    'iterations', 'iteration {0}'.format(current_iteration),
+                    iteration_start, metrics['wall_time'], current_iteration)
+            self.trace.flush()
+
+        if self.metrics_log is not None:
+            self.metrics_log.append(pd.DataFrame(
+                [metrics.values()], columns=metrics.keys(),
+                index=[current_iteration]))
+
+    def summary(self):
+        """
+        Summary of all finished iterations: total, mean per iteration and
+        fraction of the wall time for every driver phase, total and mean per
+        iteration (summed over all runs) for every phase of the runs
+
+        Returns
+        -------
+            : ~pandas.DataFrame
+        """
+        if not self.metrics:
+            return pd.DataFrame()
+        metrics = pd.DataFrame([item.values() for item in self.metrics.values()],
+                               columns=self.metrics.values()[0].keys())
+
+        task_phases = [phase + '.total' for phase in self.task_phases]
+        phases = [phase for phase in self.driver_phases + task_phases
+                  if phase in metrics.columns]
+        summary = pd.DataFrame({'total': metrics[phases].sum()},
+                               index=phases)
+        summary['per_iteration'] = summary['total'] / len(metrics)
+        summary['fraction_of_wall_time'] = (summary['total'] /
+                                            metrics['wall_time'].sum())
+        summary.loc[summary.index.isin(task_phases),
+                    'fraction_of_wall_time'] = np.nan
+        return summary
+
+    def log_summary(self):
+        summary = self.summary()
+        if len(summary) > 0:
+            logger.info('Timing summary of {0} iterations:\n{1}'.format(
+                len(self.metrics), summary.to_string()))
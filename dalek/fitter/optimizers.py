@@ -1,12 +1,29 @@
 from abc import ABCMeta, abstractmethod
 
 from dalek.parallel import ParameterCollection
+from dalek.fitter.surrogate import GPSurrogate, pairwise_distances
+from dalek.fitter import sampling
+from scipy.linalg import solve_triangular
 import numpy as np
-import random
+import math
+import logging
+
+logger = logging.getLogger(__name__)
 
 class BaseOptimizer(object):
     __metaclass__ = ABCMeta
 
+    #: names of the attributes that make up the state of the optimizer
+    checkpoint_attributes = []
+
+    #: names of the state attributes with one row per candidate, which are
+    #: taken over with the candidate in `adopt_candidates`
+    candidate_attributes = []
+
+    #: names of the columns besides the parameters that the optimizer sets in
+    #: its candidates (see `add_extra_columns`)
+    extra_columns = []
+
     def __init__(self):
         pass
 
@@ -14,6 +31,78 @@ class BaseOptimizer(object):
     def __call__(self, *args, **kwargs):
         pass
 
+    def get_state(self):
+        """
+        Get the state of the optimizer for checkpointing. Attributes that are
+        not yet set (i.e. None) are not included.
+
+        Returns
+        -------
+            : ~dict
+        """
+        state = {}
+        for name in self.checkpoint_attributes:
+            value = getattr(self, name, None)
+            if value is not None:
+                state[name] = value
+        return state
+
+    def set_state(self, state):
+        """
+        Restore the state of the optimizer from a checkpoint
+
+        Parameters
+        ----------
+
+        state: ~dict
+            as returned by `get_state`
+        """
+        for name in self.checkpoint_attributes:
+            if name in state:
+                value = state[name]
+                if np.ndim(value) == 0:
+                    value = np.asarray(value).item()
+                setattr(self, name, value)
+
+    def add_extra_columns(self, parameter_collection):
+        """
+        Add the `extra_columns` to parameters that were not made by the
+        optimizer (e.g. the initial parameters), so that the columns are in
+        the header of the fitter log from the first iteration on
+
+        Parameters
+        ----------
+
+        parameter_collection: ~dalek.parallel.ParameterCollection
+
+        Returns
+        -------
+            : ~dalek.parallel.ParameterCollection
+        """
+        return parameter_collection
+
+    def adopt_candidates(self, optimizers, choice):
+        """
+        Take over the candidate state from copies of this optimizer that were
+        run on the same generation (see
+        `~dalek.fitter.surrogate.SurrogateScreening`)
+
+        Parameters
+        ----------
+
+        optimizers: ~list of BaseOptimizer
+            the copies (including this optimizer)
+
+        choice: ~np.ndarray
+            index of the optimizer in `optimizers` whose candidate was chosen
+            for every row
+        """
+        rows = np.arange(len(choice))
+        for name in self.candidate_attributes:
+            values = np.array([getattr(optimizer, name)
+                               for optimizer in optimizers])
+            setattr(self, name, values[choice, rows])
+
     @staticmethod
     def normalize_parameter_collection(parameter_collection):
         """
@@ -48,30 +137,112 @@ class BaseOptimizer(object):
 
 
 class RandomSampling(BaseOptimizer):
-    def __init__(self, fitter_configuration):
-        raise NotImplementedError
-        self.fitter_configuration = fitter_configuration
-        self.lbounds = self.fitter_configuration.lbounds
-        self.ubounds = self.fitter_configuration.ubounds
-        self.n = self.fitter_configuration.number_of_samples
+    """
+    Sampling-only optimizer, e.g. for building training sets for emulators:
+    every generation is a new set of samples of a space-filling design (see
+    `~dalek.fitter.sampling`), independent of the fitness. Sequence designs
+    ('sobol' and 'halton') are continued from generation to generation with
+    the same scrambling, other designs ('lhs' and 'uniform') are drawn anew.
+
+    Parameters
+    ----------
+
+    parameter_conf: ~dalek.fitter.base.ParameterConfiguration
+
+    number_of_samples: ~int
+
+    design: ~str
+        if None 'sobol', or 'halton' for more than
+        `~dalek.fitter.sampling.sobol_max_dim` parameters [default=None]
+
+    normalize_abundances: ~bool
+        normalize the abundances of the samples [default=True]
+
+    """
+    checkpoint_attributes = ['seed', 'drawn']
+
+    def __init__(self, parameter_conf, number_of_samples, design=None,
+                 normalize_abundances=True, **kwargs):
+        self.parameter_config = parameter_conf
+        self.n = number_of_samples
+        dim = len(parameter_conf.parameter_names)
+        if design is None:
+            design = 'sobol' if dim <= sampling.sobol_max_dim else 'halton'
+        sampling.check_design(design, dim)
+        self.design = design
+        self.normalize_abundances = normalize_abundances
+        # the scrambling of sequence designs is drawn from its own seed so
+        # it stays the same for all generations
+        self.seed = np.random.randint(0, 2 ** 31 - 1)
+        self.drawn = 0
 
     def __call__(self, parameter_collection):
-        parameters = []
-        for _ in range(self.n):
-            parameters.append(np.random.uniform(lbounds, ubounds))
-        return ParameterCollection(np.array(parameters), columns=self.fitter_configuration.parameter_names)
+        if self.design in sampling.sequence_designs:
+            random_state = np.random.RandomState(self.seed)
+        else:
+            random_state = None
+        samples = ParameterCollection(
+            sampling.make_design(self.design, self.n, self.parameter_config,
+                                 random_state=random_state,
+                                 start_index=self.drawn),
+            columns=self.parameter_config.parameter_names)
+        self.drawn += self.n
+        if self.normalize_abundances:
+            samples = self.normalize_parameter_collection(samples)
+        return samples
+
 
 class NoiseMeasurement(BaseOptimizer):
-    def __init__(self, fitter_configuration):
-        raise NotImplementedError
-        self.fitter_configuration = fitter_configuration
-        self.n = self.fitter_configuration.number_of_samples
+    """
+    Measure the Monte Carlo noise of the fitness: every generation evaluates
+    the best parameters of the previous generation `number_of_samples` times
+    with different TARDIS random seeds (in the column `seed_key`, which is
+    also added to the initial parameters).
+
+    Parameters
+    ----------
+
+    parameter_conf: ~dalek.fitter.base.ParameterConfiguration
+
+    number_of_samples: ~int
+
+    seed_key: ~str
+        [default='montecarlo.seed']
+
+    """
+
+    def __init__(self, parameter_conf, number_of_samples,
+                 seed_key='montecarlo.seed', **kwargs):
+        self.parameter_config = parameter_conf
+        self.n = number_of_samples
+        self.seed_key = seed_key
+        self.extra_columns = [seed_key]
+
+    def draw_seeds(self, number_of_samples):
+        return np.random.randint(0, 2 ** 16, number_of_samples)
+
+    def add_extra_columns(self, parameter_collection):
+        if self.seed_key in parameter_collection.columns:
+            return parameter_collection
+        parameter_collection = parameter_collection.copy()
+        parameter_collection[self.seed_key] = self.draw_seeds(
+            len(parameter_collection))
+        return parameter_collection
 
     def __call__(self, parameter_collection):
-        parameters = [random.randint(0, 2**16) for _ in range(self.n)]
-        return ParameterCollection(np.array(parameters), columns=['montecarlo.seed'])
+        fitness, split_param_collection = self.split_parameter_collection(
+            parameter_collection)
+        best_parameters = split_param_collection.values[np.argmin(
+            fitness.values)]
+        samples = ParameterCollection(
+            np.tile(best_parameters, (self.n, 1)),
+            columns=self.parameter_config.parameter_names)
+        samples[self.seed_key] = self.draw_seeds(self.n)
+        return samples
 
 class LuusJaakolaOptimizer(BaseOptimizer):
+    checkpoint_attributes = ['x', 'd']
+
     def __init__(self, parameter_conf, number_of_samples, **kwargs):
         self.parameter_config = parameter_conf
         self.x = (self.parameter_config.lbounds +
@@ -101,6 +272,13 @@ class LuusJaakolaOptimizer(BaseOptimizer):
         return new_parameter_collection
 
 class DEOptimizer(BaseOptimizer):
+    """
+    Differential evolution (DE/rand/1/bin). Selection, mutation, crossover
+    and the bounds handling (candidates outside the bounds are replaced by
+    their parent) work on the whole population at once.
+    """
+    checkpoint_attributes = ['population', 'fitness']
+
     def __init__(self, parameter_conf, number_of_samples, **kwargs):
         self.population = None
         self.fitness = None
@@ -116,8 +294,29 @@ class DEOptimizer(BaseOptimizer):
         self.ubounds = np.array(self.parameter_config.ubounds)
 
     def violates_bounds(self, x):
-        return any(x < self.lbounds) or any(x > self.ubounds)
-        
+        return np.any((x < self.lbounds) | (x > self.ubounds), axis=-1)
+
+    @staticmethod
+    def sample_distinct_indices(n, k):
+        """
+        For every individual draw `k` distinct indices of other individuals
+        (uniformly, in random order)
+
+        Returns
+        -------
+            : ~np.ndarray
+            array of shape (n, k)
+        """
+        excluded = np.arange(n)[:, np.newaxis]
+        for i in xrange(k):
+            # draw from the n - 1 - i indices that are not excluded yet by
+            # skipping over the excluded indices in ascending order
+            indices = np.random.randint(0, n - 1 - i, size=n)
+            for excluded_index in np.sort(excluded, axis=1).T:
+                indices += indices >= excluded_index
+            excluded = np.hstack((excluded, indices[:, np.newaxis]))
+        return excluded[:, 1:]
+
     def __call__(self, parameter_collection):
         fitness, split_param_collection = self.split_parameter_collection(
             parameter_collection)
@@ -125,86 +324,748 @@ class DEOptimizer(BaseOptimizer):
             self.population = np.array(split_param_collection.values)
             self.fitness = np.array(fitness.values)
         else:
-            new_population = np.array(split_param_collection.values)
-            for index, vector in enumerate(self.population):
-                if fitness[index] < self.fitness[index]:
-                    self.population[index] = np.array(new_population[index])
-                    self.fitness[index] = fitness[index]
-        candidates = self.population.copy()
-        for index, vector in enumerate(self.population):
-            indices = [i for i in range(self.n) if i != index]
-            random.shuffle(indices)
-            i1, i2, i3 = indices[:3]
-            a, b, c = self.population[i1], self.population[i2], self.population[i3]
-            r_ = np.random.randint(0, self.dim)
-            for j, x in enumerate(vector):
-                ri = np.random.random()
-                if ri < self.cr or j == r_:
-                    candidates[index][j] = a[j] + self.f * (b[j] - c[j])
-                else:
-                    candidates[index][j] = x
-            if self.violates_bounds(candidates[index]):
-                candidates[index] = np.array(vector)
-	params = ParameterCollection(np.array(candidates),
-                                 columns=self.parameter_config.parameter_names)
-	return params
-
-class PSOOptimizerGbest(BaseOptimizer):
-    def __init__(self, parameter_conf, number_of_samples, **kwargs):
+            fitness = np.asarray(fitness.values)
+            improved = fitness < self.fitness
+            self.population[improved] = split_param_collection.values[improved]
+            self.fitness[improved] = fitness[improved]
+
+        i1, i2, i3 = self.sample_distinct_indices(self.n, 3).T
+        mutants = self.population[i1] + self.f * (self.population[i2] -
+                                                  self.population[i3])
+        crossover = np.random.random((self.n, self.dim)) < self.cr
+        crossover[np.arange(self.n), np.random.randint(0, self.dim,
+                                                       size=self.n)] = True
+        candidates = np.where(crossover, mutants, self.population)
+
+        violates_bounds = self.violates_bounds(candidates)
+        candidates[violates_bounds] = self.population[violates_bounds]
+
+        params = ParameterCollection(candidates,
+                                     columns=self.parameter_config.parameter_names)
+        return params
+
+class PSOOptimizer(BaseOptimizer):
+    """
+    Particle swarm optimization with constriction. Every particle is attracted
+    to its personal best and to the best personal best of its neighbours
+    (not including itself) in the topology:
+
+    * 'gbest' - all other particles
+    * 'ring' - the previous and the next particle
+    * 'von_neumann' - the particles left, right, above and below on a torus
+      with ceil(sqrt(n)) columns. If n is not a square number the last row is
+      incomplete and rows and columns wrap around within the existing
+      particles.
+
+    Parameters
+    ----------
+
+    parameter_conf: ~dalek.fitter.base.ParameterConfiguration
+
+    number_of_samples: ~int
+        number of particles
+
+    topology: ~str
+        [default='gbest']
+
+    c1: ~float
+        cognitive coefficient [default=2.05]
+
+    c2: ~float
+        social coefficient [default=2.05]
+
+    """
+    checkpoint_attributes = ['x', 'y', 'px', 'py', 'v']
+    candidate_attributes = ['x', 'v']
+
+    topologies = ('gbest', 'ring', 'von_neumann')
+
+    def __init__(self, parameter_conf, number_of_samples, topology='gbest',
+                 **kwargs):
         self.parameter_config = parameter_conf
         self.x = None
         self.px = None
         self.v = None
-        self.c1 = 2.05
-        self.c2 = 2.05
+        self.c1 = kwargs.get('c1', 2.05)
+        self.c2 = kwargs.get('c2', 2.05)
         self.chi = 2.0 / (self.c1 + self.c2 - 2.0 + np.sqrt((self.c1 + self.c2) ** 2 - 4.0 * (self.c1 + self.c2)))
+        if number_of_samples < 2:
+            raise ValueError('Need at least 2 samples for particle swarm '
+                             'optimization')
         self.n = number_of_samples
         self.lbounds = np.array(self.parameter_config.lbounds)
         self.ubounds = np.array(self.parameter_config.ubounds)
 
+        if topology not in self.topologies:
+            raise ValueError('Unknown topology {0} - allowed are {1}'.format(
+                topology, ', '.join(self.topologies)))
+        self.topology = topology
+        self.neighbours = self.make_neighbours(topology, number_of_samples)
+
+    @staticmethod
+    def make_neighbours(topology, n):
+        """
+        Indices of the neighbours of every particle
+
+        Returns
+        -------
+            : ~np.ndarray
+            array of shape (n, number of neighbours), None for 'gbest'
+        """
+        index = np.arange(n)
+        if topology == 'gbest':
+            return None
+        elif topology == 'ring':
+            return np.array([(index - 1) % n, (index + 1) % n]).T
+
+        columns = int(np.ceil(np.sqrt(n)))
+        rows = int(np.ceil(n / float(columns)))
+        last_row_width = n - (rows - 1) * columns
+        row, column = index // columns, index % columns
+        row_widths = np.where(row == rows - 1, last_row_width, columns)
+        column_heights = np.where(column < last_row_width, rows, rows - 1)
+        neighbours = np.array([
+            row * columns + (column - 1) % row_widths,
+            row * columns + (column + 1) % row_widths,
+            (row - 1) % column_heights * columns + column,
+            (row + 1) % column_heights * columns + column]).T
+
+        # a particle alone in its row or column would be its own neighbour,
+        # it is replaced by the other neighbours
+        for i in index:
+            is_self = neighbours[i] == i
+            if is_self.any() and not is_self.all():
+                neighbours[i, is_self] = np.resize(neighbours[i, ~is_self],
+                                                   is_self.sum())
+        return neighbours
+
     def neighbourhood(self, index):
-        return [i for i in range(self.n) if i != index]
+        if self.neighbours is None:
+            return [i for i in range(self.n) if i != index]
+        return list(self.neighbours[index])
+
+    def best_neighbours(self):
+        """
+        Index of the best personal best in the neighbourhood of every particle
+        """
+        if self.neighbours is None:
+            best, second_best = np.argsort(self.py, kind='mergesort')[:2]
+            best_neighbours = np.repeat(best, self.n)
+            best_neighbours[best] = second_best
+            return best_neighbours
+        return self.neighbours[np.arange(self.n),
+                               np.argmin(self.py[self.neighbours], axis=1)]
 
     def violates_bounds(self, x):
-        return any(x < self.lbounds) or any(x > self.ubounds)
-        
+        return np.any((x < self.lbounds) | (x > self.ubounds), axis=-1)
+
     def __call__(self, parameter_collection):
-        candidates = np.array([x[:-1] for x in parameter_collection.values])
+        fitness, split_param_collection = self.split_parameter_collection(
+            parameter_collection)
+        candidates = np.array(split_param_collection.values)
+        fitness = np.array(fitness.values)
         if self.x is None:
             self.x = np.array(candidates)
-            self.y = np.array([x[-1] for x in parameter_collection.values])
+            self.y = np.array(fitness)
             self.px = np.array(candidates)
-            self.py = np.array([x[-1] for x in parameter_collection.values])
+            self.py = np.array(fitness)
             self.v = np.zeros(self.x.shape)
         else:
-            for index, candidate in enumerate(parameter_collection.values):
-                if candidate[-1] < self.py[index]:
-                    self.px[index] = np.array(candidate[:-1])
-                    self.py[index] = candidate[-1]
-        gx = np.zeros(self.x.shape)
-        for index, _ in enumerate(self.x):
-            neighbours = self.neighbourhood(index)
-            nx, ny = min(zip([self.px[i] for i in neighbours], 
-                             [self.py[i] for i in neighbours]), 
-                         key=lambda pair: pair[1])
-            gx[index] = np.array(nx)
+            improved = fitness < self.py
+            self.px[improved] = candidates[improved]
+            self.py[improved] = fitness[improved]
+        gx = self.px[self.best_neighbours()]
         self.v = self.chi * (self.v + 
                              self.c1 * np.random.sample(self.x.shape) * (self.px - self.x) + 
                              self.c2 * np.random.sample(self.x.shape) * (gx - self.x))
-        candidates = np.array(self.x + self.v)
-        for index, x in enumerate(candidates):
-            if not self.violates_bounds(x):
-                candidates[index] = np.array(x)
-            else:
-                candidates[index] = np.array(self.px[index])
+        candidates = self.x + self.v
+        violates_bounds = self.violates_bounds(candidates)
+        candidates[violates_bounds] = self.px[violates_bounds]
         self.x += self.v
         params = ParameterCollection(
             candidates, columns=self.parameter_config.parameter_names)
         
         return params
-        
+
+
+# name of the optimizer before the topologies were added
+PSOOptimizerGbest = PSOOptimizer
+
+
+class CMAESOptimizer(BaseOptimizer):
+    """
+    Covariance matrix adaptation evolution strategy (CMA-ES) with cumulative
+    step-size adaptation and optional IPOP or BIPOP restarts.
+
+    The search runs in coordinates where the parameter bounds are scaled to
+    [0, 1]. Candidates outside the bounds are mirrored back into them and
+    the abundances are normalized. The distribution is updated with the
+    parameters that were actually evaluated, so both the bounds handling and
+    the normalization are taken into account.
+
+    A run is restarted if the step size becomes smaller than `tol_x`, if the
+    best fitness changed less than `tol_fun` over the last
+    10 + 30 * dimensions / population size generations or if the covariance
+    matrix becomes ill-conditioned. IPOP doubles the population size at
+    every restart. BIPOP alternates between such large populations and
+    small populations with a smaller step size, choosing the regime that
+    used fewer evaluations so far.
+
+    Parameters
+    ----------
+
+    parameter_conf: ~dalek.fitter.base.ParameterConfiguration
+
+    number_of_samples: ~int
+        population size of the first run
+
+    sigma0: ~float
+        initial step size relative to the bounds [default=0.3]
+
+    restarts: ~str
+        None, 'ipop' or 'bipop' [default=None]
+
+    max_restarts: ~int
+        [default=9]
+
+    tol_x: ~float
+        [default=1e-11]
+
+    tol_fun: ~float
+        [default=1e-12]
+
+    normalize_abundances: ~bool
+        normalize the abundances of the candidates [default=True]
+
+    """
+    checkpoint_attributes = ['mean', 'sigma', 'C', 'pc', 'ps', 'generation',
+                             'population_size', 'restart', 'large_restarts',
+                             'large_evaluations', 'small_evaluations',
+                             'regime', 'best_fitness_history', 'best_x',
+                             'best_fitness']
+
+    def __init__(self, parameter_conf, number_of_samples, sigma0=0.3,
+                 restarts=None, max_restarts=9, tol_x=1e-11, tol_fun=1e-12,
+                 normalize_abundances=True, **kwargs):
+        if restarts not in (None, 'ipop', 'bipop'):
+            raise ValueError('Unknown restart strategy {0} - allowed are ipop '
+                             'and bipop'.format(restarts))
+        if number_of_samples < 2:
+            raise ValueError('Need at least 2 samples for CMA-ES')
+        self.parameter_config = parameter_conf
+        self.dim = len(self.parameter_config.parameter_names)
+        self.lbounds = np.array(self.parameter_config.lbounds)
+        self.ubounds = np.array(self.parameter_config.ubounds)
+        self.n = number_of_samples
+        self.sigma0 = sigma0
+        self.restarts = restarts
+        self.max_restarts = max_restarts
+        self.tol_x = tol_x
+        self.tol_fun = tol_fun
+        self.normalize_abundances = normalize_abundances
+
+        self.mean = None
+        self.sigma = None
+        self.C = None
+        self.pc = None
+        self.ps = None
+        self.generation = 0
+        self.population_size = number_of_samples
+        self.restart = 0
+        self.large_restarts = 0
+        self.large_evaluations = 0
+        self.small_evaluations = 0
+        self.regime = 'large'
+        self.best_fitness_history = None
+        self.best_x = None
+        self.best_fitness = None
+
+    def to_unit(self, x):
+        return (x - self.lbounds) / (self.ubounds - self.lbounds)
+
+    def from_unit(self, y):
+        return self.lbounds + y * (self.ubounds - self.lbounds)
+
+    @staticmethod
+    def mirror(y):
+        """
+        Mirror points into [0, 1]
+        """
+        y = np.mod(y, 2.)
+        return np.where(y > 1., 2. - y, y)
+
+    def strategy_parameters(self, population_size):
+        """
+        Default recombination weights and learning rates for a population
+        size
+
+        Returns
+        -------
+            : ~dict
+        """
+        n = self.dim
+        mu = population_size // 2
+        weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        weights /= weights.sum()
+        mueff = 1. / np.sum(weights ** 2)
+        cc = (4. + mueff / n) / (n + 4. + 2. * mueff / n)
+        cs = (mueff + 2.) / (n + mueff + 5.)
+        c1 = 2. / ((n + 1.3) ** 2 + mueff)
+        cmu = min(1. - c1, 2. * (mueff - 2. + 1. / mueff) /
+                  ((n + 2.) ** 2 + mueff))
+        damps = 1. + 2. * max(0., np.sqrt((mueff - 1.) / (n + 1.)) - 1.) + cs
+        chi_n = np.sqrt(n) * (1. - 1. / (4. * n) + 1. / (21. * n ** 2))
+        return dict(mu=mu, weights=weights, mueff=mueff, cc=cc, cs=cs, c1=c1,
+                    cmu=cmu, damps=damps, chi_n=chi_n)
+
+    def start_run(self, mean, sigma, population_size):
+        self.mean = mean
+        self.sigma = sigma
+        self.C = np.eye(self.dim)
+        self.pc = np.zeros(self.dim)
+        self.ps = np.zeros(self.dim)
+        self.generation = 0
+        self.population_size = population_size
+        self.best_fitness_history = np.array([])
+
+    def update(self, y, fitness):
+        """
+        Update the distribution with the evaluated candidates (in unit
+        coordinates)
+        """
+        params = self.strategy_parameters(len(fitness))
+        mu = params['mu']
+        weights = params['weights']
+        order = np.argsort(fitness, kind='mergesort')
+
+        old_mean = self.mean
+        y_selected = (y[order[:mu]] - old_mean) / self.sigma
+        y_mean = weights.dot(y_selected)
+        self.mean = old_mean + self.sigma * y_mean
+
+        eigenvalues, B = np.linalg.eigh(self.C)
+        eigenvalues = np.maximum(eigenvalues, 1e-300)
+        C_invsqrt = B.dot(np.diag(eigenvalues ** -0.5)).dot(B.T)
+
+        cs = params['cs']
+        cc = params['cc']
+        self.ps = ((1. - cs) * self.ps + np.sqrt(cs * (2. - cs) *
+                                                 params['mueff']) *
+                   C_invsqrt.dot(y_mean))
+        ps_norm = np.linalg.norm(self.ps)
+        hsig = (ps_norm / np.sqrt(1. - (1. - cs) **
+                                  (2. * (self.generation + 1))) /
+                params['chi_n'] < 1.4 + 2. / (self.dim + 1.))
+        self.pc = ((1. - cc) * self.pc + hsig * np.sqrt(cc * (2. - cc) *
+                                                        params['mueff']) *
+                   y_mean)
+
+        c1 = params['c1']
+        cmu = params['cmu']
+        rank_mu = (y_selected.T * weights).dot(y_selected)
+        self.C = ((1. - c1 - cmu) * self.C +
+                  c1 * (np.outer(self.pc, self.pc) +
+                        (1 - hsig) * cc * (2. - cc) * self.C) +
+                  cmu * rank_mu)
+        self.C = np.triu(self.C) + np.triu(self.C, 1).T
+
+        self.sigma *= np.exp((cs / params['damps']) *
+                             (ps_norm / params['chi_n'] - 1.))
+        self.generation += 1
+        self.best_fitness_history = np.append(self.best_fitness_history,
+                                              fitness[order[0]])
+
+    def should_restart(self):
+        eigenvalues = np.linalg.eigvalsh(self.C)
+        if self.sigma * np.sqrt(eigenvalues.max()) < self.tol_x:
+            return True
+        if eigenvalues.min() <= 0 or (eigenvalues.max() / eigenvalues.min()
+                                      > 1e14):
+            return True
+        history_length = int(10 + np.ceil(30. * self.dim /
+                                          self.population_size))
+        if len(self.best_fitness_history) >= history_length:
+            history = self.best_fitness_history[-history_length:]
+            if history.max() - history.min() < self.tol_fun:
+                return True
+        return False
+
+    def restart_run(self):
+        """
+        Start a new run from a random mean with the population size and step
+        size of the restart strategy
+        """
+        self.restart += 1
+        if self.regime == 'large':
+            self.large_evaluations += self.generation * self.population_size
+        else:
+            self.small_evaluations += self.generation * self.population_size
+
+        if (self.restarts == 'bipop' and
+                self.small_evaluations < self.large_evaluations):
+            self.regime = 'small'
+            large_population_size = self.n * 2 ** self.large_restarts
+            population_size = max(2, int(
+                self.n * (0.5 * large_population_size / self.n) **
+                (np.random.uniform() ** 2)))
+            sigma = self.sigma0 * 10 ** (-2 * np.random.uniform())
+        else:
+            self.regime = 'large'
+            self.large_restarts += 1
+            population_size = self.n * 2 ** self.large_restarts
+            sigma = self.sigma0
+        logger.info('CMA-ES restart {0} ({1} regime) with population size '
+                    '{2}'.format(self.restart, self.regime, population_size))
+        self.start_run(np.random.uniform(0, 1, self.dim), sigma,
+                       population_size)
+
+    def sample(self):
+        """
+        Sample the next candidates
+
+        Returns
+        -------
+            : ~dalek.parallel.ParameterCollection
+        """
+        eigenvalues, B = np.linalg.eigh(self.C)
+        BD = B * np.sqrt(np.maximum(eigenvalues, 0.))
+        z = np.random.standard_normal((self.population_size, self.dim))
+        y = self.mirror(self.mean + self.sigma * z.dot(BD.T))
+        candidates = ParameterCollection(
+            self.from_unit(y), columns=self.parameter_config.parameter_names)
+        if self.normalize_abundances:
+            candidates = self.normalize_parameter_collection(candidates)
+        return candidates
+
+    def __call__(self, parameter_collection):
+        fitness, split_param_collection = self.split_parameter_collection(
+            parameter_collection)
+        fitness = np.array(fitness.values, dtype=np.float64)
+        x = np.array(split_param_collection.values)
+        y = self.to_unit(x)
+
+        best = np.argmin(fitness)
+        if self.best_fitness is None or fitness[best] < self.best_fitness:
+            self.best_fitness = fitness[best]
+            self.best_x = x[best].copy()
+
+        if self.mean is None:
+            # the initial population is treated like a first generation of
+            # a run centered on its weighted best candidates
+            params = self.strategy_parameters(len(fitness))
+            order = np.argsort(fitness, kind='mergesort')
+            self.start_run(params['weights'].dot(y[order[:params['mu']]]),
+                           self.sigma0, self.n)
+        else:
+            self.update(y, fitness)
+            if (self.restarts is not None and self.should_restart() and
+                    self.restart < self.max_restarts):
+                self.restart_run()
+
+        return self.sample()
+
+
+class PatternSearchOptimizer(BaseOptimizer):
+    """
+    Parallel pattern search for polishing a solution (see
+    `~dalek.fitter.polishing.LocalPolishing`). Every generation polls the
+    points center +- step along every parameter (in coordinates where the
+    bounds are scaled to [0, 1], points outside the bounds are clipped)
+    at the step sizes step, step / 2, step / 4, ... until the generation is
+    full, so that the engines evaluate several stencils at once. If the best
+    poll point improves on the center it becomes the new center and the
+    step size is set to the step size it was polled at (doubled if it was
+    the largest one). Otherwise the step size is halved below the smallest
+    polled step size. With fewer samples than two times the number of
+    parameters a random subset of the stencil is polled.
+
+    Parameters
+    ----------
+
+    parameter_conf: ~dalek.fitter.base.ParameterConfiguration
+
+    number_of_samples: ~int
+        number of poll points per generation
+
+    initial_step: ~float
+        [default=0.05]
+
+    min_step: ~float
+        the search has converged once the step size is below this value
+        [default=1e-4]
+
+    max_step: ~float
+        [default=0.5]
+
+    """
+    checkpoint_attributes = ['center', 'center_fitness', 'step',
+                             'poll_steps']
+    candidate_attributes = ['poll_steps']
+
+    def __init__(self, parameter_conf, number_of_samples, initial_step=0.05,
+                 min_step=1e-4, max_step=0.5, **kwargs):
+        self.parameter_config = parameter_conf
+        self.dim = len(self.parameter_config.parameter_names)
+        self.lbounds = np.array(self.parameter_config.lbounds)
+        self.ubounds = np.array(self.parameter_config.ubounds)
+        self.n = number_of_samples
+        self.initial_step = initial_step
+        self.min_step = min_step
+        self.max_step = max_step
+
+        self.center = None
+        self.center_fitness = None
+        self.step = None
+        self.poll_steps = None
+
+    @property
+    def converged(self):
+        return self.step is not None and self.step < self.min_step
+
+    def to_unit(self, x):
+        return (x - self.lbounds) / (self.ubounds - self.lbounds)
+
+    def from_unit(self, y):
+        return self.lbounds + y * (self.ubounds - self.lbounds)
+
+    def make_poll(self):
+        """
+        Poll points around the center (in unit coordinates) and their step
+        sizes
+        """
+        stencil = np.vstack((np.eye(self.dim), -np.eye(self.dim)))
+        levels = int(np.ceil(self.n / float(len(stencil))))
+        directions = np.tile(stencil, (levels, 1))
+        steps = np.repeat(self.step * 0.5 ** np.arange(levels), len(stencil))
+        # the last level is incomplete
+        rows = np.hstack((np.arange(len(stencil) * (levels - 1)),
+                          len(stencil) * (levels - 1) + np.sort(
+                              np.random.permutation(len(stencil))[
+                                  :self.n - len(stencil) * (levels - 1)])))
+        poll_points = np.clip(self.center + steps[rows, np.newaxis] *
+                              directions[rows], 0., 1.)
+        return poll_points, steps[rows]
+
+    def __call__(self, parameter_collection):
+        fitness, split_param_collection = self.split_parameter_collection(
+            parameter_collection)
+        fitness = np.array(fitness.values, dtype=np.float64)
+        y = self.to_unit(np.array(split_param_collection.values,
+                                  dtype=np.float64))
+        best = np.nanargmin(fitness)
+
+        if self.center is None:
+            self.center = y[best]
+            self.center_fitness = fitness[best]
+            self.step = self.initial_step
+        elif fitness[best] < self.center_fitness:
+            self.center = y[best]
+            self.center_fitness = fitness[best]
+            if self.poll_steps[best] == self.poll_steps.max():
+                self.step = min(2 * self.poll_steps[best], self.max_step)
+            else:
+                self.step = self.poll_steps[best]
+        else:
+            self.step = self.poll_steps.min() / 2.
+
+        poll_points, self.poll_steps = self.make_poll()
+        return ParameterCollection(
+            self.from_unit(poll_points),
+            columns=self.parameter_config.parameter_names)
+
+
+def normal_cdf(x):
+    return 0.5 * (1. + np.vectorize(math.erf)(np.asarray(x) / np.sqrt(2.)))
+
+
+def normal_pdf(x):
+    return np.exp(-0.5 * np.asarray(x) ** 2) / np.sqrt(2. * np.pi)
+
+
+def expected_improvement(mean, std, best):
+    """
+    Expected improvement below `best` of normal distributions
+    """
+    std = np.maximum(std, 1e-12)
+    z = (best - mean) / std
+    return std * (z * normal_cdf(z) + normal_pdf(z))
+
+
+class BayesianOptimizer(BaseOptimizer):
+    """
+    Batch Bayesian optimization for fits with few parameters and expensive
+    runs. A Gaussian process (see `~dalek.fitter.surrogate.GPSurrogate`) is
+    fitted to all evaluations so far and a whole generation is chosen with
+    the Kriging believer strategy: the candidate with the highest expected
+    improvement is added to the batch, the GP is conditioned on its
+    predicted fitness (which only reduces the variance around it) and the
+    next candidate is chosen, until the batch is complete. The expected
+    improvement is maximized over random candidates in the bounds and
+    around the best evaluations.
+
+    With more than `max_points` evaluations the GP is a local approximation
+    fitted to the `max_points` evaluations nearest to the best one, and the
+    candidates are restricted to the bounding box of these evaluations.
+    The evaluations (which are part of the checkpointed state) are limited
+    to the `max_history` most recent ones and the best one.
+
+    Parameters
+    ----------
+
+    parameter_conf: ~dalek.fitter.base.ParameterConfiguration
+
+    number_of_samples: ~int
+        batch size
+
+    max_points: ~int
+        [default=1000]
+
+    max_history: ~int
+        [default=10000]
+
+    number_of_candidates: ~int
+        candidates the expected improvement is evaluated at, if None
+        max(2000, 200 * number of parameters, 10 * number_of_samples)
+        [default=None]
+
+    local_scale: ~float
+        largest standard deviation (relative to the bounds) of the candidates
+        around the best evaluations, the standard deviations are drawn
+        log-uniformly down to a hundredth of it [default=0.1]
+
+    gp: ~dict
+        keyword arguments for `~dalek.fitter.surrogate.GPSurrogate`
+        [default={}]
+
+    """
+    checkpoint_attributes = ['x', 'fitness']
+
+    def __init__(self, parameter_conf, number_of_samples, max_points=1000,
+                 max_history=10000, number_of_candidates=None,
+                 local_scale=0.1, gp=None, **kwargs):
+        self.parameter_config = parameter_conf
+        self.dim = len(self.parameter_config.parameter_names)
+        self.lbounds = np.array(self.parameter_config.lbounds)
+        self.ubounds = np.array(self.parameter_config.ubounds)
+        self.n = number_of_samples
+        self.max_points = max_points
+        self.max_history = max_history
+        if number_of_candidates is None:
+            number_of_candidates = max(2000, 200 * self.dim,
+                                       10 * number_of_samples)
+        self.number_of_candidates = number_of_candidates
+        self.local_scale = local_scale
+        self.gp = GPSurrogate(**(gp or {}))
+
+        self.x = None
+        self.fitness = None
+
+    def to_unit(self, x):
+        return (x - self.lbounds) / (self.ubounds - self.lbounds)
+
+    def from_unit(self, y):
+        return self.lbounds + y * (self.ubounds - self.lbounds)
+
+    def get_training_data(self):
+        """
+        Evaluations the GP is fitted to (in unit coordinates) and the box
+        the candidates are drawn from
+        """
+        y = self.to_unit(self.x)
+        if len(y) <= self.max_points:
+            return y, self.fitness, np.zeros(self.dim), np.ones(self.dim)
+        best = y[np.argmin(self.fitness)]
+        nearest = np.argsort(pairwise_distances(best[np.newaxis], y)[0],
+                             kind='mergesort')[:self.max_points]
+        y = y[nearest]
+        return y, self.fitness[nearest], y.min(axis=0), y.max(axis=0)
+
+    def make_candidates(self, y, fitness, lower, upper):
+        number_of_local = self.number_of_candidates // 2
+        best = y[np.argsort(fitness, kind='mergesort')[:10]]
+        scales = self.local_scale * 10 ** -np.random.uniform(
+            0, 2, (number_of_local, 1))
+        local_candidates = (
+            best[np.random.randint(0, len(best), number_of_local)] +
+            scales * np.random.standard_normal((number_of_local, self.dim)))
+        random_candidates = np.random.uniform(
+            lower, upper, (self.number_of_candidates - number_of_local,
+                           self.dim))
+        return np.clip(np.vstack((local_candidates, random_candidates)),
+                       lower, upper)
+
+    def select_batch(self, candidates, batch_size):
+        """
+        Choose a batch of candidates with the Kriging believer strategy
+
+        Returns
+        -------
+            : ~np.ndarray
+            indices of the chosen candidates
+        """
+        gp = self.gp
+        cross_covariance = gp.covariance(
+            pairwise_distances(gp.x, candidates), gp.length_scale)
+        mean = cross_covariance.T.dot(gp.alpha)
+        # rows of the Cholesky factor of the joint covariance of the
+        # evaluations and the chosen candidates with the candidates
+        v = np.empty((len(gp.x) + batch_size, len(candidates)))
+        v[:len(gp.x)] = solve_triangular(gp.cholesky, cross_covariance,
+                                         lower=True)
+        variance = 1. - np.sum(v[:len(gp.x)] ** 2, axis=0)
+        best = np.min((self.fitness - gp.y_mean) / gp.y_std)
+
+        chosen = []
+        for i in xrange(batch_size):
+            improvement = expected_improvement(
+                mean, np.sqrt(np.maximum(variance, 0.)), best)
+            improvement[chosen] = -np.inf
+            index = np.argmax(improvement)
+            chosen.append(index)
+
+            rows = len(gp.x) + i
+            covariance = (gp.covariance(
+                pairwise_distances(candidates, candidates[[index]])[:, 0],
+                gp.length_scale) - v[:rows].T.dot(v[:rows, index]))
+            v[rows] = covariance / np.sqrt(max(variance[index], 0.) +
+                                           gp.noise_level)
+            variance -= v[rows] ** 2
+        return np.array(chosen)
+
+    def __call__(self, parameter_collection):
+        fitness, split_param_collection = self.split_parameter_collection(
+            parameter_collection)
+        fitness = np.array(fitness.values, dtype=np.float64)
+        x = np.array(split_param_collection.values, dtype=np.float64)
+        finite = np.isfinite(fitness)
+        if self.x is None:
+            self.x = x[finite]
+            self.fitness = fitness[finite]
+        else:
+            self.x = np.vstack((self.x, x[finite]))
+            self.fitness = np.append(self.fitness, fitness[finite])
+        if len(self.fitness) > self.max_history:
+            keep = np.arange(len(self.fitness) - self.max_history,
+                             len(self.fitness))
+            # the oldest evaluation makes way for the best one
+            keep[0] = min(keep[0], np.argmin(self.fitness))
+            self.x = self.x[keep]
+            self.fitness = self.fitness[keep]
+
+        y, fitness, lower, upper = self.get_training_data()
+        self.gp.fit(y, fitness)
+        candidates = self.make_candidates(y, fitness, lower, upper)
+        chosen = self.select_batch(candidates, self.n)
+        return ParameterCollection(
+            self.from_unit(candidates[chosen]),
+            columns=self.parameter_config.parameter_names)
+
 
 optimizer_dict = {'random_sampling': RandomSampling,
+                  'noise_measurement': NoiseMeasurement,
                   'luus_jaakola': LuusJaakolaOptimizer,
                   'devolution': DEOptimizer,
-                  'pso': PSOOptimizerGbest}
+                  'pso': PSOOptimizer,
+                  'cmaes': CMAESOptimizer,
+                  'bayesian': BayesianOptimizer,
+                  'pattern_search': PatternSearchOptimizer}
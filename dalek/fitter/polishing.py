@@ -0,0 +1,126 @@
+import logging
+
+import numpy as np
+
+from dalek.fitter.optimizers import optimizer_dict as all_optimizer_dict
+from dalek.parallel.parameter_collection import ParameterCollection
+
+logger = logging.getLogger(__name__)
+
+
+class LocalPolishing(object):
+    """
+    Switch from the global optimizer to a local optimizer (by default a
+    `~dalek.fitter.optimizers.PatternSearchOptimizer`) once the global search
+    has stalled. The local optimizer starts from the best evaluation of the
+    global search and the fit stops when it has converged. The best
+    evaluation is part of the checkpointed state, so a resumed fit polishes
+    from the best evaluation of the whole fit.
+
+    Parameters
+    ----------
+
+    optimizer: ~dalek.fitter.optimizers.BaseOptimizer
+        local optimizer, it has to have a `converged` property
+
+    stall_generations: ~int
+        switch after the best fitness has not improved for this many
+        generations [default=10]
+
+    stall_tolerance: ~float
+        relative improvement of the best fitness below which a generation
+        counts as stalled [default=0.0]
+
+    """
+
+    checkpoint_attributes = ['active', 'best_fitness', 'best_x',
+                             'stalled_generations']
+
+    @classmethod
+    def from_conf_dict(cls, conf_dict, parameter_config, number_of_samples):
+        conf_dict = dict(conf_dict)
+        optimizer_conf_dict = dict(conf_dict.pop('optimizer',
+                                                 {'name': 'pattern_search'}))
+        optimizer_class = all_optimizer_dict[optimizer_conf_dict.pop('name')]
+        optimizer = optimizer_class(parameter_config, number_of_samples,
+                                    **optimizer_conf_dict)
+        return cls(optimizer, **conf_dict)
+
+    def __init__(self, optimizer, stall_generations=10, stall_tolerance=0.0):
+        self.optimizer = optimizer
+        self.stall_generations = stall_generations
+        self.stall_tolerance = stall_tolerance
+
+        self.active = False
+        self.best_fitness = None
+        self.best_x = None
+        self.stalled_generations = 0
+
+    @property
+    def parameter_names(self):
+        return self.optimizer.parameter_config.parameter_names
+
+    def get_state(self):
+        return dict((name, getattr(self, name))
+                    for name in self.checkpoint_attributes
+                    if getattr(self, name) is not None)
+
+    def set_state(self, state):
+        for name in self.checkpoint_attributes:
+            if name in state:
+                value = np.asarray(state[name])
+                if value.ndim == 0:
+                    setattr(self, name, value.item())
+                else:
+                    setattr(self, name, np.array(value, dtype=np.float64))
+
+    def update(self, parameter_collection):
+        """
+        Update the stall counter with an evaluated generation of the global
+        search
+
+        Returns
+        -------
+            : ~bool
+            whether the polishing should start
+        """
+        generation_best_fitness = parameter_collection['dalek.fitness'].min()
+        if self.best_fitness is None or generation_best_fitness < \
+                self.best_fitness:
+            self.best_x = parameter_collection.loc[
+                parameter_collection['dalek.fitness'].idxmin(),
+                self.parameter_names].values.astype(np.float64)
+
+        if self.best_fitness is None:
+            self.best_fitness = generation_best_fitness
+        elif generation_best_fitness < (self.best_fitness - self.stall_tolerance
+                                        * abs(self.best_fitness)):
+            self.best_fitness = generation_best_fitness
+            self.stalled_generations = 0
+        else:
+            self.best_fitness = min(self.best_fitness, generation_best_fitness)
+            self.stalled_generations += 1
+        return self.stalled_generations >= self.stall_generations
+
+    def start(self):
+        """
+        Start the polishing from the best evaluation of the generations
+        passed to `update`
+
+        Returns
+        -------
+            : ~dalek.parallel.ParameterCollection
+            parameters of the first polishing generation
+        """
+        self.active = True
+        best_evaluation = ParameterCollection(
+            self.best_x[np.newaxis], columns=self.parameter_names)
+        best_evaluation['dalek.fitness'] = self.best_fitness
+        logger.info('Global search stalled for {0:d} generations - polishing '
+                    'from best fitness {1:g}'.format(
+            self.stalled_generations, self.best_fitness))
+        return self.optimizer(best_evaluation)
+
+    @property
+    def converged(self):
+        return self.active and self.optimizer.converged
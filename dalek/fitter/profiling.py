@@ -0,0 +1,113 @@
+import logging
+import os
+import pstats
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _RawStats(object):
+    """
+    Wrapper to load the stats dictionary of a `cProfile.Profile` that was
+    returned from an engine into `pstats.Stats`
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProfileAggregator(object):
+    """
+    Merge the cProfile stats returned by the workers (see the `profile`
+    keyword of `~dalek.parallel.launcher.fitter_worker`). For every iteration
+    the stats of all profiled runs are written to
+    'iteration{iteration:04d}.prof', and the stats of every engine are
+    accumulated over the fit in 'engine{engine_id}.prof'. The files can be
+    read with `pstats.Stats` or viewers such as snakeviz.
+
+    Parameters
+    ----------
+
+    profile_dir: ~str
+        directory for the profile files, created if needed
+
+    fraction: ~float
+        fraction of the TARDIS runs that is profiled [default=0.1]
+
+    """
+
+    @classmethod
+    def from_conf_dict(cls, profile_conf_dict, default_profile_dir=None):
+        profile_conf_dict = dict(profile_conf_dict)
+        profile_dir = profile_conf_dict.pop('directory', default_profile_dir)
+        if profile_dir is None:
+            raise ValueError('No directory given for the profiles')
+        return cls(profile_dir, **profile_conf_dict)
+
+    def __init__(self, profile_dir, fraction=0.1):
+        if not 0 <= fraction <= 1:
+            raise ValueError('Profile fraction must be between 0 and 1 '
+                             '(given {0})'.format(fraction))
+        self.profile_dir = profile_dir
+        self.fraction = fraction
+        if not os.path.exists(profile_dir):
+            os.makedirs(profile_dir)
+
+        self.lock = threading.Lock()
+        self.iteration_stats = {}
+        self.engine_stats = {}
+        self.updated_engines = set()
+
+    @staticmethod
+    def _merge(merged_stats, stats):
+        if merged_stats is None:
+            # the same stats are merged into several profiles
+            return pstats.Stats(_RawStats(dict(stats)))
+        merged_stats.add(_RawStats(stats))
+        return merged_stats
+
+    def add(self, current_iteration, engine_id, stats):
+        """
+        Add the stats of a single profiled run
+
+        Parameters
+        ----------
+
+        current_iteration: ~int
+
+        engine_id: ~int
+
+        stats: ~dict
+            the `stats` attribute of a `cProfile.Profile` after `create_stats`
+        """
+        with self.lock:
+            self.iteration_stats[current_iteration] = self._merge(
+                self.iteration_stats.get(current_iteration, None), stats)
+            self.engine_stats[engine_id] = self._merge(
+                self.engine_stats.get(engine_id, None), stats)
+            self.updated_engines.add(engine_id)
+
+    def iteration_fname(self, current_iteration):
+        return os.path.join(self.profile_dir,
+                            'iteration{0:04d}.prof'.format(current_iteration))
+
+    def engine_fname(self, engine_id):
+        return os.path.join(self.profile_dir,
+                            'engine{0}.prof'.format(engine_id))
+
+    def finish_iteration(self, current_iteration):
+        """
+        Write the profile of the iteration and update the engine profiles
+        """
+        with self.lock:
+            iteration_stats = self.iteration_stats.pop(current_iteration, None)
+            if iteration_stats is None:
+                return
+            iteration_stats.dump_stats(self.iteration_fname(current_iteration))
+            for engine_id in self.updated_engines:
+                self.engine_stats[engine_id].dump_stats(
+                    self.engine_fname(engine_id))
+            self.updated_engines.clear()
@@ -0,0 +1,280 @@
+import heapq
+import logging
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from dalek.fitter.utilization import EngineUtilization
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerReplay(object):
+    """
+    Discrete-event simulation of the recorded TARDIS runtimes of a fit
+    ('dalek.time_elapsed' per iteration) under different scheduling policies
+
+    * 'barrier' - an iteration is dispatched after the previous one finished
+      and the driver ran the optimizer (`driver_time`), as in `BaseFitter`
+    * 'async' - engines never wait for the iteration barrier, the next run
+      is dispatched as soon as an engine is free (the driver work is assumed
+      to overlap with the runs)
+
+    Both policies support dispatching chunks of runs (one chunk runs
+    sequentially on one engine), longest-processing-time-first ordering of the
+    runs in an iteration (with the recorded runtimes, i.e. an oracle) and
+    speculative execution: once no runs are waiting, a free engine starts a
+    copy of the run that has been running longest if it has been running
+    longer than the `speculation_quantile` of the iteration's runtimes. The
+    runtime of the copy is drawn from the runtimes of the iteration; the run
+    finishes with the first copy and the other copy is cancelled.
+
+    Parameters
+    ----------
+
+    fitter_log: ~pandas.DataFrame
+
+    number_of_engines: ~int
+        if None the number of distinct engines in the log [default=None]
+
+    driver_time: ~float
+        time in seconds between two iterations for the barrier policy, if
+        None the median driver gap of the log (0 if the log has no task
+        timestamps) [default=None]
+
+    dispatch_latency: ~float
+        time in seconds from dispatching a chunk to it starting on the
+        engine [default=0.0]
+
+    seed: ~int
+        seed for the runtimes of speculative copies [default=None]
+
+    """
+
+    @classmethod
+    def from_csv(cls, fname, **kwargs):
+        return cls(pd.read_csv(fname, index_col=0), **kwargs)
+
+    def __init__(self, fitter_log, number_of_engines=None, driver_time=None,
+                 dispatch_latency=0.0, seed=None,
+                 iteration_column='dalek.current_iteration'):
+        self.runtimes = [group['dalek.time_elapsed'].values
+                         for _, group in fitter_log.groupby(iteration_column)]
+
+        if number_of_engines is None:
+            number_of_engines = fitter_log['dalek.engine_id'].nunique()
+        self.number_of_engines = number_of_engines
+
+        self.recorded_makespan = None
+        if 'dalek.started' in fitter_log.columns:
+            self.recorded_makespan = (fitter_log['dalek.completed'].max() -
+                                      fitter_log['dalek.started'].min())
+            if driver_time is None:
+                driver_gaps = EngineUtilization(
+                    fitter_log, number_of_engines=number_of_engines,
+                    iteration_column=iteration_column
+                ).iterations['driver_gap'].dropna()
+                if len(driver_gaps) > 0:
+                    driver_time = max(driver_gaps.median(), 0.0)
+        if driver_time is None:
+            driver_time = 0.0
+        self.driver_time = driver_time
+        self.dispatch_latency = dispatch_latency
+        self.seed = seed
+
+    @staticmethod
+    def make_chunks(runtimes, chunk_size, ordering):
+        """
+        Order the runtimes of an iteration and group them into chunks
+
+        Returns
+        -------
+            : ~list of ~np.ndarray
+        """
+        if ordering == 'lpt':
+            runtimes = np.sort(runtimes)[::-1]
+        elif ordering != 'fifo':
+            raise ValueError('Unknown ordering {0} - allowed are fifo and '
+                             'lpt'.format(ordering))
+        return [runtimes[i:i + chunk_size]
+                for i in xrange(0, len(runtimes), chunk_size)]
+
+    def _run_batch(self, chunks, start_time, random_state, speculative,
+                   speculation_quantile, runtime_pool):
+        """
+        Simulate running the chunks on the engines starting at `start_time`
+
+        Returns
+        -------
+            : ~tuple
+            end time and engine time spent on cancelled copies
+        """
+        pending = deque(xrange(len(chunks)))
+        chunk_runtimes = [np.sum(chunk) for chunk in chunks]
+        if speculative:
+            speculation_threshold = np.percentile(runtime_pool,
+                                                  speculation_quantile * 100)
+
+        idle_engines = self.number_of_engines
+        current_time = start_time
+        # chunk -> list of start times of its copies
+        running = {}
+        finished = set()
+        events = []
+        wasted_time = 0.0
+
+        while True:
+            while idle_engines > 0 and pending:
+                chunk_id = pending.popleft()
+                copy_start = current_time + self.dispatch_latency
+                running[chunk_id] = [copy_start]
+                heapq.heappush(events, (copy_start + chunk_runtimes[chunk_id],
+                                        chunk_id, 0))
+                idle_engines -= 1
+
+            while speculative and idle_engines > 0:
+                candidates = [(copies[0], chunk_id)
+                              for chunk_id, copies in running.items()
+                              if len(copies) == 1 and copies[0] +
+                              speculation_threshold * len(chunks[chunk_id])
+                              <= current_time]
+                if not candidates:
+                    break
+                chunk_id = min(candidates)[1]
+                copy_start = current_time + self.dispatch_latency
+                copy_runtime = np.sum(random_state.choice(
+                    runtime_pool, size=len(chunks[chunk_id])))
+                running[chunk_id].append(copy_start)
+                heapq.heappush(events, (copy_start + copy_runtime, chunk_id, 1))
+                idle_engines -= 1
+
+            if not events:
+                break
+
+            if speculative and idle_engines > 0:
+                # advance to the time a running chunk becomes a straggler
+                eligible_times = [
+                    copies[0] + speculation_threshold * len(chunks[chunk_id])
+                    for chunk_id, copies in running.items()
+                    if len(copies) == 1]
+                if eligible_times and min(eligible_times) < events[0][0]:
+                    current_time = max(min(eligible_times), current_time)
+                    continue
+
+            end_time, chunk_id, finished_copy = heapq.heappop(events)
+            if chunk_id in finished:
+                # copy that was cancelled
+                continue
+            current_time = end_time
+            finished.add(chunk_id)
+            copy_starts = running.pop(chunk_id)
+            for copy, copy_start in enumerate(copy_starts):
+                if copy != finished_copy:
+                    wasted_time += max(end_time - copy_start, 0.0)
+            idle_engines += len(copy_starts)
+
+        return current_time, wasted_time
+
+    def simulate(self, policy='barrier', chunk_size=1, ordering='fifo',
+                 speculative=False, speculation_quantile=0.9):
+        """
+        Simulate the fit under a policy
+
+        Parameters
+        ----------
+
+        policy: ~str
+            'barrier' or 'async' [default='barrier']
+
+        chunk_size: ~int
+            runs per dispatched chunk [default=1]
+
+        ordering: ~str
+            'fifo' (order of the log) or 'lpt' (longest runs first)
+            [default='fifo']
+
+        speculative: ~bool
+            use speculative execution for stragglers [default=False]
+
+        speculation_quantile: ~float
+            runtime quantile of the iteration after which a run is considered
+            a straggler [default=0.9]
+
+        Returns
+        -------
+            : ~collections.OrderedDict
+            predicted makespan, utilization (recorded runtime per engine
+            time) and the fraction of engine time spent on cancelled copies
+        """
+        random_state = np.random.RandomState(self.seed)
+        total_runtime = np.sum([np.sum(runtimes)
+                                for runtimes in self.runtimes])
+        wasted_time = 0.0
+
+        if policy == 'barrier':
+            current_time = 0.0
+            for i, runtimes in enumerate(self.runtimes):
+                if i > 0:
+                    current_time += self.driver_time
+                current_time, iteration_wasted_time = self._run_batch(
+                    self.make_chunks(runtimes, chunk_size, ordering),
+                    current_time, random_state, speculative,
+                    speculation_quantile, runtimes)
+                wasted_time += iteration_wasted_time
+            makespan = current_time
+        elif policy == 'async':
+            chunks = []
+            for runtimes in self.runtimes:
+                chunks += self.make_chunks(runtimes, chunk_size, ordering)
+            makespan, wasted_time = self._run_batch(
+                chunks, 0.0, random_state, speculative, speculation_quantile,
+                np.concatenate(self.runtimes))
+        else:
+            raise ValueError('Unknown policy {0} - allowed are barrier and '
+                             'async'.format(policy))
+
+        engine_time = self.number_of_engines * makespan
+        result = OrderedDict()
+        result['policy'] = policy
+        result['chunk_size'] = chunk_size
+        result['ordering'] = ordering
+        result['speculative'] = speculative
+        result['makespan'] = makespan
+        result['utilization'] = total_runtime / engine_time
+        result['wasted_fraction'] = wasted_time / engine_time
+        if self.recorded_makespan is not None:
+            result['speedup'] = self.recorded_makespan / makespan
+        else:
+            result['speedup'] = np.nan
+        return result
+
+    default_policies = [
+        dict(policy='barrier'),
+        dict(policy='barrier', chunk_size=2),
+        dict(policy='barrier', chunk_size=4),
+        dict(policy='barrier', ordering='lpt'),
+        dict(policy='barrier', speculative=True),
+        dict(policy='barrier', ordering='lpt', speculative=True),
+        dict(policy='async'),
+        dict(policy='async', speculative=True)]
+
+    def compare(self, policies=None):
+        """
+        Simulate several policies
+
+        Parameters
+        ----------
+
+        policies: ~list of ~dict
+            keyword arguments for `simulate` [default=default_policies]
+
+        Returns
+        -------
+            : ~pandas.DataFrame
+        """
+        if policies is None:
+            policies = self.default_policies
+        results = [self.simulate(**policy) for policy in policies]
+        return pd.DataFrame([item.values() for item in results],
+                            columns=results[0].keys())
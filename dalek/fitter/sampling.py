@@ -0,0 +1,228 @@
+"""
+Space-filling designs in the unit hypercube, used for the initial
+population of a fit and by `~dalek.fitter.optimizers.RandomSampling`
+"""
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+#: bits of the integer representation of the Sobol points
+sobol_bits = 30
+
+#: degree, coefficients and initial direction numbers of the primitive
+#: polynomials for the Sobol dimensions after the first (Joe & Kuo 2008)
+sobol_polynomials = [
+    (1, 0, [1]),
+    (2, 1, [1, 3]),
+    (3, 1, [1, 3, 1]),
+    (3, 2, [1, 1, 1]),
+    (4, 1, [1, 1, 3, 3]),
+    (4, 4, [1, 3, 5, 13]),
+    (5, 2, [1, 1, 5, 5, 17]),
+    (5, 4, [1, 1, 5, 5, 5]),
+    (5, 7, [1, 1, 7, 11, 19]),
+    (5, 11, [1, 1, 5, 1, 1]),
+    (5, 13, [1, 1, 1, 3, 11]),
+    (5, 14, [1, 3, 5, 5, 31]),
+    (6, 1, [1, 3, 3, 9, 7, 49]),
+    (6, 13, [1, 1, 1, 15, 21, 21]),
+    (6, 16, [1, 3, 1, 13, 27, 49]),
+    (6, 19, [1, 1, 1, 15, 7, 5]),
+    (6, 22, [1, 3, 1, 15, 13, 25]),
+    (6, 25, [1, 1, 5, 5, 19, 61]),
+    (7, 1, [1, 3, 7, 11, 23, 15, 103]),
+    (7, 4, [1, 3, 7, 13, 13, 15, 69])]
+
+sobol_max_dim = len(sobol_polynomials) + 1
+
+
+def get_random_state(random_state):
+    if random_state is None:
+        return np.random
+    return random_state
+
+
+def uniform(number_of_samples, dim, random_state=None, start_index=0):
+    """
+    Independent uniform samples
+    """
+    return get_random_state(random_state).uniform(
+        0, 1, (dim, number_of_samples)).T
+
+
+def latin_hypercube(number_of_samples, dim, random_state=None,
+                    start_index=0):
+    """
+    Latin hypercube design: every parameter has exactly one sample in each
+    of `number_of_samples` equally wide bins
+    """
+    random_state = get_random_state(random_state)
+    bins = np.argsort(random_state.uniform(0, 1, (number_of_samples, dim)),
+                      axis=0)
+    return (bins + random_state.uniform(0, 1, (number_of_samples, dim))) / \
+        float(number_of_samples)
+
+
+def first_primes(number_of_primes):
+    primes = []
+    candidate = 2
+    while len(primes) < number_of_primes:
+        if all(candidate % prime for prime in primes):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+def halton(number_of_samples, dim, random_state=None, start_index=0,
+           scramble=True):
+    """
+    Halton sequence (points `start_index` to `start_index` +
+    `number_of_samples` - 1). Scrambling applies a random permutation of the
+    nonzero digits per dimension, which removes the correlation between the
+    dimensions of large prime bases.
+    """
+    random_state = get_random_state(random_state)
+    indices = np.arange(start_index, start_index + number_of_samples)
+    points = np.zeros((number_of_samples, dim))
+    for i, base in enumerate(first_primes(dim)):
+        if scramble:
+            permutation = np.hstack(([0], 1 + random_state.permutation(
+                base - 1)))
+        else:
+            permutation = np.arange(base)
+        remaining = indices.copy()
+        scale = 1. / base
+        while np.any(remaining > 0):
+            points[:, i] += permutation[remaining % base] * scale
+            remaining //= base
+            scale /= base
+    return points
+
+
+def sobol_direction_numbers(dim):
+    """
+    Direction numbers of the Sobol sequence as `sobol_bits` bit integers
+
+    Returns
+    -------
+        : ~np.ndarray
+        array of shape (dim, sobol_bits)
+    """
+    if dim > sobol_max_dim:
+        raise ValueError('Sobol sequences are available for up to {0} '
+                         'dimensions - use the halton or lhs '
+                         'design'.format(sobol_max_dim))
+    direction_numbers = np.zeros((dim, sobol_bits), dtype=np.int64)
+    direction_numbers[0] = 1 << np.arange(sobol_bits - 1, -1, -1)
+    for i, (degree, coefficients, initial_m) in enumerate(
+            sobol_polynomials[:dim - 1]):
+        m = list(initial_m)
+        for k in xrange(degree, sobol_bits):
+            new_m = m[k - degree] ^ (m[k - degree] << degree)
+            for j in xrange(1, degree):
+                if (coefficients >> (degree - 1 - j)) & 1:
+                    new_m ^= m[k - j] << j
+            m.append(new_m)
+        direction_numbers[i + 1] = (np.array(m, dtype=np.int64) <<
+                                    np.arange(sobol_bits - 1, -1, -1))
+    return direction_numbers
+
+
+def sobol(number_of_samples, dim, random_state=None, start_index=0,
+          scramble=True):
+    """
+    Sobol sequence (points `start_index` to `start_index` +
+    `number_of_samples` - 1). Scrambling is a random linear matrix
+    scramble followed by a random digital shift, which keeps the
+    equidistribution properties of the sequence. The balance properties hold
+    for powers of two samples.
+    """
+    random_state = get_random_state(random_state)
+    direction_numbers = sobol_direction_numbers(dim)
+    shift = np.zeros(dim, dtype=np.int64)
+    if scramble:
+        digit_values = 1 << np.arange(sobol_bits - 1, -1, -1)
+        # digits of the direction numbers, most significant first
+        digits = (direction_numbers[:, :, np.newaxis] >>
+                  np.arange(sobol_bits - 1, -1, -1)) & 1
+        scramble_matrices = np.tril(random_state.randint(
+            0, 2, (dim, sobol_bits, sobol_bits)), -1)
+        scramble_matrices[:, np.arange(sobol_bits), np.arange(sobol_bits)] = 1
+        scrambled_digits = np.einsum('ikl,ijl->ijk', scramble_matrices,
+                                     digits) % 2
+        direction_numbers = scrambled_digits.dot(digit_values)
+        shift = random_state.randint(0, 2 ** sobol_bits, dim).astype(np.int64)
+
+    indices = np.arange(start_index, start_index + number_of_samples,
+                        dtype=np.int64)
+    gray_code = indices ^ (indices >> 1)
+    points = np.tile(shift, (number_of_samples, 1))
+    for bit in xrange(sobol_bits):
+        points ^= (((gray_code >> bit) & 1)[:, np.newaxis] *
+                   direction_numbers[:, bit])
+    return points / float(2 ** sobol_bits)
+
+
+design_dict = {'uniform': uniform,
+               'lhs': latin_hypercube,
+               'halton': halton,
+               'sobol': sobol}
+
+#: designs that are sequences which can be continued
+sequence_designs = ('halton', 'sobol')
+
+
+def check_design(design, dim):
+    """
+    Check that the design exists and is available for `dim` parameters (the
+    Sobol sequence is only available for up to `sobol_max_dim` dimensions)
+
+    Raises
+    ------
+        ValueError
+    """
+    if design not in design_dict:
+        raise ValueError('Unknown design {0} - allowed are {1}'.format(
+            design, ', '.join(sorted(design_dict))))
+    if design == 'sobol' and dim > sobol_max_dim:
+        raise ValueError('Sobol sequences are available for up to {0} '
+                         'dimensions, the fit has {1} parameters - use the '
+                         'halton or lhs design'.format(sobol_max_dim, dim))
+
+
+def make_design(design, number_of_samples, parameter_config,
+                random_state=None, start_index=0):
+    """
+    Samples of a design within the parameter bounds
+
+    Parameters
+    ----------
+
+    design: ~str
+        name of the design in `design_dict` (see `check_design`)
+
+    number_of_samples: ~int
+
+    parameter_config: ~dalek.fitter.base.ParameterConfiguration
+
+    random_state: ~np.random.RandomState
+        if None the global numpy random state [default=None]
+
+    start_index: ~int
+        index of the first point of sequence designs [default=0]
+
+    Returns
+    -------
+        : ~np.ndarray
+        array of shape (number_of_samples, number of parameters)
+    """
+    dim = len(parameter_config.parameter_names)
+    check_design(design, dim)
+    points = design_dict[design](
+        number_of_samples, dim, random_state=random_state,
+        start_index=start_index)
+    return (parameter_config.lbounds + points *
+            (parameter_config.ubounds - parameter_config.lbounds))
@@ -0,0 +1,174 @@
+import logging
+from time import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class StoppingCriteria(object):
+    """
+    Convergence and budget based stopping rules for the fitter. All criteria
+    are optional, a fit always stops at `max_iterations`.
+
+    Parameters
+    ----------
+
+    parameter_config: ~dalek.fitter.base.ParameterConfiguration
+
+    fitness_tolerance: ~float
+        stop if the spread (max - min) of the fitness in a generation is
+        smaller than this value
+
+    max_stalled_generations: ~int
+        stop if the best fitness has not improved for this many generations
+
+    stall_tolerance: ~float
+        relative improvement of the best fitness below which a generation
+        counts as stalled [default=0.0]
+
+    diversity_tolerance: ~float
+        stop if the mean standard deviation of the parameters in a generation
+        (in units of the parameter bounds) falls below this value
+
+    max_wall_time: ~float
+        stop after this many seconds of wall-clock time
+
+    max_core_hours: ~float
+        stop after the TARDIS runs used this many core-hours (sum of
+        'dalek.time_elapsed')
+
+    fitness_target: ~float
+        stop as soon as the best fitness is at or below this value
+
+    """
+
+    checkpoint_attributes = ['best_fitness', 'stalled_generations',
+                             'core_seconds', 'wall_time']
+
+    @classmethod
+    def from_conf_dict(cls, stopping_conf_dict, parameter_config):
+        return cls(parameter_config, **stopping_conf_dict)
+
+    def __init__(self, parameter_config, fitness_tolerance=None,
+                 max_stalled_generations=None, stall_tolerance=0.0,
+                 diversity_tolerance=None, max_wall_time=None,
+                 max_core_hours=None, fitness_target=None):
+        self.parameter_config = parameter_config
+        self.fitness_tolerance = fitness_tolerance
+        self.max_stalled_generations = max_stalled_generations
+        self.stall_tolerance = stall_tolerance
+        self.diversity_tolerance = diversity_tolerance
+        self.max_wall_time = max_wall_time
+        self.max_core_hours = max_core_hours
+        self.fitness_target = fitness_target
+
+        self.best_fitness = None
+        self.stalled_generations = 0
+        self.core_seconds = 0.0
+        self.wall_time = 0.0
+        self.last_time = None
+
+    def get_state(self):
+        return dict((name, getattr(self, name))
+                    for name in self.checkpoint_attributes
+                    if getattr(self, name) is not None)
+
+    def set_state(self, state):
+        for name in self.checkpoint_attributes:
+            if name in state:
+                setattr(self, name, np.asarray(state[name]).item())
+
+    def start(self):
+        """
+        Start the wall-clock timer (called at the start of `run_fitter`)
+        """
+        self.last_time = time()
+
+    def update(self, parameter_collection):
+        """
+        Update the statistics with an evaluated generation
+
+        Parameters
+        ----------
+
+        parameter_collection: ~dalek.parallel.ParameterCollection
+        """
+        current_time = time()
+        if self.last_time is not None:
+            self.wall_time += current_time - self.last_time
+        self.last_time = current_time
+
+        self.core_seconds += parameter_collection['dalek.time_elapsed'].sum()
+
+        generation_best_fitness = parameter_collection['dalek.fitness'].min()
+        if self.best_fitness is None:
+            self.best_fitness = generation_best_fitness
+        elif generation_best_fitness < (self.best_fitness - self.stall_tolerance
+                                        * abs(self.best_fitness)):
+            self.best_fitness = generation_best_fitness
+            self.stalled_generations = 0
+        else:
+            self.best_fitness = min(self.best_fitness, generation_best_fitness)
+            self.stalled_generations += 1
+
+    def diversity(self, parameter_collection):
+        """
+        Mean standard deviation of the parameters in units of their bounds
+        """
+        parameter_ranges = (self.parameter_config.ubounds -
+                            self.parameter_config.lbounds)
+        parameters = parameter_collection[
+            self.parameter_config.parameter_names].values
+        return np.mean(parameters.std(axis=0) / parameter_ranges)
+
+    def __call__(self, parameter_collection):
+        """
+        Update the statistics with the evaluated generation and check whether
+        the fit should stop
+
+        Parameters
+        ----------
+
+        parameter_collection: ~dalek.parallel.ParameterCollection
+
+        Returns
+        -------
+            : ~str or None
+            reason for stopping or None if the fit should continue
+        """
+        self.update(parameter_collection)
+        fitness = parameter_collection['dalek.fitness']
+
+        if (self.fitness_target is not None and
+                self.best_fitness <= self.fitness_target):
+            return 'best fitness {0:g} reached target {1:g}'.format(
+                self.best_fitness, self.fitness_target)
+
+        if (self.fitness_tolerance is not None and
+                fitness.max() - fitness.min() < self.fitness_tolerance):
+            return 'fitness spread {0:g} below tolerance {1:g}'.format(
+                fitness.max() - fitness.min(), self.fitness_tolerance)
+
+        if (self.max_stalled_generations is not None and
+                self.stalled_generations >= self.max_stalled_generations):
+            return 'best fitness has not improved for {0:d} ' \
+                   'generations'.format(self.stalled_generations)
+
+        if self.diversity_tolerance is not None:
+            diversity = self.diversity(parameter_collection)
+            if diversity < self.diversity_tolerance:
+                return 'population diversity {0:g} below tolerance ' \
+                       '{1:g}'.format(diversity, self.diversity_tolerance)
+
+        if (self.max_wall_time is not None and
+                self.wall_time >= self.max_wall_time):
+            return 'wall-clock limit of {0:g} s reached'.format(
+                self.max_wall_time)
+
+        if (self.max_core_hours is not None and
+                self.core_seconds / 3600. >= self.max_core_hours):
+            return 'core-hour budget of {0:g} reached'.format(
+                self.max_core_hours)
+
+        return None
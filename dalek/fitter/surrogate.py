@@ -0,0 +1,457 @@
+import copy
+import logging
+from collections import OrderedDict
+
+import numpy as np
+from scipy.linalg import cho_solve, solve_triangular
+
+logger = logging.getLogger(__name__)
+
+
+def pairwise_distances(x1, x2):
+    """
+    Euclidean distances between the rows of two arrays
+
+    Returns
+    -------
+        : ~np.ndarray
+        array of shape (len(x1), len(x2))
+    """
+    squared_distances = (np.sum(x1 ** 2, axis=1)[:, np.newaxis] +
+                         np.sum(x2 ** 2, axis=1)[np.newaxis, :] -
+                         2 * x1.dot(x2.T))
+    return np.sqrt(np.maximum(squared_distances, 0.))
+
+
+class BaseSurrogate(object):
+    """
+    Regression model of the fitness in unit coordinates (the parameter bounds
+    scaled to [0, 1]). The fitness is standardized before fitting.
+    """
+
+    def fit(self, x, y):
+        raise NotImplementedError
+
+    def predict(self, x):
+        """
+        Predict the fitness
+
+        Returns
+        -------
+            : ~tuple
+            prediction and uncertainty (both in units of the fitness)
+        """
+        raise NotImplementedError
+
+    def standardize(self, y):
+        self.y_mean = np.mean(y)
+        self.y_std = np.std(y)
+        if not self.y_std > 0:
+            self.y_std = 1.
+        return (y - self.y_mean) / self.y_std
+
+
+class RBFSurrogate(BaseSurrogate):
+    """
+    Radial basis function interpolation with a linear polynomial tail. The
+    uncertainty is a heuristic: the distance to the nearest evaluated point
+    times the standard deviation of the evaluated fitness.
+
+    Parameters
+    ----------
+
+    kernel: ~str
+        'cubic', 'thin_plate' or 'gaussian' [default='cubic']
+
+    epsilon: ~float
+        shape parameter of the gaussian kernel [default=1.0]
+
+    smoothing: ~float
+        added to the diagonal of the interpolation matrix, values above 0
+        turn the interpolation into a smoothing fit of noisy fitness values
+        [default=1e-6]
+
+    """
+
+    kernels = ('cubic', 'thin_plate', 'gaussian')
+
+    def __init__(self, kernel='cubic', epsilon=1.0, smoothing=1e-6):
+        if kernel not in self.kernels:
+            raise ValueError('Unknown kernel {0} - allowed are {1}'.format(
+                kernel, ', '.join(self.kernels)))
+        self.kernel = kernel
+        self.epsilon = epsilon
+        self.smoothing = smoothing
+
+    def basis(self, r):
+        if self.kernel == 'cubic':
+            return r ** 3
+        elif self.kernel == 'thin_plate':
+            return r ** 2 * np.log(np.where(r > 0, r, 1.))
+        else:
+            return np.exp(-(self.epsilon * r) ** 2)
+
+    def fit(self, x, y):
+        self.x = np.array(x, dtype=np.float64)
+        number_of_points, dim = self.x.shape
+        tail = np.hstack((np.ones((number_of_points, 1)), self.x))
+        system = np.zeros((number_of_points + dim + 1,) * 2)
+        system[:number_of_points, :number_of_points] = (
+            self.basis(pairwise_distances(self.x, self.x)) +
+            self.smoothing * np.eye(number_of_points))
+        system[:number_of_points, number_of_points:] = tail
+        system[number_of_points:, :number_of_points] = tail.T
+        rhs = np.zeros(number_of_points + dim + 1)
+        rhs[:number_of_points] = self.standardize(np.asarray(y))
+        try:
+            coefficients = np.linalg.solve(system, rhs)
+        except np.linalg.LinAlgError:
+            coefficients = np.linalg.lstsq(system, rhs, rcond=None)[0]
+        self.weights = coefficients[:number_of_points]
+        self.tail_coefficients = coefficients[number_of_points:]
+        return self
+
+    def predict(self, x):
+        distances = pairwise_distances(np.asarray(x, dtype=np.float64), self.x)
+        prediction = (self.basis(distances).dot(self.weights) +
+                      self.tail_coefficients[0] +
+                      np.asarray(x).dot(self.tail_coefficients[1:]))
+        return (self.y_mean + self.y_std * prediction,
+                self.y_std * distances.min(axis=1))
+
+
+class GPSurrogate(BaseSurrogate):
+    """
+    Gaussian-process regression with an isotropic Matern 5/2 or squared
+    exponential kernel. The length scale and the noise level are chosen from
+    grids by maximizing the marginal likelihood at every fit.
+
+    Parameters
+    ----------
+
+    kernel: ~str
+        'matern52' or 'squared_exponential' [default='matern52']
+
+    length_scales: ~list of ~float
+        candidate length scales in unit coordinates
+        [default=logarithmically spaced from 0.03 to 3]
+
+    noise_levels: ~list of ~float
+        candidate noise variances relative to the fitness variance
+        [default=(1e-8, 1e-6, 1e-4, 1e-2, 1e-1)]
+
+    """
+
+    kernels = ('matern52', 'squared_exponential')
+
+    def __init__(self, kernel='matern52', length_scales=None,
+                 noise_levels=(1e-8, 1e-6, 1e-4, 1e-2, 1e-1)):
+        if kernel not in self.kernels:
+            raise ValueError('Unknown kernel {0} - allowed are {1}'.format(
+                kernel, ', '.join(self.kernels)))
+        self.kernel = kernel
+        if length_scales is None:
+            length_scales = np.logspace(np.log10(0.03), np.log10(3.), 10)
+        self.length_scales = np.atleast_1d(length_scales)
+        self.noise_levels = np.atleast_1d(noise_levels)
+        self.length_scale = None
+        self.noise_level = None
+
+    def covariance(self, distances, length_scale):
+        r = distances / length_scale
+        if self.kernel == 'matern52':
+            return ((1. + np.sqrt(5.) * r + 5. / 3. * r ** 2) *
+                    np.exp(-np.sqrt(5.) * r))
+        return np.exp(-0.5 * r ** 2)
+
+    def fit(self, x, y):
+        self.x = np.array(x, dtype=np.float64)
+        y = self.standardize(np.asarray(y))
+        distances = pairwise_distances(self.x, self.x)
+
+        best_likelihood = -np.inf
+        for length_scale in self.length_scales:
+            covariance = self.covariance(distances, length_scale)
+            for noise_level in self.noise_levels:
+                try:
+                    cholesky = np.linalg.cholesky(
+                        covariance + noise_level * np.eye(len(y)))
+                except np.linalg.LinAlgError:
+                    continue
+                alpha = cho_solve((cholesky, True), y)
+                likelihood = (-0.5 * y.dot(alpha) -
+                              np.sum(np.log(np.diag(cholesky))))
+                if likelihood > best_likelihood:
+                    best_likelihood = likelihood
+                    self.length_scale = length_scale
+                    self.noise_level = noise_level
+                    self.cholesky = cholesky
+                    self.alpha = alpha
+        if not np.isfinite(best_likelihood):
+            raise np.linalg.LinAlgError('Covariance matrix is not positive '
+                                        'definite for any noise level')
+        return self
+
+    def predict(self, x):
+        cross_covariance = self.covariance(
+            pairwise_distances(np.asarray(x, dtype=np.float64), self.x),
+            self.length_scale)
+        prediction = cross_covariance.dot(self.alpha)
+        v = solve_triangular(self.cholesky, cross_covariance.T, lower=True)
+        variance = np.maximum(1. - np.sum(v ** 2, axis=0), 0.)
+        return (self.y_mean + self.y_std * prediction,
+                self.y_std * np.sqrt(variance))
+
+
+surrogate_dict = {'rbf': RBFSurrogate,
+                  'gp': GPSurrogate}
+
+
+class SurrogateScreening(object):
+    """
+    Pre-screening of the candidates of the optimizer with a surrogate of the
+    fitness that is trained on the evaluation history. The history (the
+    `max_history` most recent evaluations, see `update`) is part of the
+    checkpointed state, so it is complete after resuming a fit.
+
+    The optimizer is run `oversampling` times on the same evaluated
+    generation (on copies of its state), so that there are `oversampling`
+    candidates for every row of the next generation. For every row the
+    candidate with the best score is dispatched:
+
+    * 'prediction' - lowest predicted fitness
+    * 'lcb' - lowest predicted fitness minus `kappa` times the uncertainty
+    * 'uncertainty' - highest uncertainty (exploration)
+
+    Choosing per row keeps the candidates attached to the individual that
+    proposed them (e.g. the parent of a differential evolution trial). State
+    of the optimizer that belongs to a single candidate (see
+    `~dalek.fitter.optimizers.BaseOptimizer.candidate_attributes`) is taken
+    from the copy that proposed the chosen candidate.
+
+    The prediction and uncertainty of the dispatched candidates are logged in
+    the columns 'dalek.surrogate_prediction' and 'dalek.surrogate_uncertainty'
+    (NaN while the surrogate is not trained).
+
+    Parameters
+    ----------
+
+    parameter_config: ~dalek.fitter.base.ParameterConfiguration
+
+    surrogate: BaseSurrogate
+        [default=RBFSurrogate()]
+
+    oversampling: ~int
+        candidates generated per dispatched candidate [default=4]
+
+    criterion: ~str
+        [default='prediction']
+
+    kappa: ~float
+        [default=2.0]
+
+    min_history: ~int
+        number of evaluations before the screening starts, if None two times
+        the number of parameters plus one [default=None]
+
+    max_history: ~int
+        number of most recent evaluations the surrogate is trained on
+        [default=1000]
+
+    """
+
+    criteria = ('prediction', 'lcb', 'uncertainty')
+
+    checkpoint_attributes = ['x', 'fitness']
+
+    prediction_columns = ['dalek.surrogate_prediction',
+                          'dalek.surrogate_uncertainty']
+
+    @classmethod
+    def from_conf_dict(cls, conf_dict, parameter_config):
+        conf_dict = dict(conf_dict)
+        model_dict = dict(conf_dict.pop('model', {'name': 'rbf'}))
+        surrogate_class = surrogate_dict[model_dict.pop('name')]
+        return cls(parameter_config, surrogate=surrogate_class(**model_dict),
+                   **conf_dict)
+
+    def __init__(self, parameter_config, surrogate=None, oversampling=4,
+                 criterion='prediction', kappa=2.0, min_history=None,
+                 max_history=1000):
+        if criterion not in self.criteria:
+            raise ValueError('Unknown criterion {0} - allowed are {1}'.format(
+                criterion, ', '.join(self.criteria)))
+        if surrogate is None:
+            surrogate = RBFSurrogate()
+        self.parameter_config = parameter_config
+        self.surrogate = surrogate
+        self.oversampling = oversampling
+        self.criterion = criterion
+        self.kappa = kappa
+        if min_history is None:
+            min_history = 2 * (len(parameter_config.parameter_names) + 1)
+        self.min_history = min_history
+        self.max_history = max_history
+
+        self.x = np.zeros((0, len(parameter_config.parameter_names)))
+        self.fitness = np.zeros(0)
+
+    def get_state(self):
+        return dict((name, getattr(self, name))
+                    for name in self.checkpoint_attributes)
+
+    def set_state(self, state):
+        for name in self.checkpoint_attributes:
+            if name in state:
+                setattr(self, name, np.array(state[name], dtype=np.float64))
+
+    def to_unit(self, x):
+        return ((x - self.parameter_config.lbounds) /
+                (self.parameter_config.ubounds -
+                 self.parameter_config.lbounds))
+
+    def update(self, parameter_collection):
+        """
+        Add the evaluations with a finite fitness to the history, keeping the
+        most recent `max_history`
+
+        Parameters
+        ----------
+
+        parameter_collection: ~dalek.parallel.ParameterCollection
+            evaluated parameter collection
+        """
+        fitness = parameter_collection['dalek.fitness'].values
+        finite = np.isfinite(fitness)
+        x = parameter_collection[
+            self.parameter_config.parameter_names].values[finite]
+        self.x = np.vstack((self.x, x))[-self.max_history:]
+        self.fitness = np.hstack((self.fitness,
+                                  fitness[finite]))[-self.max_history:]
+
+    def get_training_data(self):
+        """
+        Unit coordinates and fitness of the history
+        """
+        return self.to_unit(self.x), self.fitness
+
+    def predict(self, parameter_collection):
+        """
+        Predict the fitness of a parameter collection
+
+        Returns
+        -------
+            : ~tuple
+            prediction and uncertainty
+        """
+        return self.surrogate.predict(self.to_unit(
+            parameter_collection[self.parameter_config.parameter_names].values))
+
+    def score(self, prediction, uncertainty):
+        """
+        Score of candidates (lower is better)
+        """
+        if self.criterion == 'prediction':
+            return prediction
+        elif self.criterion == 'lcb':
+            return prediction - self.kappa * uncertainty
+        return -uncertainty
+
+    def add_prediction_columns(self, parameter_collection, prediction=np.nan,
+                               uncertainty=np.nan):
+        parameter_collection = parameter_collection.copy()
+        parameter_collection['dalek.surrogate_prediction'] = prediction
+        parameter_collection['dalek.surrogate_uncertainty'] = uncertainty
+        return parameter_collection
+
+    def __call__(self, optimizer, evaluated_parameter_collection):
+        """
+        Run the optimizer and screen its candidates. The surrogate is trained
+        on the history, which should already contain the evaluated generation
+        (see `update`).
+
+        Parameters
+        ----------
+
+        optimizer: ~dalek.fitter.optimizers.BaseOptimizer
+
+        evaluated_parameter_collection: ~dalek.parallel.ParameterCollection
+            evaluated generation passed on to the optimizer
+
+        Returns
+        -------
+            : ~dalek.parallel.ParameterCollection
+            candidates for the next iteration
+        """
+        x, fitness = self.get_training_data()
+        if len(fitness) < self.min_history:
+            return self.add_prediction_columns(
+                optimizer(evaluated_parameter_collection))
+
+        self.surrogate.fit(x, fitness)
+
+        optimizer_copies = [copy.deepcopy(optimizer)
+                            for _ in xrange(self.oversampling - 1)]
+        candidates = optimizer(evaluated_parameter_collection.copy())
+        candidate_sets = [candidates]
+        for optimizer_copy in optimizer_copies:
+            candidate_sets.append(optimizer_copy(
+                evaluated_parameter_collection.copy()))
+        # e.g. CMA-ES restarts with a random population size
+        copy_ids = [i for i, candidate_set in enumerate(candidate_sets)
+                    if len(candidate_set) == len(candidates)]
+
+        parameter_names = self.parameter_config.parameter_names
+        values = np.array([candidate_sets[i][parameter_names].values
+                           for i in copy_ids])
+        number_of_copies, number_of_candidates, dim = values.shape
+        prediction, uncertainty = self.surrogate.predict(
+            self.to_unit(values.reshape(-1, dim)))
+        prediction = prediction.reshape(number_of_copies, number_of_candidates)
+        uncertainty = uncertainty.reshape(number_of_copies,
+                                          number_of_candidates)
+
+        choice = np.argmin(self.score(prediction, uncertainty), axis=0)
+        rows = np.arange(number_of_candidates)
+        optimizers = [optimizer] + optimizer_copies
+        optimizer.adopt_candidates([optimizers[i] for i in copy_ids], choice)
+
+        candidates = candidates.copy()
+        candidates[parameter_names] = values[choice, rows]
+        logger.debug('Surrogate screening chose candidates from {0} of {1} '
+                     'optimizer runs'.format(len(np.unique(choice)),
+                                             number_of_copies))
+        return self.add_prediction_columns(candidates,
+                                           prediction[choice, rows],
+                                           uncertainty[choice, rows])
+
+    @staticmethod
+    def prediction_error(evaluated_parameter_collection):
+        """
+        Accuracy of the surrogate predictions of an evaluated generation
+
+        Returns
+        -------
+            : ~collections.OrderedDict
+            number of predicted rows, root mean square error, rank correlation
+            between prediction and fitness and the fraction of the fitness
+            values within the predicted uncertainty
+        """
+        predicted = evaluated_parameter_collection[np.isfinite(
+            evaluated_parameter_collection['dalek.surrogate_prediction'])]
+        error = OrderedDict()
+        error['predicted'] = len(predicted)
+        if len(predicted) < 2:
+            error['rmse'] = np.nan
+            error['rank_correlation'] = np.nan
+            error['within_uncertainty'] = np.nan
+            return error
+        residuals = (predicted['dalek.fitness'] -
+                     predicted['dalek.surrogate_prediction'])
+        error['rmse'] = np.sqrt(np.mean(residuals ** 2))
+        error['rank_correlation'] = np.corrcoef(
+            predicted['dalek.fitness'].rank(),
+            predicted['dalek.surrogate_prediction'].rank())[0, 1]
+        error['within_uncertainty'] = np.mean(
+            np.abs(residuals) <= predicted['dalek.surrogate_uncertainty'])
+        return error
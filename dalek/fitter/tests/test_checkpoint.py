@@ -0,0 +1,49 @@
+from dalek.fitter.base import ParameterConfiguration
+from dalek.fitter.checkpoint import OptimizerCheckpoint
+from dalek.fitter.optimizers import DEOptimizer
+from dalek.parallel.parameter_collection import ParameterCollection
+import numpy as np
+
+import numpy.testing as nptesting
+
+
+def test_checkpoint_roundtrip(tmpdir):
+    np.random.seed(250880)
+    parameter_config = ParameterConfiguration(['param.a', 'param.b'],
+                                              [[0, 1], [-1, 1]])
+    optimizer = DEOptimizer(parameter_config, 10)
+    parameter_collection = ParameterCollection(
+        np.random.uniform(0, 1, (10, 2)), columns=['param.a', 'param.b'])
+    parameter_collection['dalek.fitness'] = np.random.uniform(0, 1, 10)
+    next_parameter_collection = optimizer(parameter_collection)
+
+    checkpoint = OptimizerCheckpoint(str(tmpdir.join('checkpoint.npz')))
+    checkpoint.save(3, optimizer.get_state(), next_parameter_collection)
+    random_sample = np.random.random()
+
+    restored_optimizer = DEOptimizer(parameter_config, 10)
+    (current_iteration, optimizer_state, restored_parameter_collection,
+     random_state, fitter_state) = checkpoint.load()
+    restored_optimizer.set_state(optimizer_state)
+    np.random.set_state(random_state)
+
+    assert current_iteration == 3
+    assert np.random.random() == random_sample
+    nptesting.assert_allclose(restored_optimizer.population,
+                              optimizer.population)
+    nptesting.assert_allclose(restored_optimizer.fitness, optimizer.fitness)
+    nptesting.assert_allclose(restored_parameter_collection.values,
+                              next_parameter_collection.values)
+    assert (restored_parameter_collection.columns.tolist() ==
+            next_parameter_collection.columns.tolist())
+
+
+def test_checkpoint_fitter_state(tmpdir):
+    parameter_collection = ParameterCollection(
+        np.random.uniform(0, 1, (10, 2)), columns=['param.a', 'param.b'])
+    checkpoint = OptimizerCheckpoint(str(tmpdir.join('checkpoint.npz')))
+    checkpoint.save(3, {}, parameter_collection, fitter_state={
+        'best_fitness': 0.5, 'stop_reason': 'core-hour budget of 2 reached'})
+    fitter_state = checkpoint.load()[-1]
+    assert fitter_state['best_fitness'] == 0.5
+    assert str(fitter_state['stop_reason']) == 'core-hour budget of 2 reached'
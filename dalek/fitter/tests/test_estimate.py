@@ -0,0 +1,65 @@
+from dalek.fitter.estimate import RuntimeModel, CostEstimator
+from dalek.fitter.base import ParameterConfiguration
+from dalek.parallel.launcher import LocalLauncher
+from dalek.parallel.parameter_collection import ParameterCollection
+from dalek.benchmarks.mock_worker import MockTARDISWorker, RuntimeDistribution
+from dalek.benchmarks.synthetic import make_synthetic_fitter_configuration
+import numpy as np
+import pytest
+
+import numpy.testing as nptesting
+
+
+@pytest.fixture
+def parameter_config():
+    return ParameterConfiguration(['param.x0', 'param.x1'],
+                                  [(0., 1.), (-10., 10.)])
+
+
+def test_runtime_model(parameter_config):
+    parameter_collection = ParameterCollection(
+        np.random.uniform([0., -10.], [1., 10.], (50, 2)),
+        columns=parameter_config.parameter_names)
+    runtimes = np.exp(1. + 2. * parameter_collection['param.x0'].values)
+
+    runtime_model = RuntimeModel(parameter_config)
+    runtime_model.fit(parameter_collection, runtimes)
+    nptesting.assert_allclose(runtime_model.coefficients, [1., 2., 0.],
+                              atol=1e-8)
+    assert runtime_model.sigma < 1e-8
+    nptesting.assert_allclose(runtime_model.predict(parameter_collection),
+                              runtimes)
+
+
+def test_runtime_model_few_runs(parameter_config):
+    parameter_collection = ParameterCollection(
+        [[0.5, 0.], [0.5, 1.]], columns=parameter_config.parameter_names)
+    runtime_model = RuntimeModel(parameter_config)
+    runtime_model.fit(parameter_collection, np.array([1., 4.]))
+    nptesting.assert_allclose(runtime_model.predict(parameter_collection),
+                              [2., 2.])
+
+
+def test_cost_estimator():
+    fitter_configuration = make_synthetic_fitter_configuration(
+        'pso', 'sphere', 2, 10, 6)
+    worker = MockTARDISWorker(RuntimeDistribution('constant', median=0.01),
+                              spectrum_bins=100)
+    launcher = LocalLauncher(worker)
+
+    estimator = CostEstimator(fitter_configuration, launcher,
+                              store_spectra=True)
+    with pytest.raises(ValueError):
+        estimator.estimate()
+    estimator.calibrate(5)
+
+    estimate = estimator.estimate(simulated_iterations=3, seed=1)
+    assert estimate['calibration_runs'] == 5
+    assert estimate['number_of_runs'] == 60
+    # one engine runs all 60 runs sequentially
+    assert estimate['wall_time'] >= 60 * 0.01
+    nptesting.assert_allclose(estimate['busy_core_hours'] * 3600,
+                              60 * estimate['median_runtime'], rtol=0.5)
+    assert estimate['spectral_store_size'] == 60 * 100 * 8
+    assert estimate['fitter_log_size'] > 60 * 20
+    assert 'Wall time' in estimator.report()
@@ -0,0 +1,44 @@
+import dalek
+from dalek.fitter.fitness_function import (SimpleRMSFitnessFunction,
+                                           MultiTargetRMSFitnessFunction)
+import numpy as np
+import os
+from astropy import units as u
+
+import numpy.testing as nptesting
+
+
+def get_test_data(fname):
+    return os.path.join(dalek.__path__[0], 'fitter', 'tests', fname)
+
+
+class MockSpectrum(object):
+    def __init__(self, wavelength, flux_lambda):
+        self.wavelength = wavelength * u.angstrom
+        self.flux_lambda = flux_lambda * u.erg / u.s / u.cm**2 / u.angstrom
+        self.flux_nu = flux_lambda * u.erg / u.s / u.cm**2 / u.Hz
+
+
+class MockModel(object):
+    def __init__(self):
+        wavelength = np.linspace(20000, 500, 100)
+        self.spectrum = MockSpectrum(wavelength, np.ones_like(wavelength))
+        self.spectrum_virtual = MockSpectrum(wavelength,
+                                             np.zeros_like(wavelength))
+
+
+def test_multi_target_fitness():
+    model = MockModel()
+    single_fitness, _ = SimpleRMSFitnessFunction(get_test_data('myspec.dat'))(
+        model)
+
+    fitness_function = MultiTargetRMSFitnessFunction(
+        {'epoch1': get_test_data('myspec.dat'),
+         'epoch2': get_test_data('myspec.dat')}, weights={'epoch2': 0.5})
+    fitness, spectrum = fitness_function(model)
+
+    assert spectrum is model.spectrum
+    assert sorted(fitness_function.target_names) == ['epoch1', 'epoch2']
+    nptesting.assert_allclose(fitness, [single_fitness, single_fitness])
+    nptesting.assert_allclose(fitness_function.combine_fitness(fitness),
+                              1.5 * single_fitness)
@@ -15,9 +15,33 @@ class TestYAMLRead():
         assert self.conf.parameter_config.parameter_names[0] == 'param.b'
         nptesting.assert_allclose(self.conf.parameter_config.lbounds[0], -1)
         assert self.conf.atom_data is not None
-
-
-
+        assert self.conf.stopping_criteria.max_stalled_generations == 20
+        # no health section
+        assert self.conf.engine_monitor is None
+
+
+
+def test_dry_run(tmpdir):
+    fitter_log = tmpdir.join('fitter_log.csv')
+    log_content = ',param.b,param.a,dalek.fitness,dalek.current_iteration\n' \
+                  '0,0.5,0.5,1.0,0\n1,0.2,0.3'
+    fitter_log.write(log_content)
+    spectral_store = tmpdir.join('spectra.h5')
+    conf_fname = tmpdir.join('fitter_conf.yml')
+    with open(get_test_data('test_fitter_conf.yml')) as fh:
+        conf_fname.write(fh.read() +
+                         '\n    fitter_log: {0}\n'
+                         '    spectral_store:\n'
+                         '        fname: {1}\n'.format(fitter_log,
+                                                       spectral_store))
+
+    conf = FitterConfiguration.from_yaml(str(conf_fname), dry_run=True)
+    assert not conf.resume
+    assert conf.current_iteration == 0
+    assert conf.spectral_store is None
+    assert conf.spectral_store_conf['fname'] == str(spectral_store)
+    assert fitter_log.read() == log_content
+    assert not spectral_store.check()
 
 
 def test_simple_fitter_configuration():
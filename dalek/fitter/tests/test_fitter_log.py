@@ -0,0 +1,97 @@
+from dalek.fitter.fitter_log import FitterLog
+from dalek.parallel.parameter_collection import ParameterCollection
+import numpy as np
+from collections import OrderedDict
+
+import numpy.testing as nptesting
+
+
+def make_iteration(iteration, offset, no_of_rows=5):
+    parameter_collection = ParameterCollection(OrderedDict([
+        ('param.a', np.random.uniform(0, 1, no_of_rows)),
+        ('param.b', np.random.uniform(0, 1, no_of_rows)),
+        ('dalek.fitness', np.random.uniform(0, 1, no_of_rows))]))
+    parameter_collection['dalek.current_iteration'] = iteration
+    parameter_collection.index = np.arange(offset, offset + no_of_rows)
+    return parameter_collection
+
+
+class TestFitterLog(object):
+
+    def setup(self):
+        np.random.seed(250880)
+
+    def test_read_last_iteration(self, tmpdir):
+        fitter_log = FitterLog(str(tmpdir.join('fitter_log.csv')),
+                               block_size=64)
+        for i in xrange(4):
+            last_iteration = make_iteration(i, i * 5)
+            fitter_log.append(last_iteration)
+
+        assert fitter_log.columns == ['param.a', 'param.b', 'dalek.fitness',
+                                      'dalek.current_iteration']
+
+        resume_log = fitter_log.read_last_iteration()
+        assert len(resume_log) == 5
+        assert resume_log.index.tolist() == range(15, 20)
+        nptesting.assert_allclose(resume_log['param.a'],
+                                  last_iteration['param.a'])
+
+    def test_truncate_incomplete_line(self, tmpdir):
+        fname = str(tmpdir.join('fitter_log.csv'))
+        fitter_log = FitterLog(fname)
+        fitter_log.append(make_iteration(0, 0))
+        fitter_log.append(make_iteration(1, 5))
+        with open(fname, 'ab') as fh:
+            fh.write('10,0.5,0.3')
+
+        fitter_log.truncate_incomplete_line()
+        resume_log = fitter_log.read_last_iteration()
+        assert len(resume_log) == 5
+        assert (resume_log['dalek.current_iteration'] == 1).all()
+
+    def test_append_new_columns(self, tmpdir):
+        fitter_log = FitterLog(str(tmpdir.join('fitter_log.csv')))
+        first_iteration = make_iteration(0, 0)
+        fitter_log.append(first_iteration)
+        second_iteration = make_iteration(1, 5)
+        second_iteration['montecarlo.seed'] = np.arange(5)
+        fitter_log.append(second_iteration)
+
+        assert fitter_log.columns[-1] == 'montecarlo.seed'
+        log = fitter_log.read()
+        assert len(log) == 10
+        assert np.all(np.isnan(log['montecarlo.seed'].values[:5]))
+        nptesting.assert_allclose(log['montecarlo.seed'].values[5:],
+                                  np.arange(5))
+        nptesting.assert_allclose(log['param.a'].values[:5],
+                                  first_iteration['param.a'])
+        assert len(fitter_log.read_last_iteration()) == 5
+
+    def test_read_columns(self, tmpdir):
+        fitter_log = FitterLog(str(tmpdir.join('fitter_log.csv')))
+        fitter_log.append(make_iteration(0, 0))
+        fitter_log.append(make_iteration(1, 5))
+        log = fitter_log.read(columns=['dalek.fitness', 'param.a'])
+        assert log.columns.tolist() == ['param.a', 'dalek.fitness']
+        assert log.index.tolist() == range(10)
+
+    def test_initial_columns(self, tmpdir):
+        fname = str(tmpdir.join('fitter_log.csv'))
+        fitter_log = FitterLog(fname, columns=[
+            'param.a', 'param.b', 'montecarlo.seed', 'dalek.fitness',
+            'dalek.current_iteration'])
+        fitter_log.append(make_iteration(0, 0))
+        with open(fname, 'rb') as fh:
+            first_content = fh.read()
+        second_iteration = make_iteration(1, 5)
+        second_iteration['montecarlo.seed'] = np.arange(5)
+        fitter_log.append(second_iteration)
+
+        # the column was in the header, so the log was not rewritten
+        with open(fname, 'rb') as fh:
+            assert fh.read().startswith(first_content)
+        assert fitter_log.columns[2] == 'montecarlo.seed'
+        log = fitter_log.read()
+        nptesting.assert_allclose(log['montecarlo.seed'].values[5:],
+                                  np.arange(5))
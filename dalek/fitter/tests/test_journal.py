@@ -0,0 +1,35 @@
+from dalek.fitter.journal import TaskJournal
+from dalek.parallel.parameter_collection import ParameterCollection
+import numpy as np
+from collections import OrderedDict
+
+import numpy.testing as nptesting
+
+
+def make_parameter_collection():
+    return ParameterCollection(np.random.uniform(0, 1, (4, 2)),
+                               columns=['param.a', 'param.b'])
+
+
+def test_journal_uncommitted_iteration(tmpdir):
+    np.random.seed(250880)
+    journal = TaskJournal(str(tmpdir.join('journal.jsonl')))
+
+    journal.dispatch(0, make_parameter_collection())
+    journal.record_result(0, 1, OrderedDict([('dalek.fitness', 0.5)]))
+    journal.commit(0)
+    assert journal.load() is None
+
+    parameter_collection = make_parameter_collection()
+    journal.dispatch(1, parameter_collection)
+    journal.record_result(1, 2, OrderedDict([('dalek.fitness', 0.25),
+                                             ('dalek.engine_id', 3)]))
+    with open(journal.fname, 'ab') as fh:
+        fh.write('{"type": "result", "iter')
+
+    current_iteration, restored_parameter_collection, results = journal.load()
+    assert current_iteration == 1
+    nptesting.assert_allclose(restored_parameter_collection.values,
+                              parameter_collection.values)
+    assert results.keys() == [2]
+    assert results[2].keys() == ['dalek.fitness', 'dalek.engine_id']
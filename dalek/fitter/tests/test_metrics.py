@@ -0,0 +1,35 @@
+from dalek.fitter.metrics import IterationTimer
+import numpy as np
+import pandas as pd
+
+import numpy.testing as nptesting
+
+
+def test_iteration_timer(tmpdir):
+    metrics_fname = str(tmpdir.join('fitter_metrics.csv'))
+    timer = IterationTimer(metrics_fname)
+    for i in xrange(2):
+        timer.start_iteration(i)
+        with timer.phase(i, 'optimizer'):
+            pass
+        timer.add(i, 'wait', 2.)
+        timer.add(i, 'wait', 1.)
+        timer.add_task(i, {'queue_wait': 1., 'worker.tardis_run': 10.})
+        timer.add_task(i, {'queue_wait': 3., 'worker.tardis_run': 20.})
+        timer.timed(i, 'log_write', lambda x: x)(1)
+        timer.finish_iteration(i)
+
+    metrics = pd.read_csv(metrics_fname, index_col=0)
+    assert metrics['iteration'].tolist() == [0, 1]
+    nptesting.assert_allclose(metrics['wait'], 3.)
+    nptesting.assert_allclose(metrics['queue_wait.total'], 4.)
+    nptesting.assert_allclose(metrics['queue_wait.mean'], 2.)
+    nptesting.assert_allclose(metrics['worker.tardis_run.max'], 20.)
+    assert metrics['no_of_tasks'].tolist() == [2, 2]
+    assert np.isnan(metrics['result_transfer.total']).all()
+
+    summary = timer.summary()
+    nptesting.assert_allclose(summary.loc['wait', 'total'], 6.)
+    nptesting.assert_allclose(summary.loc['wait', 'per_iteration'], 3.)
+    nptesting.assert_allclose(
+        summary.loc['worker.tardis_run.total', 'per_iteration'], 30.)
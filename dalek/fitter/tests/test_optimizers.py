@@ -0,0 +1,389 @@
+from dalek.fitter.base import ParameterConfiguration
+from dalek.fitter import sampling
+from dalek.fitter.optimizers import DEOptimizer, PSOOptimizer, \
+    CMAESOptimizer, BayesianOptimizer, PatternSearchOptimizer, \
+    RandomSampling, expected_improvement, optimizer_dict
+from dalek.parallel.parameter_collection import ParameterCollection
+import numpy as np
+import pytest
+
+import numpy.testing as nptesting
+
+
+@pytest.fixture
+def parameter_config():
+    return ParameterConfiguration(['param.a', 'param.b', 'param.c'],
+                                  [[0, 1], [-1, 1], [0, 2]])
+
+
+def make_parameter_collection(parameter_config, number_of_samples):
+    parameter_collection = ParameterCollection(
+        np.random.uniform(parameter_config.lbounds, parameter_config.ubounds,
+                          (number_of_samples, 3)),
+        columns=parameter_config.parameter_names)
+    parameter_collection['dalek.fitness'] = np.random.uniform(
+        0, 1, number_of_samples)
+    return parameter_collection
+
+
+def test_de_sample_distinct_indices():
+    np.random.seed(250880)
+    for _ in xrange(100):
+        indices = DEOptimizer.sample_distinct_indices(5, 3)
+        for i, row in enumerate(indices):
+            assert i not in row
+            assert len(set(row)) == 3
+    # all ordered triples of the other individuals are drawn
+    triples = set([tuple(DEOptimizer.sample_distinct_indices(5, 3)[0])
+                   for _ in xrange(1000)])
+    assert len(triples) == 4 * 3 * 2
+
+
+def test_de_optimizer(parameter_config):
+    np.random.seed(250880)
+    optimizer = DEOptimizer(parameter_config, 20, cr=0.5)
+    parameter_collection = make_parameter_collection(parameter_config, 20)
+    candidates = optimizer(parameter_collection)
+    assert candidates.columns.tolist() == parameter_config.parameter_names
+    assert np.all(candidates.values >= parameter_config.lbounds)
+    assert np.all(candidates.values <= parameter_config.ubounds)
+
+    # only improved candidates replace their parent
+    candidates['dalek.fitness'] = np.where(np.arange(20) < 10, -1., 2.)
+    population = optimizer.population.copy()
+    optimizer(candidates)
+    nptesting.assert_allclose(
+        optimizer.population[:10],
+        candidates[parameter_config.parameter_names].values[:10])
+    nptesting.assert_allclose(optimizer.population[10:], population[10:])
+    nptesting.assert_allclose(optimizer.fitness[:10], -1.)
+
+
+def test_de_optimizer_minimizes(parameter_config):
+    np.random.seed(250880)
+    optimizer = DEOptimizer(parameter_config, 20)
+    parameter_collection = make_parameter_collection(parameter_config, 20)
+    for _ in xrange(50):
+        parameter_collection['dalek.fitness'] = np.sum(
+            (parameter_collection[parameter_config.parameter_names].values -
+             0.5) ** 2, axis=1)
+        parameter_collection = optimizer(parameter_collection)
+    assert optimizer.fitness.min() < 1e-4
+
+
+def test_pso_neighbours():
+    assert PSOOptimizer.make_neighbours('gbest', 5) is None
+    nptesting.assert_array_equal(PSOOptimizer.make_neighbours('ring', 4),
+                                 [[3, 1], [0, 2], [1, 3], [2, 0]])
+    neighbours = PSOOptimizer.make_neighbours('von_neumann', 9)
+    nptesting.assert_array_equal(neighbours[4], [3, 5, 1, 7])
+    nptesting.assert_array_equal(neighbours[0], [2, 1, 6, 3])
+    nptesting.assert_array_equal(neighbours[8], [7, 6, 5, 2])
+    nptesting.assert_array_equal(PSOOptimizer.make_neighbours('von_neumann', 2),
+                                 [[1, 1, 1, 1], [0, 0, 0, 0]])
+
+
+@pytest.mark.parametrize('n', [2, 3, 5, 9, 10, 12, 17])
+def test_pso_von_neumann_torus(n):
+    neighbours = PSOOptimizer.make_neighbours('von_neumann', n)
+    assert neighbours.shape == (n, 4)
+    assert np.all((neighbours >= 0) & (neighbours < n))
+    assert not np.any(neighbours == np.arange(n)[:, np.newaxis])
+    # on a torus the neighbour relation is symmetric
+    for i in xrange(n):
+        for j in neighbours[i]:
+            assert i in neighbours[j]
+
+
+@pytest.mark.parametrize('topology', PSOOptimizer.topologies)
+def test_pso_best_neighbours(parameter_config, topology):
+    optimizer = PSOOptimizer(parameter_config, 9, topology=topology)
+    optimizer.py = np.array([5., 1., 3., 0., 4., 6., 7., 8., 2.])
+    best_neighbours = optimizer.best_neighbours()
+    for index in xrange(9):
+        neighbourhood = optimizer.neighbourhood(index)
+        assert index not in neighbourhood
+        assert best_neighbours[index] == neighbourhood[
+            np.argmin(optimizer.py[neighbourhood])]
+
+
+def test_pso_unknown_topology(parameter_config):
+    with pytest.raises(ValueError):
+        PSOOptimizer(parameter_config, 9, topology='star')
+
+
+@pytest.mark.parametrize('topology', PSOOptimizer.topologies)
+def test_pso_optimizer(parameter_config, topology):
+    np.random.seed(250880)
+    optimizer = PSOOptimizer(parameter_config, 16, topology=topology)
+    parameter_collection = make_parameter_collection(parameter_config, 16)
+    # the fitness is not the last column
+    parameter_collection = parameter_collection[
+        ['dalek.fitness'] + parameter_config.parameter_names]
+    for _ in xrange(50):
+        parameter_collection['dalek.fitness'] = np.sum(
+            (parameter_collection[parameter_config.parameter_names].values -
+             0.5) ** 2, axis=1)
+        parameter_collection = optimizer(parameter_collection)
+        assert np.all(parameter_collection.values >= parameter_config.lbounds)
+        assert np.all(parameter_collection.values <= parameter_config.ubounds)
+    assert optimizer.py.min() < 1e-3
+
+
+def sphere_fitness(parameter_collection, parameter_names, center=0.5):
+    return np.sum((parameter_collection[parameter_names].values - center) ** 2,
+                  axis=1)
+
+
+def test_cmaes_registered():
+    assert optimizer_dict['cmaes'] is CMAESOptimizer
+
+
+def test_cmaes_mirror():
+    nptesting.assert_allclose(CMAESOptimizer.mirror(
+        np.array([-0.25, 0.5, 1.25, 2.5])), [0.25, 0.5, 0.75, 0.5])
+
+
+def test_cmaes_optimizer(parameter_config):
+    np.random.seed(250880)
+    optimizer = CMAESOptimizer(parameter_config, 10)
+    parameter_collection = make_parameter_collection(parameter_config, 10)
+    for _ in xrange(80):
+        parameter_collection['dalek.fitness'] = sphere_fitness(
+            parameter_collection, parameter_config.parameter_names)
+        parameter_collection = optimizer(parameter_collection)
+        assert len(parameter_collection) == 10
+        assert np.all(parameter_collection.values >= parameter_config.lbounds)
+        assert np.all(parameter_collection.values <= parameter_config.ubounds)
+    assert optimizer.best_fitness < 1e-8
+    assert optimizer.sigma < 1e-3
+
+
+def test_cmaes_correlated():
+    # narrow valley along the diagonal
+    parameter_config = ParameterConfiguration(['param.a', 'param.b'],
+                                              [[-1, 1], [-1, 1]])
+    np.random.seed(250880)
+    optimizer = CMAESOptimizer(parameter_config, 8)
+    parameter_collection = ParameterCollection(
+        np.random.uniform(-1, 1, (8, 2)),
+        columns=parameter_config.parameter_names)
+    for _ in xrange(100):
+        x = parameter_collection[parameter_config.parameter_names].values
+        parameter_collection['dalek.fitness'] = (
+            (x[:, 0] + x[:, 1]) ** 2 + 1e3 * (x[:, 0] - x[:, 1] - 0.2) ** 2)
+        parameter_collection = optimizer(parameter_collection)
+    nptesting.assert_allclose(optimizer.best_x, [0.1, -0.1], atol=1e-4)
+    eigenvalues = np.linalg.eigvalsh(optimizer.C)
+    assert eigenvalues.max() / eigenvalues.min() > 100
+
+
+def test_cmaes_normalizes_abundances():
+    parameter_config = ParameterConfiguration(
+        ['model.abundances.o', 'model.abundances.c', 'model.abundances.si'],
+        [[0, 1]] * 3)
+    np.random.seed(250880)
+    optimizer = CMAESOptimizer(parameter_config, 6)
+    parameter_collection = make_parameter_collection(parameter_config, 6)
+    parameter_collection.columns = (parameter_config.parameter_names +
+                                    ['dalek.fitness'])
+    candidates = optimizer(parameter_collection)
+    nptesting.assert_allclose(candidates.sum(axis=1), 1.)
+
+
+@pytest.mark.parametrize('restarts', ['ipop', 'bipop'])
+def test_cmaes_restarts(parameter_config, restarts):
+    np.random.seed(250880)
+    optimizer = CMAESOptimizer(parameter_config, 6, restarts=restarts,
+                               max_restarts=3, tol_x=1e-3)
+    parameter_collection = make_parameter_collection(parameter_config, 6)
+    population_sizes = []
+    for _ in xrange(200):
+        parameter_collection['dalek.fitness'] = sphere_fitness(
+            parameter_collection, parameter_config.parameter_names)
+        parameter_collection = optimizer(parameter_collection)
+        population_sizes.append(len(parameter_collection))
+    assert optimizer.restart == 3
+    if restarts == 'ipop':
+        assert sorted(set(population_sizes)) == [6, 12, 24, 48]
+    else:
+        assert optimizer.small_evaluations > 0
+    assert optimizer.best_fitness < 1e-4
+
+
+def test_cmaes_state(parameter_config):
+    np.random.seed(250880)
+    optimizer = CMAESOptimizer(parameter_config, 6, restarts='bipop')
+    parameter_collection = make_parameter_collection(parameter_config, 6)
+    for _ in xrange(3):
+        parameter_collection['dalek.fitness'] = sphere_fitness(
+            parameter_collection, parameter_config.parameter_names)
+        parameter_collection = optimizer(parameter_collection)
+    parameter_collection['dalek.fitness'] = sphere_fitness(
+        parameter_collection, parameter_config.parameter_names)
+
+    restored_optimizer = CMAESOptimizer(parameter_config, 6, restarts='bipop')
+    restored_optimizer.set_state(dict(
+        (key, np.asarray(value)) for key, value
+        in optimizer.get_state().items()))
+    assert restored_optimizer.regime == 'large'
+
+    random_state = np.random.get_state()
+    candidates = optimizer(parameter_collection.copy())
+    np.random.set_state(random_state)
+    restored_candidates = restored_optimizer(parameter_collection.copy())
+    nptesting.assert_allclose(restored_candidates.values, candidates.values)
+
+
+def test_expected_improvement():
+    improvement = expected_improvement(np.array([0., 1., 1.]),
+                                       np.array([1., 1., 0.]), 1.)
+    assert improvement[0] > improvement[1] > improvement[2]
+    nptesting.assert_allclose(improvement[1], 1. / np.sqrt(2 * np.pi))
+
+
+def test_bayesian_optimizer(parameter_config):
+    np.random.seed(250880)
+    optimizer = optimizer_dict['bayesian'](parameter_config, 5)
+    parameter_collection = make_parameter_collection(parameter_config, 5)
+    for _ in xrange(10):
+        parameter_collection['dalek.fitness'] = sphere_fitness(
+            parameter_collection, parameter_config.parameter_names)
+        parameter_collection = optimizer(parameter_collection)
+        assert len(parameter_collection) == 5
+        assert len(parameter_collection.drop_duplicates()) == 5
+        assert np.all(parameter_collection.values >= parameter_config.lbounds)
+        assert np.all(parameter_collection.values <= parameter_config.ubounds)
+    assert len(optimizer.x) == 50
+    assert optimizer.fitness.min() < 1e-3
+
+
+def test_bayesian_optimizer_local_approximation(parameter_config):
+    np.random.seed(250880)
+    optimizer = BayesianOptimizer(parameter_config, 4, max_points=20)
+    parameter_collection = make_parameter_collection(parameter_config, 40)
+    parameter_collection['dalek.fitness'] = sphere_fitness(
+        parameter_collection, parameter_config.parameter_names)
+    candidates = optimizer(parameter_collection)
+    assert len(optimizer.gp.x) == 20
+
+    # the candidates are within the box of the evaluations nearest to the
+    # best one
+    x = optimizer.to_unit(optimizer.x)
+    nearest = np.argsort(np.sum((x - x[np.argmin(optimizer.fitness)]) ** 2,
+                                axis=1))[:20]
+    y = optimizer.to_unit(candidates.values)
+    assert np.all(y >= x[nearest].min(axis=0) - 1e-12)
+    assert np.all(y <= x[nearest].max(axis=0) + 1e-12)
+
+
+def test_bayesian_max_history(parameter_config):
+    np.random.seed(250880)
+    optimizer = BayesianOptimizer(parameter_config, 4, max_points=10,
+                                  max_history=30)
+    first_generation = make_parameter_collection(parameter_config, 20)
+    first_generation['dalek.fitness'] += 1.
+    first_generation.loc[3, 'dalek.fitness'] = 0.
+    optimizer(first_generation)
+    for _ in xrange(2):
+        generation = make_parameter_collection(parameter_config, 20)
+        generation['dalek.fitness'] += 1.
+        optimizer(generation)
+
+    # the most recent evaluations and the best one
+    assert len(optimizer.x) == 30
+    assert optimizer.fitness[0] == 0.
+    nptesting.assert_allclose(optimizer.x[0],
+                              first_generation.iloc[3, :3].values)
+    nptesting.assert_allclose(optimizer.x[-20:], generation.values[:, :3])
+
+
+def test_pattern_search_poll(parameter_config):
+    np.random.seed(250880)
+    optimizer = PatternSearchOptimizer(parameter_config, 9, initial_step=0.1)
+    parameter_collection = ParameterCollection(
+        [[0.5, 0., 1.]], columns=parameter_config.parameter_names)
+    parameter_collection['dalek.fitness'] = 1.
+    candidates = optimizer(parameter_collection)
+    assert len(candidates) == 9
+    # a full stencil at the initial step and a partial one at half of it
+    nptesting.assert_allclose(optimizer.poll_steps[:6], 0.1)
+    nptesting.assert_allclose(optimizer.poll_steps[6:], 0.05)
+    offsets = np.abs(optimizer.to_unit(candidates.values) - optimizer.center)
+    nptesting.assert_allclose(offsets.max(axis=1), optimizer.poll_steps)
+    assert np.all(np.sum(offsets > 0, axis=1) == 1)
+
+    # no improvement halves the smallest step size
+    candidates['dalek.fitness'] = 2.
+    optimizer(candidates)
+    assert optimizer.step == 0.025
+    nptesting.assert_allclose(optimizer.from_unit(optimizer.center),
+                              [0.5, 0., 1.])
+
+
+def test_pattern_search_optimizer(parameter_config):
+    np.random.seed(250880)
+    optimizer = optimizer_dict['pattern_search'](parameter_config, 12,
+                                                 min_step=1e-6)
+    parameter_collection = make_parameter_collection(parameter_config, 12)
+    for _ in xrange(40):
+        parameter_collection['dalek.fitness'] = sphere_fitness(
+            parameter_collection, parameter_config.parameter_names, 0.3)
+        parameter_collection = optimizer(parameter_collection)
+        assert np.all(parameter_collection.values >= parameter_config.lbounds)
+        assert np.all(parameter_collection.values <= parameter_config.ubounds)
+        if optimizer.converged:
+            break
+    assert optimizer.converged
+    nptesting.assert_allclose(optimizer.from_unit(optimizer.center), 0.3,
+                              atol=1e-5)
+
+
+@pytest.mark.parametrize('design', ['sobol', 'halton', 'lhs', 'uniform'])
+def test_random_sampling(parameter_config, design):
+    np.random.seed(250880)
+    optimizer = optimizer_dict['random_sampling'](parameter_config, 8,
+                                                  design=design)
+    parameter_collection = make_parameter_collection(parameter_config, 8)
+    samples = [optimizer(parameter_collection) for _ in xrange(2)]
+    assert optimizer.drawn == 16
+    for sample in samples:
+        assert sample.columns.tolist() == parameter_config.parameter_names
+        assert np.all(sample.values >= parameter_config.lbounds)
+        assert np.all(sample.values <= parameter_config.ubounds)
+    if design == 'sobol':
+        # two generations are the first 16 points of one sequence
+        x = np.vstack([sample.values for sample in samples])
+        x = (x - parameter_config.lbounds) / (parameter_config.ubounds -
+                                              parameter_config.lbounds)
+        nptesting.assert_array_equal(np.sort(np.floor(x[:, 0] * 16)),
+                                     np.arange(16))
+
+
+def test_random_sampling_design(parameter_config):
+    assert RandomSampling(parameter_config, 8).design == 'sobol'
+    dim = sampling.sobol_max_dim + 1
+    many_parameters = ParameterConfiguration(
+        ['param.x{0:d}'.format(i) for i in xrange(dim)], [[0, 1]] * dim)
+    assert RandomSampling(many_parameters, 8).design == 'halton'
+    with pytest.raises(ValueError):
+        RandomSampling(many_parameters, 8, design='sobol')
+
+
+def test_noise_measurement(parameter_config):
+    np.random.seed(250880)
+    optimizer = optimizer_dict['noise_measurement'](parameter_config, 6)
+    parameter_collection = make_parameter_collection(parameter_config, 10)
+    samples = optimizer(parameter_collection)
+    best = parameter_collection[parameter_config.parameter_names].values[
+        parameter_collection['dalek.fitness'].values.argmin()]
+    nptesting.assert_allclose(
+        samples[parameter_config.parameter_names].values,
+        np.tile(best, (6, 1)))
+    assert samples['montecarlo.seed'].nunique() > 1
+
+    initial_parameters = optimizer.add_extra_columns(
+        parameter_collection[parameter_config.parameter_names])
+    assert initial_parameters['montecarlo.seed'].nunique() > 1
+    assert optimizer.add_extra_columns(initial_parameters) is \
+        initial_parameters
@@ -0,0 +1,82 @@
+from dalek.fitter.base import ParameterConfiguration
+from dalek.fitter.optimizers import PatternSearchOptimizer
+from dalek.fitter.polishing import LocalPolishing
+from dalek.parallel.parameter_collection import ParameterCollection
+import numpy as np
+import pandas as pd
+import pytest
+
+import numpy.testing as nptesting
+
+
+@pytest.fixture
+def parameter_config():
+    return ParameterConfiguration(['param.a', 'param.b'], [[0, 1], [0, 2]])
+
+
+def make_generation(best_fitness, number_of_samples=4):
+    parameter_collection = ParameterCollection(
+        np.random.uniform(0, 1, (number_of_samples, 2)),
+        columns=['param.a', 'param.b'])
+    parameter_collection['dalek.fitness'] = best_fitness + np.arange(
+        number_of_samples)
+    return parameter_collection
+
+
+def test_polishing_from_conf_dict(parameter_config):
+    polishing = LocalPolishing.from_conf_dict(
+        {'stall_generations': 5,
+         'optimizer': {'name': 'pattern_search', 'initial_step': 0.1}},
+        parameter_config, 4)
+    assert polishing.stall_generations == 5
+    assert isinstance(polishing.optimizer, PatternSearchOptimizer)
+    assert polishing.optimizer.initial_step == 0.1
+    assert polishing.optimizer.n == 4
+
+
+def test_polishing_stall(parameter_config):
+    np.random.seed(250880)
+    polishing = LocalPolishing(PatternSearchOptimizer(parameter_config, 4),
+                               stall_generations=2, stall_tolerance=0.1)
+    assert not polishing.update(make_generation(1.))
+    assert not polishing.update(make_generation(0.5))
+    # improvements below the tolerance count as stalled
+    assert not polishing.update(make_generation(0.49))
+    assert polishing.update(make_generation(0.6))
+    assert polishing.stalled_generations == 2
+    assert not polishing.converged
+
+
+def test_polishing_start(parameter_config):
+    np.random.seed(250880)
+    polishing = LocalPolishing(PatternSearchOptimizer(parameter_config, 4))
+    generations = [make_generation(0., number_of_samples=10)
+                   for _ in xrange(3)]
+    for i, generation in enumerate(generations):
+        generation.index = np.arange(100 + 10 * i, 110 + 10 * i)
+        generation['dalek.fitness'] = np.random.uniform(0, 1, 10)
+        polishing.update(generation)
+    fitter_log = pd.concat(generations)
+    best_x = fitter_log.loc[fitter_log['dalek.fitness'].idxmin(),
+                            ['param.a', 'param.b']].values
+    assert polishing.best_fitness == fitter_log['dalek.fitness'].min()
+    nptesting.assert_allclose(polishing.best_x, best_x)
+
+    # the best evaluation survives a checkpoint
+    restored_polishing = LocalPolishing(
+        PatternSearchOptimizer(parameter_config, 4))
+    restored_polishing.set_state(dict(
+        (key, np.asarray(value)) for key, value
+        in polishing.get_state().items()))
+    candidates = restored_polishing.start()
+    assert restored_polishing.active
+    nptesting.assert_allclose(restored_polishing.optimizer.from_unit(
+        restored_polishing.optimizer.center), best_x)
+    assert len(candidates) == 4
+
+    restored_polishing = LocalPolishing(
+        PatternSearchOptimizer(parameter_config, 4))
+    restored_polishing.set_state(dict(
+        (key, np.asarray(value)) for key, value
+        in polishing.get_state().items()))
+    assert restored_polishing.active is False
@@ -0,0 +1,50 @@
+from dalek.fitter.profiling import ProfileAggregator
+import cProfile
+import os
+import pstats
+import pytest
+
+
+def profiled_function(n):
+    return sum(range(n))
+
+
+def profile_stats(n):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    profiled_function(n)
+    profiler.disable()
+    profiler.create_stats()
+    return profiler.stats
+
+
+def get_call_count(stats, function_name):
+    return sum([value[1] for key, value in stats.stats.items()
+                if key[2] == function_name])
+
+
+def test_profile_aggregator(tmpdir):
+    profile_dir = str(tmpdir.join('profiles'))
+    aggregator = ProfileAggregator(profile_dir, fraction=0.5)
+    aggregator.add(0, 1, profile_stats(10))
+    aggregator.add(0, 2, profile_stats(10))
+    aggregator.finish_iteration(0)
+    aggregator.add(1, 1, profile_stats(10))
+    aggregator.finish_iteration(1)
+    aggregator.finish_iteration(2)
+
+    assert sorted(os.listdir(profile_dir)) == [
+        'engine1.prof', 'engine2.prof', 'iteration0000.prof',
+        'iteration0001.prof']
+    iteration_stats = pstats.Stats(aggregator.iteration_fname(0))
+    assert get_call_count(iteration_stats, 'profiled_function') == 2
+    engine_stats = pstats.Stats(aggregator.engine_fname(1))
+    assert get_call_count(engine_stats, 'profiled_function') == 2
+
+
+def test_profile_conf_dict(tmpdir):
+    aggregator = ProfileAggregator.from_conf_dict(
+        {'fraction': 0.2}, default_profile_dir=str(tmpdir.join('profiles')))
+    assert aggregator.fraction == 0.2
+    with pytest.raises(ValueError):
+        ProfileAggregator(str(tmpdir), fraction=2.)
@@ -0,0 +1,59 @@
+from dalek.fitter.replay import SchedulerReplay
+from dalek.parallel.parameter_collection import ParameterCollection
+import numpy as np
+import pytest
+
+import numpy.testing as nptesting
+
+
+def make_fitter_log(runtimes, number_of_engines=2):
+    iterations = np.repeat(np.arange(len(runtimes)),
+                           [len(item) for item in runtimes])
+    runtimes = np.concatenate(runtimes)
+    return ParameterCollection(
+        {'dalek.time_elapsed': runtimes,
+         'dalek.engine_id': np.arange(len(runtimes)) % number_of_engines,
+         'dalek.current_iteration': iterations})
+
+
+def test_barrier():
+    replay = SchedulerReplay(make_fitter_log([[1., 1., 4.], [2., 2.]]),
+                             driver_time=0.5)
+    result = replay.simulate()
+    # iteration 0: engines run (1, 4) and (1), iteration 1: (2) and (2)
+    nptesting.assert_allclose(result['makespan'], 5. + 0.5 + 2.)
+    nptesting.assert_allclose(result['utilization'], 10. / (2 * 7.5))
+    assert np.isnan(result['speedup'])
+
+
+def test_lpt_and_chunks():
+    replay = SchedulerReplay(make_fitter_log([[1., 1., 4.]]))
+    nptesting.assert_allclose(replay.simulate()['makespan'], 5.)
+    nptesting.assert_allclose(replay.simulate(ordering='lpt')['makespan'], 4.)
+    nptesting.assert_allclose(replay.simulate(chunk_size=2)['makespan'], 4.)
+
+
+def test_async():
+    replay = SchedulerReplay(make_fitter_log([[1., 4.], [1., 1., 1.]]),
+                             driver_time=10.)
+    nptesting.assert_allclose(replay.simulate(policy='async')['makespan'], 4.)
+    nptesting.assert_allclose(replay.simulate()['makespan'], 4. + 10. + 2.)
+
+
+def test_speculative():
+    # a single straggler, its copy runs for 1 s
+    replay = SchedulerReplay(make_fitter_log([[1.] * 9 + [100.]],
+                                             number_of_engines=4), seed=1)
+    result = replay.simulate(speculative=True, speculation_quantile=0.8)
+    assert result['makespan'] < 10.
+    assert result['wasted_fraction'] > 0
+
+    with pytest.raises(ValueError):
+        replay.simulate(policy='gang')
+
+
+def test_compare():
+    replay = SchedulerReplay(make_fitter_log([[1., 2., 3., 4.]] * 3))
+    results = replay.compare()
+    assert len(results) == len(SchedulerReplay.default_policies)
+    assert (results['makespan'] > 0).all()
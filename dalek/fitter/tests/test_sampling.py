@@ -0,0 +1,84 @@
+from dalek.fitter.base import ParameterConfiguration
+from dalek.fitter import sampling
+import numpy as np
+import pytest
+
+import numpy.testing as nptesting
+
+
+@pytest.mark.parametrize('design', sorted(sampling.design_dict))
+def test_design_shape(design):
+    np.random.seed(250880)
+    points = sampling.design_dict[design](64, 5)
+    assert points.shape == (64, 5)
+    assert np.all(points >= 0)
+    assert np.all(points < 1)
+
+
+def test_latin_hypercube():
+    np.random.seed(250880)
+    points = sampling.latin_hypercube(20, 3)
+    for column in points.T:
+        nptesting.assert_array_equal(np.sort(np.floor(column * 20)),
+                                     np.arange(20))
+
+
+def test_halton():
+    nptesting.assert_allclose(
+        sampling.halton(4, 2, start_index=1, scramble=False),
+        [[1. / 2, 1. / 3], [1. / 4, 2. / 3], [3. / 4, 1. / 9],
+         [1. / 8, 4. / 9]])
+    # the first 9 points of the scrambled sequence are still a permutation
+    # of the multiples of 1/9
+    points = sampling.halton(9, 2, random_state=np.random.RandomState(1))
+    nptesting.assert_array_equal(np.sort(np.round(points[:, 1] * 9)),
+                                 np.arange(9))
+
+
+def test_sobol():
+    nptesting.assert_allclose(sampling.sobol(4, 2, scramble=False),
+                              [[0, 0], [0.5, 0.5], [0.75, 0.25],
+                               [0.25, 0.75]])
+    for scramble in (False, True):
+        points = sampling.sobol(256, sampling.sobol_max_dim,
+                                random_state=np.random.RandomState(1),
+                                scramble=scramble)
+        # one point in every interval of width 1/256 in every dimension
+        for column in points.T:
+            nptesting.assert_array_equal(np.sort(np.floor(column * 256)),
+                                         np.arange(256))
+        # and one point in every 1/16 x 1/16 square of the first two
+        squares = np.floor(points[:, :2] * 16)
+        assert len(set(map(tuple, squares))) == 256
+
+    with pytest.raises(ValueError):
+        sampling.sobol(4, sampling.sobol_max_dim + 1)
+
+
+def test_sobol_continuation():
+    points = sampling.sobol(16, 3, random_state=np.random.RandomState(1))
+    nptesting.assert_allclose(
+        sampling.sobol(8, 3, random_state=np.random.RandomState(1),
+                       start_index=8), points[8:])
+
+
+def test_make_design():
+    parameter_config = ParameterConfiguration(['param.a', 'param.b'],
+                                              [[1, 2], [-10, 10]])
+    points = sampling.make_design('lhs', 10, parameter_config)
+    assert np.all(points >= parameter_config.lbounds)
+    assert np.all(points <= parameter_config.ubounds)
+    with pytest.raises(ValueError):
+        sampling.make_design('grid', 10, parameter_config)
+
+
+def test_check_design():
+    dim = sampling.sobol_max_dim + 1
+    sampling.check_design('sobol', dim - 1)
+    sampling.check_design('halton', dim)
+    with pytest.raises(ValueError):
+        sampling.check_design('sobol', dim)
+    parameter_config = ParameterConfiguration(
+        ['param.x{0:d}'.format(i) for i in xrange(dim)], [[0, 1]] * dim)
+    with pytest.raises(ValueError):
+        sampling.make_design('sobol', 16, parameter_config)
@@ -0,0 +1,55 @@
+from dalek.fitter.base import ParameterConfiguration
+from dalek.fitter.stopping import StoppingCriteria
+from dalek.parallel.parameter_collection import ParameterCollection
+import numpy as np
+
+
+def make_generation(fitness, spread=1.):
+    parameter_collection = ParameterCollection(
+        np.random.uniform(0, spread, (len(fitness), 2)),
+        columns=['param.a', 'param.b'])
+    parameter_collection['dalek.fitness'] = fitness
+    parameter_collection['dalek.time_elapsed'] = 1800.
+    return parameter_collection
+
+
+class TestStoppingCriteria(object):
+
+    def setup(self):
+        np.random.seed(250880)
+        self.parameter_config = ParameterConfiguration(
+            ['param.a', 'param.b'], [[0, 1], [0, 1]])
+
+    def test_stalled(self):
+        stopping_criteria = StoppingCriteria(self.parameter_config,
+                                             max_stalled_generations=2)
+        assert stopping_criteria(make_generation([3., 4.])) is None
+        assert stopping_criteria(make_generation([2., 4.])) is None
+        assert stopping_criteria(make_generation([2., 4.])) is None
+        assert stopping_criteria(make_generation([2.5, 4.])) is not None
+
+    def test_fitness_target(self):
+        stopping_criteria = StoppingCriteria(self.parameter_config,
+                                             fitness_target=0.1)
+        assert stopping_criteria(make_generation([3., 4.])) is None
+        assert stopping_criteria(make_generation([0.1, 4.])) is not None
+
+    def test_positional_arguments(self):
+        stopping_criteria = StoppingCriteria(self.parameter_config, 0.5, 3)
+        assert stopping_criteria.fitness_tolerance == 0.5
+        assert stopping_criteria.max_stalled_generations == 3
+        assert stopping_criteria.fitness_target is None
+
+    def test_diversity(self):
+        stopping_criteria = StoppingCriteria(self.parameter_config,
+                                             diversity_tolerance=1e-3)
+        assert stopping_criteria(make_generation([3., 4., 5.])) is None
+        assert stopping_criteria(make_generation([3., 4., 5.],
+                                                 spread=1e-4)) is not None
+
+    def test_core_hours(self):
+        stopping_criteria = StoppingCriteria(self.parameter_config,
+                                             max_core_hours=2)
+        assert stopping_criteria(make_generation([3., 4., 5.])) is None
+        assert stopping_criteria(make_generation([3., 4., 5.])) is not None
+        assert stopping_criteria.get_state()['core_seconds'] == 6 * 1800.
@@ -0,0 +1,136 @@
+from dalek.fitter.base import ParameterConfiguration
+from dalek.fitter.optimizers import DEOptimizer, PSOOptimizer
+from dalek.fitter.surrogate import RBFSurrogate, GPSurrogate, \
+    SurrogateScreening
+from dalek.parallel.parameter_collection import ParameterCollection
+import numpy as np
+import pytest
+
+import numpy.testing as nptesting
+
+
+@pytest.fixture
+def parameter_config():
+    return ParameterConfiguration(['param.a', 'param.b'], [[0, 1], [-1, 1]])
+
+
+def sphere(x):
+    return np.sum((x - 0.2) ** 2, axis=1)
+
+
+def make_parameter_collection(parameter_config, number_of_samples):
+    parameter_collection = ParameterCollection(
+        np.random.uniform(parameter_config.lbounds, parameter_config.ubounds,
+                          (number_of_samples, 2)),
+        columns=parameter_config.parameter_names)
+    parameter_collection['dalek.fitness'] = sphere(
+        parameter_collection[parameter_config.parameter_names].values)
+    return parameter_collection
+
+
+@pytest.mark.parametrize('surrogate', [RBFSurrogate(),
+                                       RBFSurrogate(kernel='thin_plate'),
+                                       GPSurrogate()])
+def test_surrogate_fit(surrogate):
+    np.random.seed(250880)
+    x = np.random.uniform(0, 1, (50, 2))
+    surrogate.fit(x, sphere(x))
+    prediction, uncertainty = surrogate.predict(x)
+    nptesting.assert_allclose(prediction, sphere(x), atol=1e-3)
+
+    x_test = np.random.uniform(0.1, 0.9, (20, 2))
+    prediction, uncertainty = surrogate.predict(x_test)
+    nptesting.assert_allclose(prediction, sphere(x_test), atol=0.02)
+    assert np.all(uncertainty >= 0)
+
+
+def test_gp_uncertainty():
+    np.random.seed(250880)
+    x = np.random.uniform(0, 0.5, (30, 1))
+    surrogate = GPSurrogate().fit(x, np.sin(5 * x[:, 0]))
+    uncertainty = surrogate.predict(np.array([[0.25], [1.0]]))[1]
+    assert uncertainty[0] < uncertainty[1]
+
+
+def test_screening_not_trained(parameter_config):
+    np.random.seed(250880)
+    screening = SurrogateScreening(parameter_config, min_history=100)
+    parameter_collection = make_parameter_collection(parameter_config, 10)
+    screening.update(parameter_collection)
+    candidates = screening(DEOptimizer(parameter_config, 10),
+                           parameter_collection)
+    assert len(candidates) == 10
+    assert np.all(np.isnan(candidates['dalek.surrogate_prediction']))
+
+
+def test_screening(parameter_config):
+    np.random.seed(250880)
+    parameter_collection = make_parameter_collection(parameter_config, 10)
+    fitter_log = make_parameter_collection(parameter_config, 50)
+
+    optimizer = DEOptimizer(parameter_config, 10)
+    np.random.seed(1)
+    unscreened = optimizer(parameter_collection.copy())
+
+    screening = SurrogateScreening(parameter_config, oversampling=8)
+    screening.update(fitter_log)
+    screening.update(parameter_collection)
+    optimizer = DEOptimizer(parameter_config, 10)
+    np.random.seed(1)
+    candidates = screening(optimizer, parameter_collection)
+    assert len(candidates) == 10
+    assert np.all(np.isfinite(candidates['dalek.surrogate_prediction']))
+    candidate_values = candidates[parameter_config.parameter_names].values
+    assert (sphere(candidate_values).mean() <
+            sphere(unscreened.values).mean())
+
+    candidates['dalek.fitness'] = sphere(candidate_values)
+    error = screening.prediction_error(candidates)
+    assert error['predicted'] == 10
+    assert error['rank_correlation'] > 0.9
+
+
+def test_screening_adopts_candidate_state(parameter_config):
+    np.random.seed(250880)
+    parameter_collection = make_parameter_collection(parameter_config, 10)
+    optimizer = PSOOptimizer(parameter_config, 10)
+    screening = SurrogateScreening(parameter_config, oversampling=4,
+                                   min_history=0)
+    screening.update(parameter_collection)
+    candidates = screening(optimizer, parameter_collection)
+    # candidates within the bounds are the new particle positions
+    candidate_values = candidates[parameter_config.parameter_names].values
+    inside = ~optimizer.violates_bounds(optimizer.x)
+    nptesting.assert_allclose(candidate_values[inside], optimizer.x[inside])
+
+
+def test_screening_history(parameter_config):
+    np.random.seed(250880)
+    screening = SurrogateScreening(parameter_config, max_history=15)
+    first_generation = make_parameter_collection(parameter_config, 10)
+    second_generation = make_parameter_collection(parameter_config, 10)
+    second_generation['dalek.fitness'].values[0] = np.inf
+    screening.update(first_generation)
+    screening.update(second_generation)
+    assert len(screening.fitness) == 15
+    nptesting.assert_allclose(screening.fitness[-9:],
+                              second_generation['dalek.fitness'].values[1:])
+    nptesting.assert_allclose(
+        screening.x[0],
+        first_generation[parameter_config.parameter_names].values[4])
+
+    restored_screening = SurrogateScreening(parameter_config, max_history=15)
+    restored_screening.set_state(screening.get_state())
+    nptesting.assert_allclose(restored_screening.x, screening.x)
+    nptesting.assert_allclose(restored_screening.fitness, screening.fitness)
+
+
+def test_screening_from_conf_dict(parameter_config):
+    screening = SurrogateScreening.from_conf_dict(
+        {'model': {'name': 'gp', 'kernel': 'squared_exponential'},
+         'criterion': 'lcb', 'oversampling': 3}, parameter_config)
+    assert isinstance(screening.surrogate, GPSurrogate)
+    assert screening.surrogate.kernel == 'squared_exponential'
+    assert screening.oversampling == 3
+    with pytest.raises(ValueError):
+        SurrogateScreening(parameter_config, criterion='unknown')
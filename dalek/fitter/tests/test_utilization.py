@@ -0,0 +1,78 @@
+from dalek.fitter.utilization import EngineUtilization
+from dalek.fitter.base import datetime_to_seconds
+from dalek.parallel.parameter_collection import ParameterCollection
+import numpy as np
+import pytest
+from datetime import datetime, timedelta, tzinfo
+
+import numpy.testing as nptesting
+
+
+@pytest.fixture
+def fitter_log():
+    # two engines, engine 1 runs twice as long as engine 0 in iteration 0
+    return ParameterCollection(
+        {'dalek.started': [0., 0., 5., 12., 12.],
+         'dalek.completed': [5., 10., 10., 14., 16.],
+         'dalek.engine_id': [0, 1, 0, 0, 1],
+         'dalek.current_iteration': [0, 0, 0, 1, 1]})
+
+
+def test_iteration_utilization(fitter_log):
+    utilization = EngineUtilization(fitter_log)
+    iterations = utilization.iterations
+
+    assert utilization.number_of_engines == 2
+    nptesting.assert_allclose(iterations['span'], [10., 4.])
+    nptesting.assert_allclose(iterations['busy_fraction'], [1., 0.75])
+    nptesting.assert_allclose(iterations['barrier_fraction'], [0., 0.25])
+    nptesting.assert_allclose(iterations['runs_per_core_hour'],
+                              [3 * 3600. / 20, 2 * 3600. / 8])
+    nptesting.assert_allclose(iterations['driver_gap'].values[1], 2.)
+
+
+def test_engine_utilization(fitter_log):
+    utilization = EngineUtilization(fitter_log, number_of_engines=4)
+    engines = utilization.engines
+    nptesting.assert_allclose(engines['busy'], [12., 14.])
+    nptesting.assert_allclose(engines['busy_fraction'], [12 / 14., 1.])
+
+    summary = utilization.summary()
+    assert summary['no_of_runs'] == 5
+    nptesting.assert_allclose(summary['busy_fraction'], 26. / (4 * 16.))
+    nptesting.assert_allclose(summary['driver_gap_fraction'], 2. / 16.)
+
+
+def test_old_fitter_log(fitter_log):
+    with pytest.raises(ValueError):
+        EngineUtilization(fitter_log.drop('dalek.started', axis=1))
+
+
+def test_from_csv(fitter_log, tmpdir):
+    fname = str(tmpdir.join('fitter_log.csv'))
+    fitter_log.to_csv(fname)
+    utilization = EngineUtilization.from_csv(fname)
+    nptesting.assert_allclose(utilization.iterations['busy'], [20., 6.])
+    assert 'busy_fraction' in utilization.report()
+
+
+class FixedOffset(tzinfo):
+
+    def __init__(self, hours):
+        self.offset = timedelta(hours=hours)
+
+    def utcoffset(self, date_time):
+        return self.offset
+
+    def dst(self, date_time):
+        return timedelta(0)
+
+
+def test_datetime_to_seconds():
+    seconds = 1500000000.25
+    # naive datetimes of the task metadata are local time
+    assert datetime_to_seconds(datetime.fromtimestamp(seconds)) == \
+        pytest.approx(seconds)
+    for hours in (0, 2, -5):
+        date_time = datetime.fromtimestamp(seconds, FixedOffset(hours))
+        assert datetime_to_seconds(date_time) == pytest.approx(seconds)
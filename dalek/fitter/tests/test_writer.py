@@ -0,0 +1,26 @@
+from dalek.fitter.writer import BackgroundWriter
+import pytest
+
+
+def test_writer_order():
+    written = []
+    writer = BackgroundWriter(maxsize=2)
+    for i in xrange(10):
+        writer.submit(written.append, i)
+    writer.flush()
+    assert written == range(10)
+    writer.close()
+
+
+def test_writer_error():
+    written = []
+
+    def fail():
+        raise IOError('disk full')
+
+    writer = BackgroundWriter()
+    writer.submit(fail)
+    writer.submit(written.append, 1)
+    with pytest.raises(IOError):
+        writer.flush()
+    assert written == []
@@ -0,0 +1,172 @@
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class EngineUtilization(object):
+    """
+    Engine timeline analysis of the TARDIS runs of a fit. It uses the
+    'dalek.started', 'dalek.completed' and 'dalek.engine_id' columns of the
+    fitter log and works on the log of a running fitter
+    (`BaseFitter.parameter_collection_log`) as well as on a finished log file.
+
+    For every iteration the span is the time from the first run starting to
+    the last run completing. Within the span every engine is either busy or
+    idle; the idle time after an engine finished its last run of the
+    iteration is lost at the generation barrier. The time between two
+    iterations (optimizer, I/O and dispatch on the driver) is reported as
+    driver gap.
+
+    Parameters
+    ----------
+
+    fitter_log: ~pandas.DataFrame
+        the fitter log
+
+    number_of_engines: ~int
+        size of the engine pool, if None the number of distinct engines in
+        the log is used [default=None]
+
+    iteration_column: ~str
+        [default='dalek.current_iteration']
+
+    """
+
+    required_columns = ['dalek.started', 'dalek.completed', 'dalek.engine_id']
+
+    @classmethod
+    def from_csv(cls, fname, **kwargs):
+        """
+        Read the fitter log from a file
+        """
+        return cls(pd.read_csv(fname, index_col=0), **kwargs)
+
+    def __init__(self, fitter_log, number_of_engines=None,
+                 iteration_column='dalek.current_iteration'):
+        missing_columns = [column for column in self.required_columns
+                           if column not in fitter_log.columns]
+        if missing_columns:
+            raise ValueError('Fitter log is missing the columns {0} - it was '
+                             'written by an older version of dalek'.format(
+                ', '.join(missing_columns)))
+
+        self.fitter_log = fitter_log
+        self.iteration_column = iteration_column
+        if number_of_engines is None:
+            number_of_engines = fitter_log['dalek.engine_id'].nunique()
+        self.number_of_engines = number_of_engines
+
+        self.iterations = self._calculate_iterations()
+        self.engines = self._calculate_engines()
+
+    def _calculate_iterations(self):
+        iterations = []
+        for current_iteration, runs in self.fitter_log.groupby(
+                self.iteration_column):
+            iteration = OrderedDict()
+            iteration['iteration'] = current_iteration
+            iteration['start'] = runs['dalek.started'].min()
+            iteration['end'] = runs['dalek.completed'].max()
+            iteration['span'] = iteration['end'] - iteration['start']
+            iteration['no_of_runs'] = len(runs)
+            iteration['active_engines'] = runs['dalek.engine_id'].nunique()
+
+            engine_seconds = self.number_of_engines * iteration['span']
+            busy = (runs['dalek.completed'] - runs['dalek.started']).sum()
+            last_completed = runs.groupby('dalek.engine_id')[
+                'dalek.completed'].max()
+            barrier_loss = ((iteration['end'] - last_completed).sum() +
+                            (self.number_of_engines - len(last_completed)) *
+                            iteration['span'])
+
+            iteration['busy'] = busy
+            iteration['idle'] = engine_seconds - busy
+            iteration['barrier_loss'] = barrier_loss
+            if engine_seconds > 0:
+                iteration['busy_fraction'] = busy / engine_seconds
+                iteration['idle_fraction'] = 1 - iteration['busy_fraction']
+                iteration['barrier_fraction'] = barrier_loss / engine_seconds
+                iteration['runs_per_core_hour'] = (len(runs) * 3600. /
+                                                   engine_seconds)
+            else:
+                iteration['busy_fraction'] = np.nan
+                iteration['idle_fraction'] = np.nan
+                iteration['barrier_fraction'] = np.nan
+                iteration['runs_per_core_hour'] = np.nan
+            iterations.append(iteration)
+
+        if not iterations:
+            return pd.DataFrame()
+
+        iterations = pd.DataFrame([item.values() for item in iterations],
+                                  columns=iterations[0].keys())
+        iterations = iterations.set_index('iteration')
+        iterations['driver_gap'] = (iterations['start'] -
+                                    iterations['end'].shift(1))
+        return iterations
+
+    def _calculate_engines(self):
+        if len(self.iterations) == 0:
+            return pd.DataFrame()
+
+        total_span = self.iterations['span'].sum()
+        durations = (self.fitter_log['dalek.completed'] -
+                     self.fitter_log['dalek.started'])
+        engine_groups = durations.groupby(self.fitter_log['dalek.engine_id'])
+
+        engines = pd.DataFrame({'no_of_runs': engine_groups.count(),
+                                'busy': engine_groups.sum()})
+        engines['idle'] = total_span - engines['busy']
+        engines['busy_fraction'] = engines['busy'] / total_span
+        engines['mean_runtime'] = engines['busy'] / engines['no_of_runs']
+        engines.index.name = 'engine_id'
+        return engines[['no_of_runs', 'busy', 'idle', 'busy_fraction',
+                        'mean_runtime']]
+
+    def summary(self):
+        """
+        Utilization of the whole fit
+
+        Returns
+        -------
+            : ~collections.OrderedDict
+        """
+        summary = OrderedDict()
+        iterations = self.iterations
+        summary['number_of_engines'] = self.number_of_engines
+        summary['no_of_iterations'] = len(iterations)
+        if len(iterations) == 0:
+            return summary
+
+        wall_time = iterations['end'].max() - iterations['start'].min()
+        engine_seconds = self.number_of_engines * wall_time
+        busy = iterations['busy'].sum()
+
+        summary['no_of_runs'] = iterations['no_of_runs'].sum()
+        summary['wall_time'] = wall_time
+        summary['busy_fraction'] = busy / engine_seconds
+        summary['barrier_fraction'] = (iterations['barrier_loss'].sum() /
+                                       engine_seconds)
+        summary['driver_gap_fraction'] = (iterations['driver_gap'].sum() /
+                                          wall_time)
+        summary['runs_per_core_hour'] = (summary['no_of_runs'] * 3600. /
+                                         engine_seconds)
+        return summary
+
+    def report(self):
+        """
+        Human readable report of the utilization
+
+        Returns
+        -------
+            : ~str
+        """
+        summary_lines = ['{0}: {1}'.format(key, value)
+                         for key, value in self.summary().items()]
+        return '\n\n'.join(['\n'.join(summary_lines),
+                            self.iterations.to_string(),
+                            self.engines.to_string()])
@@ -0,0 +1,95 @@
+import logging
+import sys
+import threading
+import Queue
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWriter(object):
+    """
+    Run persistence jobs (fitter log, spectral store, journal, checkpoint) in
+    a background thread so that the next generation can be dispatched while
+    the last one is written. Jobs are run in the order they were submitted.
+    The queue is bounded: if the writer falls behind, `submit` blocks until
+    there is space again.
+
+    If a job fails, all following jobs are skipped (so that e.g. no
+    checkpoint is written for an iteration that is missing from the log) and
+    the error is raised in the driver at the next `submit` or `flush`.
+
+    Parameters
+    ----------
+
+    maxsize: ~int
+        maximum number of jobs waiting in the queue [default=100]
+
+    """
+
+    def __init__(self, maxsize=100):
+        self.queue = Queue.Queue(maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._run,
+                                       name='dalek-background-writer')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    break
+                if self.error is not None:
+                    continue
+                func, args, kwargs = job
+                try:
+                    func(*args, **kwargs)
+                except Exception:
+                    self.error = sys.exc_info()
+                    logger.exception('Background writer failed - skipping '
+                                     'all further writes')
+            finally:
+                self.queue.task_done()
+
+    def check(self):
+        """
+        Raise the error of a failed job in the calling thread
+        """
+        if self.error is not None:
+            error_type, error_value, error_traceback = self.error
+            raise error_type, error_value, error_traceback
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue a job. The arguments must not be modified by the caller
+        afterwards.
+
+        Parameters
+        ----------
+
+        func: callable
+
+        args, kwargs:
+            arguments for `func`
+        """
+        self.check()
+        if self.queue.full():
+            logger.warning('Background writer queue is full - waiting for '
+                           'pending writes')
+        self.queue.put((func, args, kwargs))
+
+    def flush(self):
+        """
+        Wait until all queued jobs are done
+        """
+        self.queue.join()
+        self.check()
+
+    def close(self):
+        """
+        Write all queued jobs and stop the background thread
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.check()
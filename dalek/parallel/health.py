@@ -0,0 +1,235 @@
+import logging
+import os
+import socket
+from collections import OrderedDict, deque
+from time import time
+
+import numpy as np
+import pandas as pd
+
+from dalek.parallel.util import get_memory_usage
+
+logger = logging.getLogger(__name__)
+
+
+def get_engine_health():
+    """
+    Heartbeat of the current (engine) process: time, host, process id,
+    resident set size (bytes), CPU time (user + system seconds) and the one
+    minute load average of the host
+
+    Returns
+    -------
+        : ~dict
+    """
+    cpu_times = os.times()
+    try:
+        load = os.getloadavg()[0]
+    except OSError:
+        load = np.nan
+    rss = get_memory_usage()
+    return {'time': time(), 'hostname': socket.gethostname(),
+            'pid': os.getpid(), 'rss': rss if rss is not None else np.nan,
+            'cpu_time': cpu_times[0] + cpu_times[1], 'load': load}
+
+
+class EngineMonitor(object):
+    """
+    Engine heartbeats that the workers return with every TARDIS run. Only
+    the last `window` heartbeats and the first heartbeat of every engine
+    process are kept in memory, all heartbeats go to the health log. An
+    engine is considered degraded if the median runtime of its last `window`
+    runs is more than `slowdown_threshold` times the median runtime of the
+    last `window` runs of all engines, or if its resident memory exceeds
+    `max_rss`. When the process id of an engine changes (e.g. after it was
+    recycled) its history starts again.
+
+    Parameters
+    ----------
+
+    health_log: ~str
+        CSV file the heartbeats are appended to, if None they are only kept
+        in memory [default=None]
+
+    window: ~int
+        number of recent runs per engine that are compared [default=20]
+
+    slowdown_threshold: ~float
+        [default=1.5]
+
+    max_rss: ~float
+        resident memory limit in MB, None for no limit [default=None]
+
+    exclude_degraded: ~bool
+        stop scheduling runs to degraded engines (at least `min_engines`
+        are kept) [default=False]
+
+    min_engines: ~int
+        [default=1]
+
+    """
+
+    @classmethod
+    def from_conf_dict(cls, conf_dict, default_health_log=None):
+        conf_dict = dict(conf_dict)
+        health_log = conf_dict.pop('log', default_health_log)
+        return cls(health_log=health_log, **conf_dict)
+
+    def __init__(self, health_log=None, window=20, slowdown_threshold=1.5,
+                 max_rss=None, exclude_degraded=False, min_engines=1):
+        self.health_log = health_log
+        self.window = window
+        self.slowdown_threshold = slowdown_threshold
+        self.max_rss = max_rss
+        self.exclude_degraded = exclude_degraded
+        self.min_engines = min_engines
+
+        self.first_heartbeats = {}
+        self.recent_heartbeats = {}
+        self.heartbeat_counts = {}
+        self.pending_heartbeats = []
+        self.degraded_engines = set()
+
+    def add_heartbeat(self, engine_id, health, runtime=np.nan):
+        """
+        Record a heartbeat
+
+        Parameters
+        ----------
+
+        engine_id: ~int
+
+        health: ~dict
+            see `get_engine_health`
+
+        runtime: ~float
+            runtime of the TARDIS run that returned the heartbeat
+        """
+        heartbeat = OrderedDict()
+        heartbeat['time'] = health['time']
+        heartbeat['engine_id'] = engine_id
+        heartbeat['hostname'] = health['hostname']
+        heartbeat['pid'] = health['pid']
+        heartbeat['rss'] = health['rss']
+        heartbeat['cpu_time'] = health['cpu_time']
+        heartbeat['load'] = health['load']
+        heartbeat['runtime'] = runtime
+
+        first_heartbeat = self.first_heartbeats.get(engine_id, None)
+        if first_heartbeat is None or first_heartbeat['pid'] != health['pid']:
+            self.first_heartbeats[engine_id] = heartbeat
+            self.recent_heartbeats[engine_id] = deque(maxlen=self.window)
+        self.recent_heartbeats[engine_id].append(heartbeat)
+        self.heartbeat_counts[engine_id] = (
+            self.heartbeat_counts.get(engine_id, 0) + 1)
+        self.pending_heartbeats.append(heartbeat)
+
+    def to_dataframe(self, heartbeats=None):
+        """
+        Heartbeats as a DataFrame, by default the recent heartbeats of all
+        engines
+        """
+        if heartbeats is None:
+            heartbeats = [heartbeat for engine_id in
+                          sorted(self.recent_heartbeats)
+                          for heartbeat in self.recent_heartbeats[engine_id]]
+        return pd.DataFrame([item.values() for item in heartbeats],
+                            columns=heartbeats[0].keys())
+
+    def engine_status(self):
+        """
+        Current state of every engine
+
+        Returns
+        -------
+            : ~pandas.DataFrame
+            indexed by engine id with the last heartbeat values, the number
+            of heartbeats, the memory growth (MB per hour) and the CPU
+            fraction since the first heartbeat of the current engine
+            process, the median runtime of the last `window` runs, the
+            slowdown relative to all engines and whether the engine is
+            degraded
+        """
+        recent = self.to_dataframe()
+        pool_runtime = recent['runtime'].median()
+
+        status = []
+        for engine_id, engine_heartbeats in recent.groupby('engine_id'):
+            first = self.first_heartbeats[engine_id]
+            last = engine_heartbeats.iloc[-1]
+            elapsed_time = last['time'] - first['time']
+            engine_runtime = engine_heartbeats['runtime'].median()
+
+            engine_status = OrderedDict()
+            engine_status['engine_id'] = engine_id
+            engine_status['hostname'] = last['hostname']
+            engine_status['heartbeats'] = self.heartbeat_counts[engine_id]
+            engine_status['last_heartbeat'] = last['time']
+            engine_status['rss'] = last['rss'] / 1024. ** 2
+            if elapsed_time > 0:
+                engine_status['rss_growth'] = (
+                    (last['rss'] - first['rss']) / 1024. ** 2 /
+                    (elapsed_time / 3600.))
+                engine_status['cpu_fraction'] = (
+                    (last['cpu_time'] - first['cpu_time']) / elapsed_time)
+            else:
+                engine_status['rss_growth'] = np.nan
+                engine_status['cpu_fraction'] = np.nan
+            engine_status['load'] = last['load']
+            engine_status['runtime'] = engine_runtime
+            engine_status['slowdown'] = engine_runtime / pool_runtime
+            engine_status['degraded'] = bool(
+                (len(engine_heartbeats) >= self.window / 2 and
+                 engine_status['slowdown'] > self.slowdown_threshold) or
+                (self.max_rss is not None and
+                 engine_status['rss'] > self.max_rss))
+            status.append(engine_status)
+
+        return pd.DataFrame([item.values() for item in status],
+                            columns=status[0].keys()).set_index('engine_id')
+
+    def check(self):
+        """
+        Update the degraded engines and warn about engines that became
+        degraded
+
+        Returns
+        -------
+            : ~set
+            ids of the degraded engines
+        """
+        if not self.recent_heartbeats:
+            return set()
+
+        status = self.engine_status()
+        degraded_engines = set(status.index[status['degraded']])
+        for engine_id in sorted(degraded_engines - self.degraded_engines):
+            engine_status = status.loc[engine_id]
+            logger.warning('Engine {0} on {1} is degraded: runs take {2:.2f} '
+                           'times the median, {3:.0f} MB resident memory '
+                           '({4:+.1f} MB/h), load {5:.2f}'.format(
+                engine_id, engine_status['hostname'],
+                engine_status['slowdown'], engine_status['rss'],
+                engine_status['rss_growth'], engine_status['load']))
+        for engine_id in sorted(self.degraded_engines - degraded_engines):
+            logger.info('Engine {0} recovered'.format(engine_id))
+        self.degraded_engines = degraded_engines
+        return degraded_engines
+
+    def pop_pending_heartbeats(self):
+        """
+        Heartbeats that have not been written to the health log yet
+        """
+        heartbeats = self.pending_heartbeats
+        self.pending_heartbeats = []
+        return heartbeats
+
+    def write(self, heartbeats):
+        """
+        Append heartbeats to the health log
+        """
+        if self.health_log is None or not heartbeats:
+            return
+        write_header = not os.path.exists(self.health_log)
+        self.to_dataframe(heartbeats).to_csv(self.health_log, mode='a',
+                                             header=write_header, index=False)
@@ -1,8 +1,16 @@
 import logging
+import multiprocessing
+import os
+import traceback
+import types
+from datetime import datetime
+from itertools import count
+from time import time
 
 from IPython.parallel import interactive, RemoteError
 logger = logging.getLogger(__name__)
 from dalek.parallel.util import set_engines_cpu_affinity
+from dalek.parallel.recycling import restart_engine_process
 
 try:
     from tardis import run_tardis
@@ -37,7 +45,7 @@ def simple_worker(config_dict, atom_data=None):
 
 
 @interactive
-def fitter_worker(config_dict, atom_data=None):
+def fitter_worker(config_dict, atom_data=None, fit_name=None, profile=False):
     """
     This is a TARDIS worker that will run TARDIS and evaluate the returned model
     by running the pushed fitness_function object
@@ -48,22 +56,85 @@ def fitter_worker(config_dict, atom_data=None):
     config_dict: ~dict
         a valid TARDIS config dictionary
 
+    fit_name: ~str
+        name of the fit on a shared engine pool. If given, the fitness function
+        and atom data pushed for this fit are used (see
+        `~dalek.parallel.launcher.SharedFitterLauncher`)
+
+    profile: ~bool
+        run TARDIS and the fitness function under cProfile [default=False]
+
+    Returns
+    -------
+
+    fitness: ~float
+
+    spectrum: ~tardis.spectrum.TARDISSpectrum
+
+    timings: ~dict
+        seconds spent in the phases of the run ('worker.config',
+        'worker.model_setup', 'worker.tardis_run' and 'worker.fitness')
+
+    profile_stats: ~dict
+        the cProfile stats of the run if `profile` is set, otherwise None
+
+    health: ~dict
+        heartbeat of the engine after the run (see
+        `~dalek.parallel.health.get_engine_health`)
+
     """
+    from time import time
+    from dalek.parallel.health import get_engine_health
+
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    timings = {}
+    start_time = time()
+
+    if fit_name is None:
+        current_fitness_function = fitness_function
+        current_default_atom_data = default_atom_data
+    else:
+        current_fitness_function = globals()[
+            'dalek_fitness_function_' + fit_name]
+        current_default_atom_data = globals()['dalek_atom_data_' + fit_name]
 
     if atom_data is None:
-        if default_atom_data is None:
+        if current_default_atom_data is None:
             raise ValueError('AtomData not available - please specify')
         else:
-            atom_data = default_atom_data
+            atom_data = current_default_atom_data
 
-    tardis_config = config_reader.Configuration.from_config_dict(
-        config_dict, atom_data=atom_data, validate=False)
-    radial1d_mdl = model.Radial1DModel(tardis_config)
-    simulation.run_radial1d(radial1d_mdl)
+    try:
+        tardis_config = config_reader.Configuration.from_config_dict(
+            config_dict, atom_data=atom_data, validate=False)
+        timings['worker.config'] = time() - start_time
+
+        start_time = time()
+        radial1d_mdl = model.Radial1DModel(tardis_config)
+        timings['worker.model_setup'] = time() - start_time
+
+        start_time = time()
+        simulation.run_radial1d(radial1d_mdl)
+        timings['worker.tardis_run'] = time() - start_time
 
-    fitness, spectrum = fitness_function(radial1d_mdl)
+        start_time = time()
+        fitness, spectrum = current_fitness_function(radial1d_mdl)
+        timings['worker.fitness'] = time() - start_time
+    finally:
+        if profile:
+            profiler.disable()
 
-    return fitness, spectrum
+    if profile:
+        profiler.create_stats()
+        profile_stats = profiler.stats
+    else:
+        profile_stats = None
+
+    return fitness, spectrum, timings, profile_stats, get_engine_health()
 
 class BaseLauncher(object):
     """
@@ -90,10 +161,17 @@ class BaseLauncher(object):
     def __init__(self, remote_clients, worker=simple_worker,
                  atom_data=None):
         self.remote_clients = remote_clients
+        self.atom_data = atom_data
         self.prepare_remote_clients(remote_clients, atom_data)
         self.worker = worker
         self.lbv = remote_clients.load_balanced_view()
 
+        self.bootstrapped_engines = set(remote_clients.ids)
+        self.excluded_engines = set()
+        self.min_engines = 1
+        # engine id -> ('draining', restart timeout) or ('restarting', deadline)
+        self.recycling_engines = {}
+
 
     @staticmethod
     def prepare_remote_clients(clients, atom_data):
@@ -126,7 +204,8 @@ class BaseLauncher(object):
         for client in clients:
             client.apply(set_engines_cpu_affinity)
 
-    def queue_parameter_set(self, parameter_set_dict, atom_data=None):
+    def queue_parameter_set(self, parameter_set_dict, atom_data=None,
+                            **worker_kwargs):
         """
         Add single parameter set to the queue
 
@@ -135,10 +214,13 @@ class BaseLauncher(object):
 
         parameter_set_dict: ~dict
             a valid configuration dictionary for TARDIS
+
+        worker_kwargs:
+            additional keyword arguments for the worker (e.g. `profile`)
         """
 
         return self.lbv.apply(self.worker, parameter_set_dict,
-                              atom_data=atom_data)
+                              atom_data=atom_data, **worker_kwargs)
 
     def queue_parameter_set_list(self, parameter_set_list,
                                       atom_data=None):
@@ -155,6 +237,203 @@ class BaseLauncher(object):
         return self.lbv.map(self.worker, parameter_set_list,
                             atom_data=atom_data)
 
+    def wait(self, async_results, timeout=None):
+        """
+        Wait for the given results to finish
+
+        Parameters
+        ----------
+
+        async_results: ~list of ~IPython.parallel.AsyncResult
+
+        timeout: ~float
+            maximum time to wait in seconds (None waits forever)
+
+        Returns
+        -------
+            : ~bool
+            True if all results finished
+        """
+        if timeout is None:
+            timeout = -1
+        return self.remote_clients.wait(list(async_results), timeout=timeout)
+
+    def clean_results(self, async_result):
+        """
+        Remove the results and metadata of a finished task from the client
+        caches
+        """
+        for msg_id in async_result.msg_ids:
+            if msg_id in self.lbv.results:
+                del self.lbv.results[msg_id]
+
+            if msg_id in self.remote_clients.results:
+                del self.remote_clients.results[msg_id]
+
+            if msg_id in self.remote_clients.metadata:
+                del self.remote_clients.metadata[msg_id]
+
+    @property
+    def number_of_engines(self):
+        return len(self.remote_clients)
+
+    def exclude_engines(self, engine_ids, min_engines=1):
+        """
+        Stop scheduling new runs to the given engines (runs already queued on
+        them are not affected). Calling it again replaces the excluded
+        engines.
+
+        Parameters
+        ----------
+
+        engine_ids: ~list of ~int
+
+        min_engines: ~int
+            engines that are kept even if excluded [default=1]
+
+        Returns
+        -------
+            : ~list of ~int
+            ids of the engines that runs are scheduled to
+        """
+        self.excluded_engines = set(engine_ids)
+        self.min_engines = min_engines
+        return self.update_targets()
+
+    def update_targets(self):
+        """
+        Schedule runs only to the bootstrapped engines that are neither
+        excluded nor being recycled
+
+        Returns
+        -------
+            : ~list of ~int
+        """
+        available_engines = sorted(self.bootstrapped_engines -
+                                   set(self.recycling_engines))
+        targets = [engine_id for engine_id in available_engines
+                   if engine_id not in self.excluded_engines]
+        if len(targets) < self.min_engines:
+            logger.warning('Not excluding all requested engines - keeping at '
+                           'least {0} engines'.format(self.min_engines))
+            targets += [engine_id for engine_id in available_engines
+                        if engine_id not in targets][
+                       :self.min_engines - len(targets)]
+            targets.sort()
+        if set(targets) == set(self.remote_clients.ids):
+            self.lbv.targets = None
+        elif targets != self.lbv.targets:
+            logger.info('Scheduling runs only to engines {0}'.format(targets))
+            self.lbv.targets = targets
+        return targets
+
+    def get_engine_namespace(self):
+        """
+        Names that are pushed to every engine when it is bootstrapped
+        """
+        return {'default_atom_data': self.atom_data}
+
+    def bootstrap_engines(self, engine_ids):
+        """
+        Prepare engines that registered after the launcher was set up (e.g.
+        restarted engines) like `prepare_remote_clients` did for the others
+        """
+        namespace = self.get_engine_namespace()
+        for engine_id in engine_ids:
+            logger.info('Bootstrapping engine {0}'.format(engine_id))
+            engine = self.remote_clients[engine_id]
+            engine.block = True
+            for key, value in namespace.items():
+                engine[key] = value
+            engine.execute('from tardis.io import config_reader')
+            engine.execute('from tardis import model, simulation')
+            engine.block = False
+            engine.apply(set_engines_cpu_affinity)
+            self.bootstrapped_engines.add(engine_id)
+
+    def engine_is_drained(self, engine_id):
+        """
+        Whether the engine has no queued or running tasks and no task waits
+        in the scheduler. Only runs submitted after the engine started
+        draining avoid it (see `update_targets`), a waiting task that was
+        submitted before could still be assigned to it.
+        """
+        status = self.remote_clients.queue_status()
+        return (status.get('unassigned', 0) == 0 and
+                status[engine_id]['queue'] == 0 and
+                status[engine_id]['tasks'] == 0)
+
+    def recycle_engine(self, engine_id, restart_timeout=300.):
+        """
+        Start recycling an engine: no new runs are scheduled to it and once
+        it is drained (see `engine_is_drained`) it is restarted (see
+        `update_recycling`)
+
+        Parameters
+        ----------
+
+        engine_id: ~int
+
+        restart_timeout: ~float
+            seconds to wait for the restarted engine to register
+            [default=300]
+
+        Returns
+        -------
+            : ~bool
+            False if the engine can not be recycled because it is the last
+            available engine
+        """
+        if engine_id in self.recycling_engines:
+            return True
+        if not (self.bootstrapped_engines - set(self.recycling_engines) -
+                set([engine_id])):
+            logger.warning('Not recycling engine {0} - no other engine '
+                           'available'.format(engine_id))
+            return False
+        self.recycling_engines[engine_id] = ('draining', restart_timeout)
+        self.update_targets()
+        return True
+
+    def update_recycling(self):
+        """
+        Restart drained engines and bootstrap the engines that registered
+        since the last call
+        """
+        engine_ids = set(self.remote_clients.ids)
+        new_engines = sorted(engine_ids - self.bootstrapped_engines)
+        self.bootstrapped_engines &= engine_ids
+        if new_engines:
+            self.bootstrap_engines(new_engines)
+
+        restarting_engines = sorted(
+            [(deadline, engine_id) for engine_id, (state, deadline)
+             in self.recycling_engines.items() if state == 'restarting'])
+        for _, engine_id in restarting_engines[:len(new_engines)]:
+            del self.recycling_engines[engine_id]
+
+        for engine_id, (state, deadline) in self.recycling_engines.items():
+            if state == 'draining':
+                if engine_id not in engine_ids:
+                    del self.recycling_engines[engine_id]
+                elif self.engine_is_drained(engine_id):
+                    logger.info('Restarting engine {0}'.format(engine_id))
+                    try:
+                        self.remote_clients[engine_id].apply_sync(
+                            restart_engine_process)
+                    except Exception as e:
+                        logger.warning('Restarting engine {0} failed: '
+                                       '{1}'.format(engine_id, e))
+                        del self.recycling_engines[engine_id]
+                    else:
+                        self.recycling_engines[engine_id] = (
+                            'restarting', time() + deadline)
+            elif time() > deadline:
+                logger.warning('Restarted engine {0} did not register '
+                               'again'.format(engine_id))
+                del self.recycling_engines[engine_id]
+
+        self.update_targets()
 
 
 class FitterLauncher(BaseLauncher):
@@ -166,6 +445,11 @@ class FitterLauncher(BaseLauncher):
                                            worker=worker,
                                            atom_data=atom_data)
 
+    def get_engine_namespace(self):
+        namespace = super(FitterLauncher, self).get_engine_namespace()
+        namespace['fitness_function'] = self.fitness_function
+        return namespace
+
     def prepare_remote_clients(self, clients, atom_data):
 
         super(FitterLauncher, self).prepare_remote_clients(clients, atom_data)
@@ -174,3 +458,351 @@ class FitterLauncher(BaseLauncher):
             client['fitness_function'] = self.fitness_function
         clients.block = False
         logger.info('Initial setup complete')
+
+
+
+class SharedFitterLauncher(BaseLauncher):
+    """
+    Launcher for several fits sharing one pool of engines. Every fit registers
+    its fitness function and atom data, which are pushed to the engines under
+    the name of the fit, and gets a `FitLauncherView` to queue its parameter
+    sets with.
+
+    Parameters
+    ----------
+
+    remote_clients: ~IPython.parallel.Client
+        IPython remote clients
+
+    worker: func
+        a function pointer to the worker function, it needs to accept the
+        `fit_name` keyword [default=fitter_worker]
+
+    """
+
+    def __init__(self, remote_clients, worker=fitter_worker):
+        super(SharedFitterLauncher, self).__init__(remote_clients,
+                                                   worker=worker,
+                                                   atom_data=None)
+        self.fits = {}
+        self.fit_namespace = {}
+
+    def register_fit(self, fit_name, fitness_function, atom_data=None):
+        """
+        Push the fitness function and atom data of a fit to all engines
+
+        Parameters
+        ----------
+
+        fit_name: ~str
+            unique name of the fit
+
+        fitness_function: ~dalek.fitter.BaseFitnessFunction
+
+        atom_data: ~tardis.atomic.AtomData
+
+        Returns
+        -------
+            : FitLauncherView
+        """
+        if fit_name in self.fits:
+            raise ValueError('Fit {0} is already registered'.format(fit_name))
+
+        logger.info('Sending fitness function and atomic dataset of fit {0} '
+                    'to remote clients'.format(fit_name))
+        self.remote_clients.block = True
+        for client in self.remote_clients:
+            client['dalek_fitness_function_' + fit_name] = fitness_function
+            client['dalek_atom_data_' + fit_name] = atom_data
+        self.remote_clients.block = False
+        # pushed again to restarted engines
+        self.fit_namespace['dalek_fitness_function_' + fit_name] = \
+            fitness_function
+        self.fit_namespace['dalek_atom_data_' + fit_name] = atom_data
+
+        self.fits[fit_name] = FitLauncherView(self, fit_name)
+        return self.fits[fit_name]
+
+    def queue_fit_parameter_set(self, fit_name, parameter_set_dict,
+                                atom_data=None, **worker_kwargs):
+        """
+        Add single parameter set of the given fit to the queue
+        """
+        return self.lbv.apply(self.worker, parameter_set_dict,
+                              atom_data=atom_data, fit_name=fit_name,
+                              **worker_kwargs)
+
+    def get_engine_namespace(self):
+        namespace = super(SharedFitterLauncher, self).get_engine_namespace()
+        namespace.update(self.fit_namespace)
+        return namespace
+
+
+class FitLauncherView(object):
+    """
+    The part of a `SharedFitterLauncher` belonging to a single fit. It can
+    be used by `~dalek.fitter.BaseFitter` in place of a `FitterLauncher`.
+
+    Parameters
+    ----------
+
+    shared_launcher: SharedFitterLauncher
+
+    fit_name: ~str
+
+    """
+
+    def __init__(self, shared_launcher, fit_name):
+        self.shared_launcher = shared_launcher
+        self.fit_name = fit_name
+
+    @property
+    def lbv(self):
+        return self.shared_launcher.lbv
+
+    @property
+    def remote_clients(self):
+        return self.shared_launcher.remote_clients
+
+    def queue_parameter_set(self, parameter_set_dict, atom_data=None,
+                            **worker_kwargs):
+        return self.shared_launcher.queue_fit_parameter_set(
+            self.fit_name, parameter_set_dict, atom_data=atom_data,
+            **worker_kwargs)
+
+    def wait(self, async_results, timeout=None):
+        return self.shared_launcher.wait(async_results, timeout=timeout)
+
+    def clean_results(self, async_result):
+        return self.shared_launcher.clean_results(async_result)
+
+    @property
+    def number_of_engines(self):
+        return self.shared_launcher.number_of_engines
+
+    def exclude_engines(self, engine_ids, min_engines=1):
+        return self.shared_launcher.exclude_engines(engine_ids,
+                                                    min_engines=min_engines)
+
+    @property
+    def recycling_engines(self):
+        return self.shared_launcher.recycling_engines
+
+    def recycle_engine(self, engine_id, restart_timeout=300.):
+        return self.shared_launcher.recycle_engine(
+            engine_id, restart_timeout=restart_timeout)
+
+    def update_recycling(self):
+        return self.shared_launcher.update_recycling()
+
+
+class LocalTaskError(Exception):
+    """
+    Exception raised by a task of the `LocalLauncher`, similar to
+    `IPython.parallel.RemoteError`
+    """
+
+    def __init__(self, ename, evalue, traceback_text):
+        # the arguments are passed on so that the error can be pickled
+        super(LocalTaskError, self).__init__(ename, evalue, traceback_text)
+        self.ename = ename
+        self.evalue = evalue
+        self.traceback = traceback_text
+
+    def __str__(self):
+        return '{0}({1})\n{2}'.format(self.ename, self.evalue, self.traceback)
+
+
+_local_namespace = {}
+
+
+def _init_local_process(namespace):
+    _local_namespace.clear()
+    _local_namespace.update(namespace)
+
+
+def _run_local_task(worker, args, kwargs, namespace=None):
+    """
+    Run the worker with the names of `namespace` as globals, like the
+    `@interactive` workers see the engine namespace
+
+    Returns
+    -------
+        : ~tuple
+        result, error, start and end time and the process id
+    """
+    if namespace is None:
+        namespace = _local_namespace
+    if isinstance(worker, types.FunctionType):
+        worker_globals = dict(worker.__globals__)
+        worker_globals.update(namespace)
+        local_worker = types.FunctionType(worker.__code__, worker_globals,
+                                          worker.__name__, worker.__defaults__,
+                                          worker.__closure__)
+    else:
+        # callable objects carry their own state
+        local_worker = worker
+    started = datetime.now()
+    try:
+        result = local_worker(*args, **kwargs)
+        error = None
+    except Exception as e:
+        result = None
+        error = LocalTaskError(type(e).__name__, str(e),
+                               traceback.format_exc())
+    completed = datetime.now()
+    return result, error, started, completed, os.getpid()
+
+
+class LocalAsyncResult(object):
+    """
+    Handle of a task of the `LocalLauncher`, providing the parts of the
+    `IPython.parallel.AsyncResult` interface used by the fitter
+    """
+
+    def __init__(self, msg_id, launcher, pool_result=None, task_result=None):
+        self.msg_ids = [msg_id]
+        self.launcher = launcher
+        self.submitted = datetime.now()
+        self.received = None
+        self._pool_result = pool_result
+        self._task_result = None
+        if task_result is not None:
+            self._set_task_result(task_result)
+
+    def _set_task_result(self, task_result):
+        self._task_result = task_result
+        self.received = datetime.now()
+
+    def wait(self, timeout=None):
+        if self._task_result is None:
+            self._pool_result.wait(timeout)
+        return self.ready()
+
+    def ready(self):
+        return self._task_result is not None or self._pool_result.ready()
+
+    def _get_task_result(self):
+        if self._task_result is None:
+            self._set_task_result(self._pool_result.get())
+        return self._task_result
+
+    @property
+    def metadata(self):
+        metadata = {'submitted': self.submitted}
+        if self.ready():
+            _, _, started, completed, pid = self._get_task_result()
+            metadata['started'] = started
+            metadata['completed'] = completed
+            metadata['received'] = self.received
+            metadata['engine_id'] = self.launcher.get_engine_id(pid)
+        return metadata
+
+    def get(self):
+        result, error = self._get_task_result()[:2]
+        if error is not None:
+            raise error
+        return result
+
+
+class LocalLauncher(object):
+    """
+    Launcher running the worker on the local machine, either in the driver
+    process (`number_of_processes=0`, the task runs when it is queued) or in a
+    `multiprocessing` pool. It can be used by `~dalek.fitter.BaseFitter` in
+    place of a `FitterLauncher`, e.g. for benchmarks and tests without an
+    IPython cluster.
+
+    Parameters
+    ----------
+
+    worker: func
+        the worker function or a callable object, it needs to be importable
+        (not defined interactively) if a pool is used
+
+    namespace: ~dict
+        names that the worker sees as globals (the equivalent of the values
+        pushed to the engines, e.g. 'fitness_function') [default=None]
+
+    number_of_processes: ~int
+        size of the process pool, 0 runs the tasks in the driver process
+        [default=0]
+
+    max_tasks_per_process: ~int
+        tasks after which a pool process is replaced by a fresh one, None
+        keeps the processes for the lifetime of the pool [default=None]
+
+    """
+
+    def __init__(self, worker, namespace=None, number_of_processes=0,
+                 max_tasks_per_process=None):
+        self.worker = worker
+        if namespace is None:
+            namespace = {}
+        self.namespace = namespace
+        self.number_of_processes = number_of_processes
+        if number_of_processes > 0:
+            self.pool = multiprocessing.Pool(
+                number_of_processes, initializer=_init_local_process,
+                initargs=(namespace,), maxtasksperchild=max_tasks_per_process)
+        else:
+            self.pool = None
+        self.msg_ids = count()
+        self.engine_ids = {}
+        self.recycling_engines = {}
+
+    @property
+    def number_of_engines(self):
+        return max(self.number_of_processes, 1)
+
+    def get_engine_id(self, pid):
+        if pid not in self.engine_ids:
+            self.engine_ids[pid] = len(self.engine_ids)
+        return self.engine_ids[pid]
+
+    def queue_parameter_set(self, parameter_set_dict, atom_data=None,
+                            **worker_kwargs):
+        worker_kwargs['atom_data'] = atom_data
+        msg_id = 'local{0:d}'.format(next(self.msg_ids))
+        if self.pool is None:
+            return LocalAsyncResult(
+                msg_id, self, task_result=_run_local_task(
+                    self.worker, (parameter_set_dict,), worker_kwargs,
+                    namespace=self.namespace))
+        else:
+            return LocalAsyncResult(
+                msg_id, self, pool_result=self.pool.apply_async(
+                    _run_local_task,
+                    (self.worker, (parameter_set_dict,), worker_kwargs)))
+
+    def wait(self, async_results, timeout=None):
+        if timeout is not None:
+            deadline = time() + timeout
+        for async_result in async_results:
+            if timeout is None:
+                async_result.wait()
+            elif not async_result.wait(max(deadline - time(), 0)):
+                return False
+        return True
+
+    def clean_results(self, async_result):
+        pass
+
+    def exclude_engines(self, engine_ids, min_engines=1):
+        if engine_ids:
+            logger.warning('The local launcher can not exclude engines')
+        return range(self.number_of_engines)
+
+    def recycle_engine(self, engine_id, restart_timeout=300.):
+        logger.warning('The local launcher can not recycle single engines - '
+                       'use max_tasks_per_process instead')
+        return False
+
+    def update_recycling(self):
+        pass
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
@@ -0,0 +1,135 @@
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+def restart_engine_process(delay=1.):
+    """
+    Replace the current engine by a fresh engine process: a copy of the engine
+    command line is started (it registers with the controller as a new engine)
+    and the current process exits after `delay` seconds, so that the reply of
+    this call is still sent.
+
+    Returns
+    -------
+        : ~int
+        process id of the new engine
+    """
+    import os
+    import subprocess
+    import sys
+    import threading
+
+    if not sys.argv or sys.argv[0] in ('', '-c'):
+        command = ([sys.executable, '-m', 'IPython.parallel.engine'] +
+                   sys.argv[1:])
+    else:
+        command = [sys.executable] + sys.argv
+    process = subprocess.Popen(command, close_fds=True)
+    threading.Timer(delay, os._exit, (0,)).start()
+    return process.pid
+
+
+class EngineRecycler(object):
+    """
+    Policy for recycling engine processes: once an engine has run `max_tasks`
+    TARDIS runs or its resident memory (from the heartbeats, see
+    `~dalek.parallel.health.get_engine_health`) exceeds `max_rss`, the
+    launcher drains it, restarts it and bootstraps the new engine with the
+    atom data and the fitness function (see
+    `~dalek.parallel.launcher.BaseLauncher.recycle_engine`). An engine is only
+    restarted once no runs are queued on it or wait in the scheduler, so no
+    run is lost.
+
+    Parameters
+    ----------
+
+    max_tasks: ~int
+        runs after which an engine is recycled, None for no limit
+        [default=None]
+
+    max_rss: ~float
+        resident memory limit in MB, None for no limit [default=None]
+
+    max_concurrent: ~int
+        maximum number of engines that are recycled at the same time
+        [default=1]
+
+    restart_timeout: ~float
+        seconds to wait for a restarted engine to register [default=300]
+
+    """
+
+    @classmethod
+    def from_conf_dict(cls, conf_dict):
+        return cls(**conf_dict)
+
+    def __init__(self, max_tasks=None, max_rss=None, max_concurrent=1,
+                 restart_timeout=300.):
+        self.max_tasks = max_tasks
+        self.max_rss = max_rss
+        self.max_concurrent = max_concurrent
+        self.restart_timeout = restart_timeout
+
+        self.tasks = defaultdict(int)
+        self.rss = {}
+        # engines the launcher refused to recycle, retried after their next run
+        self.refused_engines = set()
+
+    def add_task(self, engine_id, health=None):
+        """
+        Count a finished run of an engine
+
+        Parameters
+        ----------
+
+        engine_id: ~int
+
+        health: ~dict
+            heartbeat returned with the run [default=None]
+        """
+        self.tasks[engine_id] += 1
+        self.refused_engines.discard(engine_id)
+        if health is not None:
+            self.rss[engine_id] = health['rss'] / 1024. ** 2
+
+    def engines_to_recycle(self):
+        """
+        Engines that reached the number of tasks or the memory limit
+
+        Returns
+        -------
+            : ~list of ~int
+        """
+        engine_ids = set()
+        if self.max_tasks is not None:
+            engine_ids.update([engine_id for engine_id, tasks
+                               in self.tasks.items()
+                               if tasks >= self.max_tasks])
+        if self.max_rss is not None:
+            engine_ids.update([engine_id for engine_id, rss in self.rss.items()
+                               if rss > self.max_rss])
+        return sorted(engine_ids - self.refused_engines)
+
+    def update(self, launcher):
+        """
+        Advance the recycling on the launcher and start recycling the engines
+        that reached a limit. The counts of an engine that the launcher
+        refuses to recycle (e.g. the last available engine) are kept.
+        """
+        launcher.update_recycling()
+        for engine_id in self.engines_to_recycle():
+            if len(launcher.recycling_engines) >= self.max_concurrent:
+                break
+            if engine_id in launcher.recycling_engines:
+                continue
+            if not launcher.recycle_engine(
+                    engine_id, restart_timeout=self.restart_timeout):
+                self.refused_engines.add(engine_id)
+                continue
+            logger.info('Recycling engine {0} after {1:d} runs'.format(
+                engine_id, self.tasks[engine_id]))
+            # the restarted engine registers with a new id
+            del self.tasks[engine_id]
+            self.rss.pop(engine_id, None)
@@ -0,0 +1,89 @@
+from dalek.parallel.health import EngineMonitor, get_engine_health
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_health(time, rss=100 * 1024 ** 2):
+    return {'time': time, 'hostname': 'node', 'pid': 1, 'rss': rss,
+            'cpu_time': time * 0.9, 'load': 1.}
+
+
+@pytest.fixture
+def engine_monitor():
+    engine_monitor = EngineMonitor(window=10)
+    for i in xrange(10):
+        engine_monitor.add_heartbeat(0, make_health(i), runtime=1.)
+        engine_monitor.add_heartbeat(1, make_health(i), runtime=1.)
+        engine_monitor.add_heartbeat(
+            2, make_health(i, rss=(100 + i * 10) * 1024 ** 2), runtime=3.)
+    return engine_monitor
+
+
+def test_get_engine_health():
+    health = get_engine_health()
+    assert health['rss'] > 0
+    assert health['cpu_time'] > 0
+
+
+def test_engine_status(engine_monitor):
+    status = engine_monitor.engine_status()
+    assert status.index.tolist() == [0, 1, 2]
+    assert status['degraded'].tolist() == [False, False, True]
+    np.testing.assert_allclose(status['slowdown'], [1., 1., 3.])
+    np.testing.assert_allclose(status.loc[2, 'rss_growth'], 90 / (9 / 3600.))
+    np.testing.assert_allclose(status['cpu_fraction'], 0.9)
+
+
+def test_check(engine_monitor):
+    assert engine_monitor.check() == set([2])
+    for i in xrange(10, 20):
+        engine_monitor.add_heartbeat(2, make_health(i), runtime=1.)
+    assert engine_monitor.check() == set()
+
+
+def test_bounded_history(engine_monitor):
+    for i in xrange(10, 100):
+        engine_monitor.add_heartbeat(0, make_health(i), runtime=1.)
+    assert len(engine_monitor.recent_heartbeats[0]) == 10
+    status = engine_monitor.engine_status()
+    assert status.loc[0, 'heartbeats'] == 100
+    np.testing.assert_allclose(status.loc[0, 'cpu_fraction'], 0.9)
+
+
+def test_new_process(engine_monitor):
+    # a recycled engine has a new process id, its memory and CPU time start
+    # again from zero
+    engine_monitor.add_heartbeat(2, {'time': 20., 'hostname': 'node',
+                                     'pid': 2, 'rss': 50 * 1024 ** 2,
+                                     'cpu_time': 0., 'load': 1.},
+                                 runtime=1.)
+    engine_monitor.add_heartbeat(2, {'time': 30., 'hostname': 'node',
+                                     'pid': 2, 'rss': 60 * 1024 ** 2,
+                                     'cpu_time': 5., 'load': 1.},
+                                 runtime=1.)
+    status = engine_monitor.engine_status()
+    np.testing.assert_allclose(status.loc[2, 'rss_growth'], 10 / (10 / 3600.))
+    np.testing.assert_allclose(status.loc[2, 'cpu_fraction'], 0.5)
+    assert not status.loc[2, 'degraded']
+
+
+def test_max_rss(engine_monitor):
+    engine_monitor.slowdown_threshold = 10.
+    engine_monitor.max_rss = 150.
+    assert engine_monitor.check() == set([2])
+
+
+def test_health_log(engine_monitor, tmpdir):
+    fname = str(tmpdir.join('health.csv'))
+    engine_monitor = EngineMonitor.from_conf_dict({'window': 5},
+                                                  default_health_log=fname)
+    engine_monitor.add_heartbeat(0, make_health(0), runtime=1.)
+    engine_monitor.write(engine_monitor.pop_pending_heartbeats())
+    engine_monitor.add_heartbeat(1, make_health(1), runtime=2.)
+    engine_monitor.write(engine_monitor.pop_pending_heartbeats())
+    assert engine_monitor.pop_pending_heartbeats() == []
+
+    health_log = pd.read_csv(fname)
+    assert health_log['engine_id'].tolist() == [0, 1]
+    assert health_log['runtime'].tolist() == [1., 2.]
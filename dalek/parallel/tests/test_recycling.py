@@ -0,0 +1,104 @@
+from dalek.parallel.recycling import EngineRecycler
+from dalek.parallel.launcher import BaseLauncher, LocalLauncher
+import os
+
+
+class RecordingLauncher(object):
+    """
+    Launcher that records the recycled engines
+    """
+
+    def __init__(self, refused_engines=()):
+        self.recycling_engines = {}
+        self.refused_engines = refused_engines
+        self.updates = 0
+
+    def recycle_engine(self, engine_id, restart_timeout=300.):
+        if engine_id in self.refused_engines:
+            return False
+        self.recycling_engines[engine_id] = ('draining', restart_timeout)
+        return True
+
+    def update_recycling(self):
+        self.updates += 1
+
+
+def get_pid(config_dict, atom_data=None):
+    return os.getpid()
+
+
+def test_engines_to_recycle():
+    recycler = EngineRecycler(max_tasks=3, max_rss=100.)
+    for engine_id in [0, 0, 0, 1, 2]:
+        recycler.add_task(engine_id, {'rss': 50 * 1024 ** 2})
+    recycler.add_task(2, {'rss': 150 * 1024 ** 2})
+    assert recycler.engines_to_recycle() == [0, 2]
+    assert EngineRecycler().engines_to_recycle() == []
+
+
+def test_update():
+    recycler = EngineRecycler(max_tasks=1, max_concurrent=1)
+    launcher = RecordingLauncher()
+    recycler.add_task(0)
+    recycler.add_task(1)
+
+    recycler.update(launcher)
+    assert launcher.updates == 1
+    assert launcher.recycling_engines.keys() == [0]
+    assert recycler.engines_to_recycle() == [1]
+
+    # engine 1 waits until engine 0 is back
+    recycler.update(launcher)
+    assert launcher.recycling_engines.keys() == [0]
+    launcher.recycling_engines.clear()
+    recycler.update(launcher)
+    assert launcher.recycling_engines.keys() == [1]
+    assert recycler.engines_to_recycle() == []
+
+
+def test_update_refused():
+    recycler = EngineRecycler(max_tasks=2)
+    launcher = RecordingLauncher(refused_engines=[0])
+    recycler.add_task(0)
+    recycler.add_task(0)
+
+    recycler.update(launcher)
+    assert launcher.recycling_engines == {}
+    assert recycler.tasks[0] == 2
+    # retried after the next run of the engine
+    assert recycler.engines_to_recycle() == []
+    recycler.add_task(0)
+    assert recycler.engines_to_recycle() == [0]
+
+
+class QueueStatusClient(object):
+
+    def __init__(self, status):
+        self.status = status
+
+    def queue_status(self):
+        return self.status
+
+
+def test_engine_is_drained():
+    launcher = BaseLauncher.__new__(BaseLauncher)
+    launcher.remote_clients = QueueStatusClient(
+        {0: {'queue': 0, 'tasks': 0}, 1: {'queue': 1, 'tasks': 1},
+         'unassigned': 0})
+    assert launcher.engine_is_drained(0)
+    assert not launcher.engine_is_drained(1)
+    # a waiting run could still be assigned to engine 0
+    launcher.remote_clients.status['unassigned'] = 3
+    assert not launcher.engine_is_drained(0)
+
+
+def test_local_launcher_max_tasks_per_process():
+    launcher = LocalLauncher(get_pid, number_of_processes=1,
+                             max_tasks_per_process=2)
+    try:
+        pids = [launcher.queue_parameter_set({}).get() for _ in xrange(4)]
+    finally:
+        launcher.close()
+    assert pids[0] == pids[1]
+    assert pids[1] != pids[2]
+    assert pids[2] == pids[3]
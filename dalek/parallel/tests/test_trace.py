@@ -0,0 +1,46 @@
+from dalek.parallel.trace import ChromeTrace, read_chrome_trace
+import numpy as np
+
+
+def test_chrome_trace(tmpdir):
+    fname = str(tmpdir.join('trace.json'))
+    trace = ChromeTrace(fname)
+    trace.add_task(3, 100., 102.5, 17, 1, 0.25)
+    trace.add_driver_span('optimizer', 'optimizer', 103., 0.5, 1)
+    trace.close()
+
+    # resuming appends to the same trace
+    trace = ChromeTrace(fname)
+    trace.add_task(3, 110., 111., 18, 2, 0.5)
+    trace.flush()
+
+    events = read_chrome_trace(fname)
+    spans = [event for event in events if event['ph'] == 'X']
+    engine_names = [event['args']['name'] for event in events
+                    if event['ph'] == 'M' and event['pid'] == 1 and
+                    event['name'] == 'thread_name']
+
+    assert [event['name'] for event in events].count('process_name') == 2
+    assert len(spans) == 3
+    assert spans[0]['tid'] == 3
+    assert spans[0]['ts'] == 100e6
+    assert spans[0]['dur'] == 2.5e6
+    assert spans[0]['args'] == {'row': 17, 'iteration': 1, 'fitness': 0.25}
+    assert spans[1]['tid'] == ChromeTrace.driver_tracks['optimizer']
+    assert engine_names == ['engine 3', 'engine 3']
+
+
+def test_non_finite_fitness(tmpdir):
+    fname = str(tmpdir.join('trace.json'))
+    trace = ChromeTrace(fname)
+    trace.add_task(0, 100., 101., 0, 0, np.nan)
+    trace.add_task(0, 101., 102., 1, 0, np.inf)
+    trace.close()
+
+    # JSON has no NaN or Infinity, e.g. chrome://tracing rejects them
+    with open(fname) as fh:
+        content = fh.read()
+    assert 'NaN' not in content and 'Infinity' not in content
+    spans = [event for event in read_chrome_trace(fname)
+             if event['ph'] == 'X']
+    assert [span['args']['fitness'] for span in spans] == [None, None]
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ChromeTrace(object):
+    """
+    Timeline of a fit in the Chrome trace event format, which can be opened
+    in chrome://tracing or https://ui.perfetto.dev. The 'engines' process has
+    one track per engine with a span for every TARDIS run, the 'driver'
+    process has tracks for scheduling, the optimizer, I/O and the iterations.
+
+    The events are streamed to the file in the JSON array format, for which
+    the closing bracket is optional. The trace therefore stays readable if the
+    fitter is interrupted, and a resumed fit appends to the same trace.
+
+    Parameters
+    ----------
+
+    fname: ~str
+        path to the trace file
+
+    """
+
+    driver_pid = 0
+    engine_pid = 1
+
+    driver_tracks = {'scheduler': 0, 'optimizer': 1, 'io': 2, 'iterations': 3}
+
+    def __init__(self, fname):
+        self.fname = fname
+        self.lock = threading.Lock()
+        self.known_engines = set()
+
+        new_trace = not os.path.exists(fname) or os.path.getsize(fname) == 0
+        self.file_handle = open(fname, 'a')
+        if new_trace:
+            self.file_handle.write('[\n')
+            self._write_event(self._metadata_event(
+                'process_name', self.driver_pid, 0, 'driver'))
+            self._write_event(self._metadata_event(
+                'process_name', self.engine_pid, 0, 'engines'))
+            for track_name, tid in sorted(self.driver_tracks.items(),
+                                          key=lambda item: item[1]):
+                self._write_event(self._metadata_event(
+                    'thread_name', self.driver_pid, tid, track_name))
+
+    @staticmethod
+    def _metadata_event(name, pid, tid, value):
+        return {'name': name, 'ph': 'M', 'pid': pid, 'tid': tid,
+                'args': {'name': value}}
+
+    @staticmethod
+    def _span_event(name, category, pid, tid, start, duration, args=None):
+        event = {'name': name, 'cat': category, 'ph': 'X', 'pid': pid,
+                 'tid': tid, 'ts': start * 1e6, 'dur': duration * 1e6}
+        if args is not None:
+            event['args'] = args
+        return event
+
+    def _write_event(self, event):
+        self.file_handle.write(json.dumps(event) + ',\n')
+
+    def add_task(self, engine_id, started, completed, row, current_iteration,
+                 fitness):
+        """
+        Add the span of a TARDIS run to the track of its engine
+
+        Parameters
+        ----------
+
+        engine_id: ~int
+
+        started: ~float
+            start of the run in seconds since the epoch
+
+        completed: ~float
+            end of the run in seconds since the epoch
+
+        row: ~int
+            index of the run in the fitter log
+
+        current_iteration: ~int
+
+        fitness: ~float
+            a fitness that is not finite (e.g. of a failed run) is written
+            as null, as JSON has no NaN or infinity
+        """
+        engine_id = int(engine_id)
+        fitness = float(fitness) if np.isfinite(fitness) else None
+        with self.lock:
+            if engine_id not in self.known_engines:
+                self.known_engines.add(engine_id)
+                self._write_event(self._metadata_event(
+                    'thread_name', self.engine_pid, engine_id,
+                    'engine {0:d}'.format(engine_id)))
+            self._write_event(self._span_event(
+                'row {0:d}'.format(int(row)), 'tardis', self.engine_pid,
+                engine_id, started, completed - started,
+                args={'row': int(row), 'iteration': int(current_iteration),
+                      'fitness': fitness}))
+
+    def add_driver_span(self, track, name, start, duration,
+                        current_iteration):
+        """
+        Add a span to one of the driver tracks
+
+        Parameters
+        ----------
+
+        track: ~str
+            'scheduler', 'optimizer', 'io' or 'iterations'
+
+        name: ~str
+
+        start: ~float
+            start in seconds since the epoch
+
+        duration: ~float
+            duration in seconds
+
+        current_iteration: ~int
+        """
+        with self.lock:
+            self._write_event(self._span_event(
+                name, 'driver', self.driver_pid, self.driver_tracks[track],
+                start, duration,
+                args={'iteration': int(current_iteration)}))
+
+    def flush(self):
+        with self.lock:
+            self.file_handle.flush()
+
+    def close(self):
+        with self.lock:
+            self.file_handle.close()
+
+
+def read_chrome_trace(fname):
+    """
+    Read the events of a (possibly unterminated) trace file
+
+    Returns
+    -------
+        : ~list of ~dict
+    """
+    with open(fname) as fh:
+        content = fh.read().strip()
+    if content.endswith(','):
+        content = content[:-1]
+    if not content.endswith(']'):
+        content += ']'
+    return json.loads(content)
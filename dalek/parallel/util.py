@@ -16,3 +16,22 @@ def set_engines_cpu_affinity():
             p = psutil.Process(os.getpid())
             p.set_cpu_affinity(range(cpu_count()))
 
+
+def get_memory_usage():
+    """
+    Resident set size of the current process in bytes (None if it can not
+    be determined)
+    """
+    try:
+        import psutil
+    except ImportError:
+        pass
+    else:
+        return psutil.Process(os.getpid()).memory_info().rss
+
+    try:
+        with open('/proc/self/statm') as fh:
+            resident_pages = int(fh.read().split()[1])
+    except (IOError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')